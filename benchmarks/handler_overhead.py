@@ -0,0 +1,53 @@
+"""
+Measure the per-message overhead of building handler chains.
+
+Compares building a fresh LLMChain (prompt load + ChatOpenAI construction) on every
+access, as the handlers used to do, with the cached chains used now. No request is
+sent to OpenAI.
+
+Usage:
+    python benchmarks/handler_overhead.py [n_messages]
+"""
+import os
+import sys
+from timeit import timeit
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from langchain.chains import LLMChain
+from langchain.chat_models import ChatOpenAI
+from langchain.memory import ChatMessageHistory, ConversationBufferMemory
+from langchain.prompts import load_prompt
+from importlib import resources
+
+from bot import BotConfig
+from bot.handlers import StandaloneHandler, IntentionHandler
+
+config = BotConfig()
+
+
+def build_uncached(prompt_key: str) -> LLMChain:
+    filepath = str(resources.files("bot.prompts").joinpath(f"{prompt_key}.json"))
+    return LLMChain(
+        llm=ChatOpenAI(model_name=config.LLM_MODEL_NAME, temperature=0),
+        prompt=load_prompt(filepath),
+        verbose=False,
+    )
+
+
+def main(n_messages: int) -> None:
+    memory = ConversationBufferMemory(chat_memory=ChatMessageHistory())
+    handlers = [
+        StandaloneHandler(llm_model=config.LLM_MODEL_NAME, memory=memory, verbose=False),
+        IntentionHandler(llm_model=config.LLM_MODEL_NAME, memory=memory, verbose=False),
+    ]
+
+    uncached = timeit(lambda: [build_uncached(h.prompt_key) for h in handlers], number=n_messages)
+    cached = timeit(lambda: [h.chain for h in handlers], number=n_messages)
+
+    print(f"uncached: {1000 * uncached / n_messages:.3f} ms/message")
+    print(f"cached:   {1000 * cached / n_messages:.3f} ms/message")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100)
@@ -0,0 +1,68 @@
+"""
+Choose the confidence threshold of the local intent classifier.
+
+Each labelled example is classified by a classifier built from the other examples
+(leave-one-out), and for each threshold the script reports the coverage, the share of
+messages answered locally instead of by the language model, and the accuracy of those
+local answers. INTENT_CLASSIFIER_THRESHOLD should be the smallest threshold whose
+accuracy is acceptable: a higher one only sends more messages to the language model.
+
+Usage:
+    python benchmarks/intent_classifier.py [backend]
+
+The messages are embedded by the embedder of the vector database backend, the one
+the bot uses for the classifier.
+"""
+import sys
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from bot import BotConfig
+from bot.intent_classifier import EmbeddingIntentClassifier, load_intent_examples
+from bot.vector_databases import get_vector_database
+
+config = BotConfig()
+
+THRESHOLDS = [0.0, 0.02, 0.05, 0.075, 0.1, 0.15, 0.2, 0.3]
+
+
+def leave_one_out(vdb, examples: Dict[str, List[str]]) -> List[Tuple[str, str, float]]:
+    embeddings = {
+        text: embedding
+        for texts in examples.values()
+        for text, embedding in zip(texts, vdb.embed_documents(texts))
+    }
+
+    def embed_documents(texts):
+        return [embeddings[text] for text in texts]
+
+    predictions = []
+    for label, texts in examples.items():
+        for text in texts:
+            others = {
+                other: [t for t in other_texts if t != text] for other, other_texts in examples.items()
+            }
+            classifier = EmbeddingIntentClassifier(
+                embed_documents, lambda message: embeddings[message], others
+            )
+            predicted, confidence = classifier.predict(text)
+            predictions.append((label, predicted, confidence))
+    return predictions
+
+
+def main(backend: str) -> None:
+    vdb = get_vector_database(backend)
+    predictions = leave_one_out(vdb, load_intent_examples())
+
+    print(f"{len(predictions)} examples, current threshold {config.INTENT_CLASSIFIER_THRESHOLD}")
+    print(f"{'threshold':>10} {'coverage':>10} {'accuracy':>10}")
+    for threshold in THRESHOLDS:
+        local = [(label, predicted) for label, predicted, confidence in predictions if confidence >= threshold]
+        coverage = len(local) / len(predictions)
+        accuracy = np.mean([label == predicted for label, predicted in local]) if local else float("nan")
+        print(f"{threshold:>10.3f} {coverage:>10.1%} {accuracy:>10.1%}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else config.VECTORDATABASE_BACKEND)
@@ -0,0 +1,84 @@
+"""
+Measure latency and payload size of vector database retrieval strategies.
+
+Compares the former strategy (1000 neighbors with full documents, truncated to
+n_results afterwards) with fetching only n_results plus the over-fetch margin, and
+with the two-phase projection (ids and distances first, bodies for survivors only).
+
+Usage:
+    python benchmarks/retrieval.py [n_repeats] [backend]
+
+The backend is any label accepted by get_vector_database, e.g. "chroma" (HTTP) or
+"chroma-embedded" (in-process), so both can be compared on the same data.
+"""
+import json
+import sys
+from time import perf_counter
+from typing import Callable, List, Tuple
+
+from bot import BotConfig
+from bot.vector_databases import get_vector_database
+
+config = BotConfig()
+
+QUERIES = [
+    "Quais são as últimas notícias?",
+    "O que aconteceu na prefeitura de Poços de Caldas?",
+    "Notícias sobre o trânsito no centro",
+    "Eventos culturais no fim de semana",
+]
+
+N_RESULTS = 10
+
+
+def payload_size(*responses) -> int:
+    return sum(len(json.dumps(response, default=str).encode()) for response in responses)
+
+
+def former(vdb, query: str) -> int:
+    res = vdb.collection.query(query_texts=query, n_results=1000)
+    return payload_size(res)
+
+
+def truncated(vdb, query: str) -> int:
+    res = vdb.collection.query(
+        query_texts=query, n_results=N_RESULTS + config.VECTORDATABASE_OVERFETCH
+    )
+    return payload_size(res)
+
+
+def two_phase(vdb, query: str) -> int:
+    res = vdb.collection.query(
+        query_texts=query,
+        n_results=N_RESULTS + config.VECTORDATABASE_OVERFETCH,
+        include=["distances"],
+    )
+    bodies = vdb.collection.get(ids=res["ids"][0][:N_RESULTS], include=["documents", "metadatas"])
+    return payload_size(res, bodies)
+
+
+def measure(strategy: Callable, vdb, n_repeats: int) -> Tuple[float, float]:
+    latencies: List[float] = []
+    sizes: List[int] = []
+    for _ in range(n_repeats):
+        for query in QUERIES:
+            start = perf_counter()
+            sizes.append(strategy(vdb, query))
+            latencies.append(perf_counter() - start)
+    return 1000 * sum(latencies) / len(latencies), sum(sizes) / len(sizes) / 1024
+
+
+def main(n_repeats: int, backend: str) -> None:
+    vdb = get_vector_database(backend)
+    vdb.collection.query(query_texts=QUERIES[0], n_results=1)
+
+    for strategy in (former, truncated, two_phase):
+        latency, size = measure(strategy, vdb, n_repeats)
+        print(f"{strategy.__name__:<10} {latency:8.1f} ms/query {size:10.1f} KiB/query")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 5,
+        sys.argv[2] if len(sys.argv) > 2 else config.VECTORDATABASE_BACKEND,
+    )
@@ -1,3 +1,10 @@
+from dotenv import find_dotenv, load_dotenv
+
+# The modules below read their settings from the environment when imported, so the
+# .env file of the working directory is loaded first, without overriding variables
+# already set.
+load_dotenv(find_dotenv(usecwd=True))
+
 from .config import BotConfig
 from .newsbot import NewsBot
 from .handlers._standalone_handler import StandaloneHandler
@@ -1,8 +1,13 @@
+from typing import Optional
+
 import typer
 
 from dotenv import load_dotenv
 
 import ui
+from bot import BotConfig
+from bot.ingest import get_source, ingest as ingest_news
+from bot.vector_databases import get_vector_database
 
 
 app = typer.Typer()
@@ -16,6 +21,39 @@ def start():
     ui.run()
 
 
+@app.command()
+def ingest(
+    location: Optional[str] = typer.Argument(
+        None, help="The news file, or the SQL query of the azure-sql source."
+    ),
+    source: Optional[str] = typer.Option(
+        None, help="The source: csv, jsonl, parquet or azure-sql. Defaults to the file extension."
+    ),
+    backend: Optional[str] = typer.Option(None, help="The vector database. Defaults to the configured one."),
+    batch_size: Optional[int] = typer.Option(None, help="The number of news embedded and upserted at once."),
+    recreate: bool = typer.Option(False, help="Delete the collection and create it again before ingesting."),
+):
+    """
+    Ingest news into the vector database, by batches.
+    """
+    config = BotConfig()
+    batch_size = batch_size or config.INGEST_BATCH_SIZE
+    reader = get_source(source, location)
+
+    vector_database = get_vector_database(backend or config.VECTORDATABASE_BACKEND)
+    if recreate:
+        vector_database.recreate_collection()
+
+    stats = ingest_news(vector_database, reader(location, batch_size), batch_size=batch_size)
+
+    typer.echo(
+        f"{stats['ingested']} news ingested ({stats['skipped']} of {stats['read']} skipped) "
+        f"in {stats['batches']} batches and {stats['total_time']:.1f}s: "
+        f"{stats['docs_per_second']:.1f} docs/s "
+        f"(embedding {stats['embedding_time']:.1f}s, upsert {stats['upsert_time']:.1f}s)"
+    )
+
+
 if __name__ == "__main__":
     load_dotenv()
     app()
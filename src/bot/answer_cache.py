@@ -0,0 +1,138 @@
+import threading
+from collections import OrderedDict
+from time import monotonic
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from bot.data_models import SearchFilters
+from bot.embeddings import Embedding
+
+
+class SemanticAnswerCache:
+    """
+    A bounded cache of answers keyed by the embedding of the question they answer.
+
+    A question hits the cache when a cached question asked under the same search
+    filters and the same collection version is similar enough, by cosine similarity.
+    Entries expire after a time to live, and the least recently used ones are evicted
+    when the cache is full.
+    """
+
+    def __init__(self, max_size: int = 512, ttl: float = 3600, threshold: float = 0.95):
+        """
+        Initialize the SemanticAnswerCache.
+
+        Args:
+            max_size (int): The maximum number of cached answers.
+            ttl (float): The time to live of an answer, in seconds.
+            threshold (float): The minimum cosine similarity of a cache hit.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.threshold = threshold
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[int, Tuple[str, Optional[str], np.ndarray, str, float]] = OrderedDict()
+        self._next_key = 0
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        embedding: Embedding,
+        filters: Optional[SearchFilters] = None,
+        version: Optional[str] = None,
+    ) -> Optional[str]:
+        """
+        Get the answer of the most similar cached question, if similar enough.
+
+        Args:
+            embedding (Embedding): The question embedding.
+            filters (Optional[SearchFilters]): The search filters of the question.
+            version (Optional[str]): The version of the news collection.
+
+        Returns:
+            Optional[str]: The cached answer, or None on a cache miss.
+        """
+        scope = self._get_scope(filters)
+        query = self._normalize(embedding)
+        now = monotonic()
+
+        with self._lock:
+            self._evict_stale(now, version)
+            keys, embeddings = [], []
+            for key, (entry_scope, _, entry_embedding, _, _) in self._entries.items():
+                if entry_scope == scope:
+                    keys.append(key)
+                    embeddings.append(entry_embedding)
+
+            if keys:
+                similarities = np.stack(embeddings) @ query
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    self.hits += 1
+                    self._entries.move_to_end(keys[best])
+                    return self._entries[keys[best]][3]
+
+            self.misses += 1
+            return None
+
+    def put(
+        self,
+        embedding: Embedding,
+        answer: str,
+        filters: Optional[SearchFilters] = None,
+        version: Optional[str] = None,
+    ) -> None:
+        """
+        Cache the answer of a question.
+
+        Args:
+            embedding (Embedding): The question embedding.
+            answer (str): The answer.
+            filters (Optional[SearchFilters]): The search filters of the question.
+            version (Optional[str]): The version of the news collection.
+        """
+        entry = (self._get_scope(filters), version, self._normalize(embedding), answer, monotonic())
+        with self._lock:
+            self._entries[self._next_key] = entry
+            self._next_key += 1
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the cache hit and miss counters.
+
+        Returns:
+            Dict[str, int]: The number of hits, misses and cached answers.
+        """
+        return dict(hits=self.hits, misses=self.misses, size=len(self._entries))
+
+    def clear(self) -> None:
+        """
+        Remove every cached answer.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def _evict_stale(self, now: float, version: Optional[str]) -> None:
+        stale = [
+            key
+            for key, entry in self._entries.items()
+            if now - entry[4] > self.ttl or entry[1] != version
+        ]
+        for key in stale:
+            del self._entries[key]
+
+    @staticmethod
+    def _get_scope(filters: Optional[SearchFilters]) -> str:
+        if filters is None or filters.is_empty:
+            return ""
+        return f"{sorted(filters.categories or [])}:{filters.date_start}:{filters.date_end}"
+
+    @staticmethod
+    def _normalize(embedding: Embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        return vector / np.linalg.norm(vector)
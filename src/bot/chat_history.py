@@ -0,0 +1,99 @@
+import threading
+from typing import List, Optional, Tuple
+
+from langchain_core.messages.ai import AIMessage
+from langchain_core.messages.base import BaseMessage
+from langchain_core.messages.human import HumanMessage
+
+from bot import BotConfig
+from bot.tokens import count_tokens
+
+config = BotConfig()
+
+
+class ChatHistoryView:
+    """
+    A class formatting the chat history of a memory for the prompts, incrementally.
+
+    Each message is formatted and its tokens counted once, when it is first seen, and
+    kept in a buffer following the chat memory: new messages are appended and messages
+    pruned from the start of the memory are dropped. A memory changed otherwise, e.g.
+    cleared, is formatted again whole. The formatted history holds the most recent
+    messages fitting in the token budget, and is computed again only when the messages
+    change, so the handlers answering a message share it.
+    """
+
+    def __init__(self, memory, model_name: str, max_tokens: Optional[int] = None):
+        """
+        Initialize the ChatHistoryView.
+
+        Args:
+            memory: The conversation memory, with a 'chat_memory' message history.
+            model_name (str): The language model name, for the token counts.
+            max_tokens (Optional[int]): The token budget of the history. Defaults to
+                no limit.
+        """
+        self.memory = memory
+        self.model_name = model_name
+        self.max_tokens = max_tokens
+        self._entries: List[Tuple[BaseMessage, str, int]] = []
+        self._rendered: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def __str__(self) -> str:
+        return self.get()
+
+    def get(self) -> str:
+        """
+        Get the formatted chat history, truncated to the token budget from the most
+        recent message backwards.
+
+        Returns:
+            str: The formatted chat history.
+        """
+        with self._lock:
+            if self._refresh() or self._rendered is None:
+                self._rendered = self._render()
+            return self._rendered
+
+    def _refresh(self) -> bool:
+        """
+        Bring the buffer in line with the chat memory.
+
+        Returns:
+            bool: Whether the buffer changed.
+        """
+        messages = self.memory.chat_memory.messages
+        entries = self._entries
+
+        start = 0
+        while start < len(entries) and messages and entries[start][0] is not messages[0]:
+            start += 1
+
+        known = len(entries) - start
+        if known and (known > len(messages) or messages[known - 1] is not entries[-1][0]):
+            start, known = len(entries), 0
+
+        if start == 0 and known == len(messages):
+            return False
+
+        self._entries = entries[start:] + [self._format(m) for m in messages[known:]]
+        return True
+
+    def _render(self) -> str:
+        lines, total = [], 0
+        for _, line, n_tokens in reversed(self._entries):
+            total += n_tokens
+            if self.max_tokens is not None and total > self.max_tokens:
+                break
+            lines.append(line)
+        return "".join(reversed(lines))
+
+    def _format(self, message: BaseMessage) -> Tuple[BaseMessage, str, int]:
+        if isinstance(message, HumanMessage):
+            line = f"{config.HUMAN_PREFIX}: {message.content}\n"
+        elif isinstance(message, AIMessage):
+            line = f"{config.AI_PREFIX}: {message.content}\n"
+        else:
+            line = ""
+        return message, line, count_tokens(line, self.model_name) if line else 0
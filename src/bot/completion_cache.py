@@ -0,0 +1,142 @@
+import hashlib
+import json
+import sqlite3
+import threading
+from collections import Counter, defaultdict
+from time import time
+from typing import Dict, Optional
+
+from bot import BotConfig
+
+config = BotConfig()
+
+
+class CompletionCache:
+    """
+    A persistent exact-match cache of language model completions, backed by SQLite.
+
+    Completions are keyed by a hash of the model, the temperature and the fully
+    formatted prompt, so only identical requests share a completion. The SQLite file
+    runs in WAL mode, so it can be shared by several worker processes. When the cache
+    holds more than the maximum number of entries, the least recently used ones are
+    deleted.
+    """
+
+    def __init__(self, path: str, max_entries: int = 10000):
+        """
+        Initialize the CompletionCache.
+
+        Args:
+            path (str): The SQLite file of the cache.
+            max_entries (int): The maximum number of cached completions.
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self._counters: Dict[str, Counter] = defaultdict(Counter)
+        self._lock = threading.Lock()
+        self._connection = self._connect()
+
+    @staticmethod
+    def get_key(model_name: str, temperature: float, prompt: str) -> str:
+        """
+        Get the key of a completion request.
+
+        Args:
+            model_name (str): The language model name.
+            temperature (float): The sampling temperature.
+            prompt (str): The formatted prompt.
+
+        Returns:
+            str: The SHA-256 digest of the request.
+        """
+        request = json.dumps([model_name, temperature, prompt], ensure_ascii=False)
+        return hashlib.sha256(request.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, handler: str = "") -> Optional[str]:
+        """
+        Get a cached completion.
+
+        Args:
+            key (str): The request key.
+            handler (str): The name of the requesting handler, for the metrics.
+
+        Returns:
+            Optional[str]: The completion, or None on a cache miss.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT completion FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                self._connection.execute(
+                    "UPDATE completions SET last_used = ? WHERE key = ?", (time(), key)
+                )
+                self._connection.commit()
+
+        self._counters[handler]["hits" if row is not None else "misses"] += 1
+        return None if row is None else row[0]
+
+    def put(self, key: str, completion: str) -> None:
+        """
+        Cache a completion, evicting the least recently used ones past the limit.
+
+        Args:
+            key (str): The request key.
+            completion (str): The completion.
+        """
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO completions (key, completion, last_used) VALUES (?, ?, ?)",
+                (key, completion, time()),
+            )
+            self._connection.execute(
+                "DELETE FROM completions WHERE key IN "
+                "(SELECT key FROM completions ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._connection.commit()
+
+    @property
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Get the hits, misses and hit rate of each handler in this process.
+
+        Returns:
+            Dict[str, Dict[str, float]]: The metrics of each handler.
+        """
+        return {
+            handler: dict(
+                hits=counter["hits"],
+                misses=counter["misses"],
+                hit_rate=counter["hits"] / max(1, counter["hits"] + counter["misses"]),
+            )
+            for handler, counter in self._counters.items()
+        }
+
+    def clear(self) -> None:
+        """
+        Remove every cached completion.
+        """
+        with self._lock:
+            self._connection.execute("DELETE FROM completions")
+            self._connection.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS completions "
+            "(key TEXT PRIMARY KEY, completion TEXT, last_used REAL)"
+        )
+        connection.execute(
+            "CREATE INDEX IF NOT EXISTS completions_last_used ON completions (last_used)"
+        )
+        connection.commit()
+        return connection
+
+
+completion_cache = (
+    CompletionCache(config.COMPLETION_CACHE_PATH, max_entries=config.COMPLETION_CACHE_MAX_ENTRIES)
+    if config.COMPLETION_CACHE_PATH
+    else None
+)
@@ -1,3 +1,5 @@
+from typing import List, Optional
+
 from pydantic_settings import BaseSettings
 
 
@@ -6,11 +8,63 @@ class BotConfig(BaseSettings):
     LLM_CONTEXT_WINDOW_SIZE: int = 4096
     PROMPT_MAX_TOKENS: int = 3200
     HUGGINGFACE_EMBEDDING_MODEL_NAME: str = "clips/mfaq"
+    EMBEDDING_CACHE_SIZE: int = 1024
+    EMBEDDING_CACHE_PATH: Optional[str] = None
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 100000
+    COMPLETION_CACHE_PATH: Optional[str] = None
+    COMPLETION_CACHE_MAX_ENTRIES: int = 10000
+    VECTORDATABASE_BACKEND: str = "chroma"
     VECTORDATABASE_HOSTNAME: str = "chroma-server"
     VECTORDATABASE_PORT: int = 8000
     VECTORDATABASE_PERSIST_DIRECTORY: str = "chroma_db"
+    VECTORDATABASE_ANONYMIZED_TELEMETRY: bool = True
+    VECTORDATABASE_HTTP_POOL_SIZE: int = 10
+    VECTORDATABASE_LOCAL_STORE_PATH: str = "database/numpy"
+    VECTORDATABASE_LOCAL_STORE_DTYPE: str = "float32"
+    VECTORDATABASE_FAISS_INDEX: bool = False
+    VECTORDATABASE_OVERFETCH: int = 0
+    VECTORDATABASE_QUERY_INCLUDE: List[str] = ["documents", "metadatas", "distances"]
+    VECTORDATABASE_VERSION_CHECK_INTERVAL: float = 5
     HUMAN_PREFIX: str = "Human"
     AI_PREFIX: str = "AI"
+    CHAT_HISTORY_MAX_TOKENS: Optional[int] = 1000
+    BACKGROUND_SUMMARY: bool = True
+    SUMMARY_WORKERS: int = 2
+    SUMMARY_QUEUE_SIZE: int = 32
+    INGEST_BATCH_SIZE: int = 256
+    INGEST_MIN_CONTENT_LENGTH: int = 250
+    AZURE_SQL_SERVER: Optional[str] = None
+    AZURE_SQL_DATABASE: Optional[str] = None
+    AZURE_SQL_DRIVER: Optional[str] = None
+    AZURE_SQL_USERNAME: Optional[str] = None
+    AZURE_SQL_PASSWORD: Optional[str] = None
+    AZURE_SQL_TIMEOUT: int = 60
+    RAW_DATA_SCHEMA: Optional[str] = None
+    RAW_DATA_TABLE: Optional[str] = None
+    PROMPTS_HOT_RELOAD: bool = False
+    SPECULATIVE_RETRIEVAL: bool = True
+    COMBINED_STANDALONE_INTENTION: bool = False
+    STANDALONE_SKIP_SELF_CONTAINED: bool = True
+    STANDALONE_RECENT_REWRITES: int = 256
+    ANSWER_CACHE: bool = True
+    ANSWER_CACHE_SIZE: int = 512
+    ANSWER_CACHE_TTL: float = 3600
+    ANSWER_CACHE_THRESHOLD: float = 0.95
+    SESSION_TTL: float = 1800
+    SESSION_MAX: int = 1000
+    LOCAL_MEMORY_LOAD_LAST: int = 50
+    LOCAL_MEMORY_MAX_MESSAGES: int = 1000
+    LOCAL_MEMORY_COMPACT_EVERY: int = 100
+    CONVERSATION_STORE_PATH: Optional[str] = "data/conversations.sqlite"
+    CONVERSATION_STORE_TTL: float = 2592000
+    CONVERSATION_STORE_CLEANUP_INTERVAL: float = 3600
+    EXECUTOR_LLM_CONCURRENCY: int = 8
+    EXECUTOR_EMBEDDING_CONCURRENCY: int = 2
+    EXECUTOR_VECTOR_QUERY_CONCURRENCY: int = 8
+    EXECUTOR_QUEUE_SIZE: int = 32
+    EXECUTOR_QUEUE_TIMEOUT: float = 10
+    LOCAL_INTENT_CLASSIFIER: bool = False
+    INTENT_CLASSIFIER_THRESHOLD: float = 0.1
 
     @property
     def EMBEDDING_COLLECTION(self) -> str:
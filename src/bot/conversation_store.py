@@ -0,0 +1,255 @@
+import json
+import os
+import sqlite3
+import threading
+from functools import lru_cache
+from time import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain.schema import BaseChatMessageHistory
+from langchain.schema.messages import BaseMessage, messages_from_dict, message_to_dict
+
+from bot import BotConfig
+
+config = BotConfig()
+
+
+class ConversationStore:
+    """
+    A class storing the conversations of every user and session of a node in a single
+    SQLite database, in WAL mode so that concurrent sessions and worker processes read
+    while another one writes.
+
+    Sessions are indexed by user and by last activity, and messages by session, so
+    that listing the sessions of a user, reading the last turns of a session and
+    deleting the expired sessions never scan the whole database.
+    """
+
+    def __init__(
+        self, path: str, ttl: Optional[float] = None, cleanup_interval: Optional[float] = None
+    ):
+        """
+        Initialize the ConversationStore.
+
+        Args:
+            path (str): The SQLite file of the store.
+            ttl (Optional[float]): The inactivity time after which a session is
+                deleted by cleanup, in seconds. Defaults to never.
+            cleanup_interval (Optional[float]): The minimum time between two cleanups
+                run by maybe_cleanup, in seconds. Defaults to every call.
+        """
+        self.path = path
+        self.ttl = ttl
+        self.cleanup_interval = cleanup_interval
+        self._last_cleanup: Optional[float] = None
+        self._lock = threading.Lock()
+        self._connection = self._connect()
+
+    def add_messages(
+        self, session_id: str, messages: Sequence[BaseMessage], user_id: Optional[str] = None
+    ) -> None:
+        """
+        Append messages to a session, creating it on first use.
+
+        Args:
+            session_id (str): The session id.
+            messages (Sequence[BaseMessage]): The messages.
+            user_id (Optional[str]): The user the session belongs to.
+        """
+        now = time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT INTO sessions (session_id, user_id, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?) ON CONFLICT(session_id) DO UPDATE SET updated_at = ?",
+                (session_id, user_id, now, now, now),
+            )
+            self._connection.executemany(
+                "INSERT INTO messages (session_id, message, created_at) VALUES (?, ?, ?)",
+                [
+                    (session_id, json.dumps(message_to_dict(m), ensure_ascii=False), now)
+                    for m in messages
+                ],
+            )
+            self._connection.commit()
+
+    def get_messages(self, session_id: str, last: Optional[int] = None) -> List[BaseMessage]:
+        """
+        Get the messages of a session.
+
+        Args:
+            session_id (str): The session id.
+            last (Optional[int]): The number of most recent messages to get. Defaults
+                to every message.
+
+        Returns:
+            List[BaseMessage]: The messages, in order.
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT message FROM messages WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+                (session_id, -1 if last is None else last),
+            ).fetchall()
+        return messages_from_dict([json.loads(row[0]) for row in reversed(rows)])
+
+    def list_sessions(self, user_id: str) -> List[Dict[str, Any]]:
+        """
+        List the sessions of a user, the most recently active first.
+
+        Args:
+            user_id (str): The user id.
+
+        Returns:
+            List[Dict[str, Any]]: The session ids and their creation and last activity
+                timestamps.
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT session_id, created_at, updated_at FROM sessions "
+                "WHERE user_id = ? ORDER BY updated_at DESC",
+                (user_id,),
+            ).fetchall()
+        return [dict(session_id=s, created_at=c, updated_at=u) for s, c, u in rows]
+
+    def delete_session(self, session_id: str) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            self._connection.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self._connection.commit()
+
+    def cleanup(self, ttl: Optional[float] = None) -> int:
+        """
+        Delete the sessions inactive for longer than the time to live.
+
+        Args:
+            ttl (Optional[float]): The time to live, in seconds. Defaults to the store
+                time to live.
+
+        Returns:
+            int: The number of deleted sessions.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        if ttl is None:
+            return 0
+
+        threshold = time() - ttl
+        with self._lock:
+            self._connection.execute(
+                "DELETE FROM messages WHERE session_id IN "
+                "(SELECT session_id FROM sessions WHERE updated_at < ?)",
+                (threshold,),
+            )
+            deleted = self._connection.execute(
+                "DELETE FROM sessions WHERE updated_at < ?", (threshold,)
+            ).rowcount
+            self._connection.commit()
+        return deleted
+
+    def maybe_cleanup(self) -> int:
+        """
+        Run cleanup if the cleanup interval has elapsed since the last one, so that
+        callers on the request path can trigger it without scanning the database on
+        every call.
+
+        Returns:
+            int: The number of deleted sessions.
+        """
+        now = time()
+        with self._lock:
+            if (
+                self._last_cleanup is not None
+                and self.cleanup_interval is not None
+                and now - self._last_cleanup < self.cleanup_interval
+            ):
+                return 0
+            self._last_cleanup = now
+        return self.cleanup()
+
+    def _connect(self) -> sqlite3.Connection:
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        connection = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                user_id TEXT,
+                created_at REAL,
+                updated_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS sessions_user ON sessions (user_id, updated_at);
+            CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated_at);
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                message TEXT NOT NULL,
+                created_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS messages_session ON messages (session_id, id);
+            """
+        )
+        connection.commit()
+        return connection
+
+
+class StoredChatMessageHistory(BaseChatMessageHistory):
+    """
+    A chat message history of a session of a ConversationStore, to be used as the
+    chat memory of a ConversationSummaryBufferMemory.
+
+    The messages are kept in a list, as in ChatMessageHistory, so that the memory can
+    prune its buffer in place, and every added message is written through to the store.
+    """
+
+    def __init__(
+        self,
+        store: ConversationStore,
+        session_id: str,
+        user_id: Optional[str] = None,
+        load_last: Optional[int] = None,
+    ):
+        """
+        Initialize the StoredChatMessageHistory, resuming the last messages of the
+        session.
+
+        Args:
+            store (ConversationStore): The conversation store.
+            session_id (str): The session id.
+            user_id (Optional[str]): The user the session belongs to.
+            load_last (Optional[int]): The number of most recent messages to resume.
+                Defaults to every message.
+        """
+        self.store = store
+        self.session_id = session_id
+        self.user_id = user_id
+        self.messages: List[BaseMessage] = store.get_messages(session_id, last=load_last)
+
+    def add_message(self, message: BaseMessage) -> None:
+        self.add_messages([message])
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        self.store.add_messages(self.session_id, messages, user_id=self.user_id)
+        self.messages.extend(messages)
+
+    def clear(self) -> None:
+        self.store.delete_session(self.session_id)
+        self.messages = []
+
+
+@lru_cache(maxsize=None)
+def get_conversation_store() -> Optional[ConversationStore]:
+    """
+    Get the conversation store of the process, opening it on first use.
+
+    Returns:
+        Optional[ConversationStore]: The store, or None if none is configured.
+    """
+    if not config.CONVERSATION_STORE_PATH:
+        return None
+    return ConversationStore(
+        config.CONVERSATION_STORE_PATH,
+        ttl=config.CONVERSATION_STORE_TTL,
+        cleanup_interval=config.CONVERSATION_STORE_CLEANUP_INTERVAL,
+    )
@@ -1,16 +1,22 @@
-from typing import List, Optional
+from functools import lru_cache
+from typing import List, Optional, Tuple
 from datetime import date
 from uuid import UUID
 from abc import ABC, abstractmethod
 
 from pydantic import BaseModel
 
+from bot.tokens import count_tokens
+
 
 class BaseDocument(ABC, BaseModel):
     """
     Abstract base class for representing a document.
     Inherits from ABC (Abstract Base Class) and BaseModel.
     """
+    n_tokens: Optional[int] = None
+    n_tokens_model: Optional[str] = None
+
     @abstractmethod
     def repr(self) -> str:
         """
@@ -21,6 +27,19 @@ class BaseDocument(ABC, BaseModel):
         """
         pass
 
+    def count_tokens(self, model_name: str, order: Optional[int] = None) -> int:
+        """
+        Count the number of tokens of the string representation of the document.
+
+        Args:
+            model_name (str): The language model name.
+            order (Optional[int]): The order of the document.
+
+        Returns:
+            int: The number of tokens.
+        """
+        return count_tokens(self.repr(order), model_name)
+
 
 class BaseVectorDatabaseResult(ABC, BaseModel):
     """
@@ -58,19 +77,110 @@ class News(BaseDocument):
         Returns:
             str: String representation of the news document.
         """
+        _firstline, _lastline = self.repr_wrapper(order)
+        return f"{_firstline}{self.repr_body(order)}{_lastline}"
+
+    def repr_body(self, order: Optional[int] = None) -> str:
+        """
+        Return the fields of the string representation of the news document.
+
+        The body only depends on whether an order is given, not on its value, so its
+        token count can be computed once at ingestion time.
+
+        Args:
+            order (Optional[int]): The order of the news document.
+
+        Returns:
+            str: The fields of the string representation.
+        """
         _start_char = "\t" if order else ""
-        _firstline = f"\n<noticia_{order}>\n" if order else ""
-        _lastline = f"</noticia_{order}>" if order else ""
         return (
-            f"{_firstline}"
             f"{_start_char}<data>{self.date}</data>\n"
             f"{_start_char}<titulo>{self.title}</titulo>\n"
             f"{_start_char}<autor>{self.author}</autor>\n"
             f"{_start_char}<link>{self.link}</link>\n"
             f"{_start_char}<conteudo>{self.document}</conteudo>\n"
-            f"{_lastline}"
         )
 
+    @staticmethod
+    def repr_wrapper(order: Optional[int] = None) -> Tuple[str, str]:
+        """
+        Return the lines enclosing the string representation of the news document.
+
+        Args:
+            order (Optional[int]): The order of the news document.
+
+        Returns:
+            Tuple[str, str]: The first and last lines.
+        """
+        _firstline = f"\n<noticia_{order}>\n" if order else ""
+        _lastline = f"</noticia_{order}>" if order else ""
+        return _firstline, _lastline
+
+    def count_tokens(self, model_name: str, order: Optional[int] = None) -> int:
+        """
+        Count the number of tokens of the string representation of the news document.
+
+        Uses the body token count precomputed at ingestion time when it was computed
+        for the same model, so that no tokenizer call is needed for the document.
+
+        Args:
+            model_name (str): The language model name.
+            order (Optional[int]): The order of the news document.
+
+        Returns:
+            int: The number of tokens.
+        """
+        if not order or self.n_tokens is None or self.n_tokens_model != model_name:
+            return super().count_tokens(model_name, order)
+        return self.n_tokens + _count_wrapper_tokens(order, model_name)
+
+    def precompute_tokens(self, model_name: str) -> "News":
+        """
+        Store the token count of the ordered body for the given model.
+
+        Args:
+            model_name (str): The language model name.
+
+        Returns:
+            News: The news document itself.
+        """
+        self.n_tokens = count_tokens(self.repr_body(order=1), model_name)
+        self.n_tokens_model = model_name
+        return self
+
+
+@lru_cache(maxsize=None)
+def _count_wrapper_tokens(order: int, model_name: str) -> int:
+    return sum(count_tokens(line, model_name) for line in News.repr_wrapper(order))
+
+
+class SearchFilters(BaseModel):
+    """
+    Class representing the filters applied to a vector database search.
+    """
+
+    categories: Optional[List[str]] = None
+    date_start: Optional[date] = None
+    date_end: Optional[date] = None
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.categories and self.date_start is None and self.date_end is None
+
+
+def date_to_int(value: date) -> int:
+    """
+    Convert a date to a sortable integer, e.g. 2023-09-30 to 20230930.
+
+    Args:
+        value (date): The date.
+
+    Returns:
+        int: The sortable integer.
+    """
+    return value.year * 10000 + value.month * 100 + value.day
+
 
 class VectorDatabaseNewsResult(BaseVectorDatabaseResult):
     """
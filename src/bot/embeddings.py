@@ -0,0 +1,174 @@
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from time import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+from loguru import logger
+
+Embedding = List[float]
+
+
+class QueryEmbeddingCache:
+    """
+    A bounded LRU cache of query embeddings, with an optional SQLite tier that
+    survives restarts and is shared between processes.
+
+    Queries are keyed by their normalized text and the embedding model name, so
+    repeated questions skip the embedding model forward pass. The SQLite file runs in
+    WAL mode and keeps the most recently used embeddings only; when it is locked or
+    unavailable, the embedding is computed as on a cache miss.
+    """
+
+    def __init__(
+        self,
+        embedder: Callable[[Sequence[str]], Sequence[Embedding]],
+        model_name: str,
+        max_size: int = 1024,
+        path: Optional[str] = None,
+        max_entries: int = 100000,
+    ):
+        """
+        Initialize the QueryEmbeddingCache.
+
+        Args:
+            embedder (Callable): The embedding function, mapping texts to embeddings.
+            model_name (str): The embedding model name.
+            max_size (int): The maximum number of embeddings kept in memory.
+            path (Optional[str]): The SQLite file of the persistent tier, if any.
+            max_entries (int): The maximum number of embeddings kept on disk.
+        """
+        self.embedder = embedder
+        self.model_name = model_name
+        self.max_size = max_size
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory: OrderedDict[str, Embedding] = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection = self._connect() if path else None
+
+    def __call__(self, text: str) -> Embedding:
+        """
+        Get the embedding of a query, computing it only on a cache miss.
+
+        Args:
+            text (str): The query text.
+
+        Returns:
+            Embedding: The query embedding.
+        """
+        key = self._get_key(text)
+
+        embedding = self._get(key)
+        if embedding is not None:
+            self.hits += 1
+            return embedding
+
+        self.misses += 1
+        embedding = list(self.embedder([text])[0])
+        self._set(key, embedding)
+        return embedding
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the cache hit and miss counters.
+
+        Returns:
+            Dict[str, int]: The number of hits, misses and in-memory entries.
+        """
+        return dict(hits=self.hits, misses=self.misses, size=len(self._memory))
+
+    def clear(self) -> None:
+        """
+        Remove every cached embedding, in memory and on disk.
+        """
+        with self._lock:
+            self._memory.clear()
+            if self._connection is not None:
+                self._connection.execute("DELETE FROM query_embeddings")
+                self._connection.commit()
+
+    def _get_key(self, text: str) -> str:
+        return f"{self.model_name}:{' '.join(text.lower().split())}"
+
+    def _get(self, key: str) -> Optional[Embedding]:
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+
+            if self._connection is None:
+                return None
+
+            try:
+                row = self._connection.execute(
+                    "SELECT embedding FROM query_embeddings WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    self._connection.execute(
+                        "UPDATE query_embeddings SET last_used = ? WHERE key = ?", (time(), key)
+                    )
+                    self._connection.commit()
+            except sqlite3.OperationalError as err:
+                logger.warning(f"Cache de embeddings indisponível: {err}")
+                return None
+
+        if row is None:
+            return None
+
+        embedding = array("f", row[0]).tolist()
+        self._set(key, embedding, persist=False)
+        return embedding
+
+    def _set(self, key: str, embedding: Embedding, persist: bool = True) -> None:
+        with self._lock:
+            self._memory[key] = embedding
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_size:
+                self._memory.popitem(last=False)
+
+            if persist and self._connection is not None:
+                try:
+                    self._persist(key, embedding)
+                except sqlite3.OperationalError as err:
+                    logger.warning(f"Cache de embeddings indisponível: {err}")
+
+    def _persist(self, key: str, embedding: Embedding) -> None:
+        """
+        Write an embedding to the SQLite tier, evicting the least recently used ones
+        past the limit. Must be called holding the lock.
+
+        Args:
+            key (str): The query key.
+            embedding (Embedding): The query embedding.
+        """
+        self._connection.execute(
+            "INSERT OR REPLACE INTO query_embeddings (key, embedding, last_used) VALUES (?, ?, ?)",
+            (key, array("f", embedding).tobytes(), time()),
+        )
+        self._connection.execute(
+            "DELETE FROM query_embeddings WHERE key IN "
+            "(SELECT key FROM query_embeddings ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+        self._connection.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS query_embeddings "
+            "(key TEXT PRIMARY KEY, embedding BLOB, last_used REAL)"
+        )
+        columns = [row[1] for row in connection.execute("PRAGMA table_info(query_embeddings)")]
+        if "last_used" not in columns:
+            connection.execute("ALTER TABLE query_embeddings ADD COLUMN last_used REAL DEFAULT 0")
+        connection.execute(
+            "CREATE INDEX IF NOT EXISTS query_embeddings_last_used ON query_embeddings (last_used)"
+        )
+        connection.commit()
+        return connection
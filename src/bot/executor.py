@@ -0,0 +1,308 @@
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from time import perf_counter
+from typing import Callable, Deque, Dict, Optional
+
+import numpy as np
+
+from bot import BotConfig
+
+config = BotConfig()
+
+LLM = "llm"
+EMBEDDING = "embedding"
+VECTOR_QUERY = "vector_query"
+
+
+class ExecutorBusyError(Exception):
+    pass
+
+
+class ResourceLimiter:
+    """
+    A class bounding the concurrent calls to a class of resources, with a bounded
+    queue of waiting callers.
+
+    Threads and coroutines wait in the same first-in first-out queue, and a released
+    slot is handed over to the first waiter. Coroutines wait on a future of their own
+    event loop, so waiting never holds a thread. A caller arriving when the queue is
+    full, or waiting longer than the timeout, is rejected at once with an
+    ExecutorBusyError instead of piling up.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int,
+        max_queue: int,
+        timeout: Optional[float] = None,
+        window: int = 1024,
+    ):
+        """
+        Initialize the ResourceLimiter.
+
+        Args:
+            name (str): The resource class name.
+            max_concurrency (int): The maximum number of concurrent calls.
+            max_queue (int): The maximum number of callers waiting for a slot.
+            timeout (Optional[float]): The maximum waiting time, in seconds.
+            window (int): The number of recent queue times kept for the metrics.
+        """
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.active = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._waiters: Deque[_Waiter] = deque()
+        self._lock = threading.Lock()
+        self._queue_times = deque(maxlen=window)
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    @contextmanager
+    def limit(self):
+        """
+        Hold a slot of the resource class while the block runs.
+
+        Raises:
+            ExecutorBusyError: If the queue is full or the slot is not obtained in time.
+        """
+        event = threading.Event()
+        waiter = _Waiter(event.set)
+        if not self._acquire_or_enqueue(waiter):
+            start = perf_counter()
+            event.wait(self.timeout)
+            self._dequeue(waiter, perf_counter() - start)
+        try:
+            yield
+        finally:
+            self._release()
+
+    @asynccontextmanager
+    async def alimit(self):
+        """
+        Hold a slot of the resource class while the block runs, waiting for it on the
+        event loop.
+
+        Raises:
+            ExecutorBusyError: If the queue is full or the slot is not obtained in time.
+        """
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+        waiter = _Waiter(lambda: loop.call_soon_threadsafe(_set_granted, granted))
+        if not self._acquire_or_enqueue(waiter):
+            start = perf_counter()
+            try:
+                await asyncio.wait_for(granted, self.timeout)
+            except asyncio.TimeoutError:
+                pass
+            except asyncio.CancelledError:
+                self._abandon(waiter)
+                raise
+            self._dequeue(waiter, perf_counter() - start)
+        try:
+            yield
+        finally:
+            self._release()
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        """
+        Get the occupation, admission and queue time metrics of the resource class.
+
+        Returns:
+            Dict[str, float]: The metrics, with queue times in milliseconds.
+        """
+        queue_times = 1000 * np.asarray(self._queue_times or [0.0])
+        return dict(
+            active=self.active,
+            waiting=self.waiting,
+            admitted=self.admitted,
+            rejected=self.rejected,
+            queue_time_p50=float(np.percentile(queue_times, 50)),
+            queue_time_p95=float(np.percentile(queue_times, 95)),
+            queue_time_max=float(queue_times.max()),
+        )
+
+    def _acquire_or_enqueue(self, waiter: "_Waiter") -> bool:
+        """
+        Take a free slot, or queue the waiter if there is none.
+
+        Args:
+            waiter (_Waiter): The waiter queued if no slot is free.
+
+        Returns:
+            bool: Whether a slot was taken.
+
+        Raises:
+            ExecutorBusyError: If the queue is full.
+        """
+        with self._lock:
+            if self.active < self.max_concurrency and not self._waiters:
+                self.active += 1
+                self._admit(0.0)
+                return True
+
+            if len(self._waiters) >= self.max_queue:
+                self.rejected += 1
+                raise ExecutorBusyError(f"The '{self.name}' queue is full.")
+
+            self._waiters.append(waiter)
+            return False
+
+    def _dequeue(self, waiter: "_Waiter", queue_time: float) -> None:
+        with self._lock:
+            if waiter.granted:
+                self._admit(queue_time)
+                return
+            self._waiters.remove(waiter)
+            self.rejected += 1
+        raise ExecutorBusyError(f"Timed out waiting for a '{self.name}' slot.")
+
+    def _abandon(self, waiter: "_Waiter") -> None:
+        with self._lock:
+            if not waiter.granted:
+                self._waiters.remove(waiter)
+                return
+        self._release()
+
+    def _admit(self, queue_time: float) -> None:
+        self.admitted += 1
+        self._queue_times.append(queue_time)
+
+    def _release(self) -> None:
+        """
+        Hand the slot over to the first waiter, or free it if nobody waits.
+        """
+        with self._lock:
+            if not self._waiters:
+                self.active -= 1
+                return
+            waiter = self._waiters.popleft()
+            waiter.granted = True
+        waiter.wake()
+
+
+class _Waiter:
+    """
+    A caller waiting for a slot, woken up by the caller releasing it.
+    """
+
+    def __init__(self, wake: Callable[[], None]):
+        self.wake = wake
+        self.granted = False
+
+
+def _set_granted(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(True)
+
+
+class BoundedThreadPoolExecutor(ThreadPoolExecutor):
+    """
+    A thread pool with a bounded queue of pending tasks. A task submitted while the
+    workers are busy and the queue is full is rejected at once with an
+    ExecutorBusyError, so that the caller can run it itself instead.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, thread_name_prefix: str = ""):
+        """
+        Initialize the BoundedThreadPoolExecutor.
+
+        Args:
+            max_workers (int): The number of worker threads.
+            max_queue (int): The maximum number of tasks waiting for a worker.
+            thread_name_prefix (str): The prefix of the worker thread names.
+        """
+        super().__init__(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        if not self._slots.acquire(blocking=False):
+            raise ExecutorBusyError(f"The '{self._thread_name_prefix}' task queue is full.")
+        try:
+            future = super().submit(fn, *args, **kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+
+class RequestExecutor:
+    """
+    A class holding the limiters of each class of resources used to answer a
+    request: language model calls, embeddings and vector database queries.
+    """
+
+    def __init__(self, limiters: Dict[str, ResourceLimiter]):
+        """
+        Initialize the RequestExecutor.
+
+        Args:
+            limiters (Dict[str, ResourceLimiter]): The limiter of each resource class.
+        """
+        self.limiters = limiters
+
+    @classmethod
+    def from_config(cls) -> "RequestExecutor":
+        """
+        Build the executor with the configured limits.
+
+        Returns:
+            RequestExecutor: The executor.
+        """
+        concurrency = {
+            LLM: config.EXECUTOR_LLM_CONCURRENCY,
+            EMBEDDING: config.EXECUTOR_EMBEDDING_CONCURRENCY,
+            VECTOR_QUERY: config.EXECUTOR_VECTOR_QUERY_CONCURRENCY,
+        }
+        return cls(
+            {
+                name: ResourceLimiter(
+                    name,
+                    max_concurrency=value,
+                    max_queue=config.EXECUTOR_QUEUE_SIZE,
+                    timeout=config.EXECUTOR_QUEUE_TIMEOUT,
+                )
+                for name, value in concurrency.items()
+            }
+        )
+
+    def limit(self, resource: str):
+        return self.limiters[resource].limit()
+
+    def alimit(self, resource: str):
+        return self.limiters[resource].alimit()
+
+    def wrap(self, resource: str, function: Callable) -> Callable:
+        """
+        Wrap a function so that each call holds a slot of a resource class.
+
+        Args:
+            resource (str): The resource class.
+            function (Callable): The function.
+
+        Returns:
+            Callable: The wrapped function.
+        """
+
+        def limited(*args, **kwargs):
+            with self.limit(resource):
+                return function(*args, **kwargs)
+
+        return limited
+
+    @property
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {name: limiter.stats for name, limiter in self.limiters.items()}
+
+
+request_executor = RequestExecutor.from_config()
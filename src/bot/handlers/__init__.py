@@ -4,6 +4,7 @@ from bot.handlers._intention_handler import IntentionHandler
 from bot.handlers._query_handler import QueryHandler
 from bot.handlers._fallback_handler import FallbackHandler
 from bot.handlers._greeting_handler import GreetingHandler
+from bot.handlers._standalone_intention_handler import StandaloneIntentionHandler
 
 __all__ = [
     "Handler",
@@ -14,4 +15,5 @@ __all__ = [
     "QueryHandler",
     "FallbackHandler",
     "GreetingHandler",
+    "StandaloneIntentionHandler",
 ]
@@ -1,21 +1,27 @@
+import asyncio
+import threading
 from abc import ABC, abstractmethod
-from importlib import resources
-from typing import List
+from queue import Queue
+from typing import Iterator, List, Optional
 
-import tiktoken
 from langchain.prompts import PromptTemplate
 from langchain.chains.base import Chain
 from langchain_core.language_models.chat_models import BaseChatModel
-from langchain.prompts import load_prompt
-from langchain_core.messages.human import HumanMessage
-from langchain_core.messages.ai import AIMessage
 from langchain.chains import LLMChain
 
 from bot import BotConfig
-from bot.data_models import BaseVectorDatabaseResult
+from bot.chat_history import ChatHistoryView
+from bot.completion_cache import completion_cache
+from bot.data_models import BaseVectorDatabaseResult, SearchFilters
+from bot.executor import LLM, VECTOR_QUERY, request_executor
+from bot.llms import get_async_chat_model
+from bot.prompt_registry import prompt_registry
+from bot.tokens import count_tokens, pack_context
 
 config = BotConfig()
 
+STREAM_END = object()
+
 
 class Handler(ABC):
     """
@@ -39,33 +45,153 @@ class Handler(ABC):
         Returns:
             PromptTemplate: The loaded prompt template.
         """
-        filepath = str(resources.files(self.prompts_folder).joinpath(f"{key}.json"))
-        return load_prompt(filepath)
+        return prompt_registry.get(key)
 
-    def predict(self, message) -> str:
+    def predict(
+        self, message, filters: Optional[SearchFilters] = None, context: Optional[str] = None
+    ) -> str:
         """
         Generate a prediction based on the input message.
 
         Args:
             message (str): The input message.
+            filters (Optional[SearchFilters]): The filters applied to the context search.
+            context (Optional[str]): The context, if already retrieved for the message.
+
+        Returns:
+            str: The generated prediction.
+        """
+        params = {}
+        if self.use_chat_history:
+            params.update(dict(history=self.get_chat_history()))
+
+        if self.use_context:
+            if context is None:
+                context = self.get_context(message, filters=filters)
+            params.update(dict(context=context))
+
+        key = self._get_completion_key(message, params)
+        completion = self._get_cached_completion(key, message, params)
+        if completion is None:
+            with request_executor.limit(LLM):
+                completion = self.chain.predict(human_input=message, **params)
+            self._set_cached_completion(key, completion)
+        return completion
+
+    async def apredict(
+        self, message, filters: Optional[SearchFilters] = None, context: Optional[str] = None
+    ) -> str:
+        """
+        Generate a prediction based on the input message, using the async LLM client.
+
+        The chain memory and the caches are read and written in worker threads, so
+        that a summary of the conversation does not block the event loop.
+
+        Args:
+            message (str): The input message.
+            filters (Optional[SearchFilters]): The filters applied to the context search.
+            context (Optional[str]): The context, if already retrieved for the message.
 
         Returns:
             str: The generated prediction.
         """
         params = {}
+        if self.use_chat_history:
+            params.update(dict(history=await asyncio.to_thread(self.get_chat_history)))
+
+        if self.use_context:
+            if context is None:
+                context = await self.aget_context(message, filters=filters)
+            params.update(dict(context=context))
+
+        key = self._get_completion_key(message, params)
+        completion = await asyncio.to_thread(self._get_cached_completion, key, message, params)
+        if completion is None:
+            async with request_executor.alimit(LLM):
+                result = await self.allm.ainvoke(self.prompt.format(human_input=message, **params))
+            completion = result.content
+            await asyncio.to_thread(self._save_completion, key, message, params, completion)
+        return completion
+
+    def stream(
+        self, message, filters: Optional[SearchFilters] = None, context: Optional[str] = None
+    ) -> Iterator[str]:
+        """
+        Generate a prediction based on the input message, yielding its tokens as the
+        language model generates them.
+
+        The complete prediction is saved in the chain memory and in the completion
+        cache once the stream is exhausted.
+
+        Args:
+            message (str): The input message.
+            filters (Optional[SearchFilters]): The filters applied to the context search.
+            context (Optional[str]): The context, if already retrieved for the message.
+
+        Yields:
+            str: The chunks of the prediction.
+        """
+        params = {}
         if self.use_chat_history:
             params.update(dict(history=self.get_chat_history()))
 
         if self.use_context:
-            params.update(dict(context=self.get_context(message)))
+            if context is None:
+                context = self.get_context(message, filters=filters)
+            params.update(dict(context=context))
 
-        return self.chain.predict(human_input=message, **params)
+        key = self._get_completion_key(message, params)
+        completion = self._get_cached_completion(key, message, params)
+        if completion is not None:
+            yield completion
+            return
+
+        chunks = []
+        for chunk in self._stream_completion(self.prompt.format(human_input=message, **params)):
+            chunks.append(chunk)
+            yield chunk
+
+        self._save_completion(key, message, params, "".join(chunks))
+
+    def _stream_completion(self, prompt: str) -> Iterator[str]:
+        """
+        Stream the completion of a prompt. The language model is read by a worker
+        thread, which holds an llm slot only while the model generates, so that a slow
+        consumer of the stream does not keep the slot busy.
+
+        Args:
+            prompt (str): The formatted prompt.
+
+        Yields:
+            str: The chunks of the completion.
+        """
+        chunks: Queue = Queue()
+
+        def produce():
+            try:
+                with request_executor.limit(LLM):
+                    for chunk in self.llm.stream(prompt):
+                        chunks.put(chunk.content)
+            except Exception as err:
+                chunks.put(err)
+            finally:
+                chunks.put(STREAM_END)
+
+        threading.Thread(target=produce, name="newsbot-stream", daemon=True).start()
+        while (chunk := chunks.get()) is not STREAM_END:
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
 
     @property
     @abstractmethod
     def llm(self) -> BaseChatModel:
         pass
 
+    @property
+    def allm(self) -> BaseChatModel:
+        return get_async_chat_model(self.llm_model, self.temperature)
+
     @property
     @abstractmethod
     def prompt_key(self) -> str:
@@ -127,7 +253,8 @@ class Handler(ABC):
 
     def get_chat_history(self) -> str:
         """
-        Get the formatted chat history.
+        Get the formatted chat history, truncated to the configured token budget from
+        the most recent message backwards.
 
         Returns:
             str: The formatted chat history.
@@ -143,16 +270,44 @@ class Handler(ABC):
                 f"You cannot get the chat history if 'use_chat_history=False'"
             )
 
-        return "".join(self._format_history_message(self.memory.chat_memory.messages))
+        return self.chat_history_view.get()
 
-    def get_context(self, query, n_results: int = 10, n_neighbors: int = 1000):
+    @property
+    def chat_history_view(self) -> ChatHistoryView:
+        """
+        Get the view formatting the chat history, which may be shared with the other
+        handlers of the same memory.
+
+        Returns:
+            ChatHistoryView: The chat history view.
+        """
+        if getattr(self, "_chat_history_view", None) is None:
+            self._chat_history_view = ChatHistoryView(
+                self.memory, self.llm_model, max_tokens=config.CHAT_HISTORY_MAX_TOKENS
+            )
+        return self._chat_history_view
+
+    @chat_history_view.setter
+    def chat_history_view(self, view: ChatHistoryView) -> None:
+        self._chat_history_view = view
+
+    def get_context(
+        self,
+        query,
+        n_results: int = 10,
+        n_neighbors: Optional[int] = None,
+        filters: Optional[SearchFilters] = None,
+    ):
         """
         Get context based on the provided query.
 
         Args:
             query (str): The query for generating context.
             n_results (int): The number of results to retrieve.
-            n_neighbors (int): The number of neighbors to consider.
+            n_neighbors (Optional[int]): The number of neighbors to consider. Defaults
+                to the vector database over-fetch policy.
+            filters (Optional[SearchFilters]): The filters applied by the vector
+                database before the similarity search.
 
         Returns:
             str: The generated context.
@@ -166,27 +321,126 @@ class Handler(ABC):
         if not self.use_context:
             raise ValueError(f"You cannot get context if 'use_context=False'")
 
-        results = self.vector_database.get_most_similar(
-            query, n_neighbors=n_neighbors, n_results=n_results
-        )
+        with request_executor.limit(VECTOR_QUERY):
+            results = self.vector_database.get_most_similar(
+                query, n_neighbors=n_neighbors, n_results=n_results, filters=filters
+            )
         return self._set_query_content(results)
 
-    def _format_history_message(self, messages: List[HumanMessage | AIMessage]):
+    async def aget_context(
+        self,
+        query,
+        n_results: int = 10,
+        n_neighbors: Optional[int] = None,
+        filters: Optional[SearchFilters] = None,
+    ):
         """
-        Format a list of messages into a readable format.
+        Get context based on the provided query, without blocking the event loop.
 
         Args:
-            messages (List[HumanMessage | AIMessage]): The list of messages.
+            query (str): The query for generating context.
+            n_results (int): The number of results to retrieve.
+            n_neighbors (Optional[int]): The number of neighbors to consider. Defaults
+                to the vector database over-fetch policy.
+            filters (Optional[SearchFilters]): The filters applied by the vector
+                database before the similarity search.
 
         Returns:
-            List[str]: The formatted messages.
+            str: The generated context.
         """
-        for message in messages:
-            if isinstance(message, HumanMessage):
-                yield f"{config.HUMAN_PREFIX}: {message.content}\n"
 
-            elif isinstance(message, AIMessage):
-                yield f"{config.AI_PREFIX}: {message.content}\n"
+        if not hasattr(self.__class__, "vector_database"):
+            raise AttributeError(
+                f"The class {self.__class__.__name__} does not have the 'vector_database' attribute"
+            )
+
+        if not self.use_context:
+            raise ValueError("You cannot get context if 'use_context=False'")
+
+        async with request_executor.alimit(VECTOR_QUERY):
+            results = await self.vector_database.aget_most_similar(
+                query, n_neighbors=n_neighbors, n_results=n_results, filters=filters
+            )
+        return self._set_query_content(results)
+
+    def shares_context_with(self, other) -> bool:
+        """
+        Check whether the context retrieved by another handler can be used by this one.
+
+        Args:
+            other: The other handler.
+
+        Returns:
+            bool: Whether both handlers use the same context for the same message.
+        """
+        return (
+            self.use_context
+            and getattr(other, "use_context", False)
+            and self.vector_database is other.vector_database
+            and self.llm_model == other.llm_model
+            and self.prompt_max_tokens == other.prompt_max_tokens
+        )
+
+    def _get_completion_key(self, message: str, params: dict) -> Optional[str]:
+        """
+        Get the completion cache key of a prediction, from its formatted prompt.
+
+        Args:
+            message (str): The input message.
+            params (dict): The other prompt variables.
+
+        Returns:
+            Optional[str]: The key, or None if the completion cache is disabled or
+                the prediction is not deterministic.
+        """
+        if completion_cache is None or self.temperature != 0:
+            return None
+
+        prompt = self.prompt.format(human_input=message, **params)
+        return completion_cache.get_key(self.llm_model, self.temperature, prompt)
+
+    def _get_cached_completion(self, key: Optional[str], message: str, params: dict) -> Optional[str]:
+        """
+        Get a cached completion, saving the exchange in the chain memory as the chain
+        would have done.
+
+        Args:
+            key (Optional[str]): The completion cache key.
+            message (str): The input message.
+            params (dict): The other prompt variables.
+
+        Returns:
+            Optional[str]: The completion, or None on a cache miss.
+        """
+        if key is None:
+            return None
+
+        completion = completion_cache.get(key, handler=self.__class__.__name__)
+        if completion is not None:
+            self._save_to_memory(message, params, completion)
+        return completion
+
+    def _save_to_memory(self, message: str, params: dict, completion: str) -> None:
+        """
+        Save an exchange in the chain memory, for predictions not run by the chain.
+
+        Args:
+            message (str): The input message.
+            params (dict): The other prompt variables.
+            completion (str): The prediction.
+        """
+        if self.chain.memory is not None:
+            self.chain.memory.save_context(
+                dict(human_input=message, **params), {self.chain.output_key: completion}
+            )
+
+    def _set_cached_completion(self, key: Optional[str], completion: str) -> None:
+        if key is not None:
+            completion_cache.put(key, completion)
+
+    def _save_completion(self, key: Optional[str], message: str, params: dict, completion: str) -> None:
+        self._set_cached_completion(key, completion)
+        self._save_to_memory(message, params, completion)
 
     def _count_tokens(self, context: str) -> int:
         """
@@ -198,9 +452,7 @@ class Handler(ABC):
         Returns:
             int: The number of tokens.
         """
-        encoding = tiktoken.encoding_for_model(self.llm_model)
-        num_tokens = len(encoding.encode(context))
-        return num_tokens
+        return count_tokens(context, self.llm_model)
 
     def _set_query_content(self, results: List[BaseVectorDatabaseResult]) -> str:
         """
@@ -213,31 +465,42 @@ class Handler(ABC):
             str: The set query content.
         """
         context_list = [res.doc.repr(i + 1) for i, res in enumerate(results)]
-        tokens = self.llm_context_window_size
-        max_tokens = self.prompt_max_tokens
-        while tokens > max_tokens:
-            tokens = self._count_tokens("\n".join(context_list))
-            if tokens >= max_tokens:
-                context_list.pop()
+        token_counts = [
+            res.doc.count_tokens(self.llm_model, order=i + 1) for i, res in enumerate(results)
+        ]
+        context_list = pack_context(
+            context_list,
+            token_counts,
+            max_tokens=self.prompt_max_tokens,
+            separator_tokens=self._count_tokens("\n"),
+        )
         return "\n".join(sorted(context_list))
 
+    def _get_cached_chain(self, **kwargs) -> Chain:
+        """
+        Get the handler chain, building it only on first use or after its prompt
+        template has been reloaded.
+
+        Args:
+            **kwargs: Additional keyword arguments for the LLMChain.
+
+        Returns:
+            Chain: The cached chain.
+        """
+        prompt = self.prompt
+        if getattr(self, "_chain_prompt", None) is not prompt:
+            self._chain = LLMChain(llm=self.llm, prompt=prompt, verbose=self.verbose, **kwargs)
+            self._chain_prompt = prompt
+        return self._chain
+
 
 class PrivateHandler(Handler, ABC):
     @property
     def chain(self) -> Chain:
-        return LLMChain(
-            llm=self.llm,
-            prompt=self.prompt,
-            verbose=self.verbose,
-        )
+        return self._get_cached_chain()
 
 
 class PublicHandler(Handler, ABC):
     @property
     def chain(self) -> Chain:
-        return LLMChain(
-            llm=self.llm,
-            prompt=self.prompt,
-            verbose=self.verbose,
-            memory=self.memory,
-        )
+        return self._get_cached_chain(memory=self.memory)
@@ -1,15 +1,19 @@
+from typing import Optional
+
+
 class FallbackHandler:
     """
     A class representing a standalone handler for processing standalone questions.
     Inherits from PrivateHandler.
     """
 
-    def predict(self) -> str:
+    def predict(self, message: Optional[str] = None, **kwargs) -> str:
         """
         Generate a fallback message based on the input message.
 
         Args:
-            message (str): The input message.
+            message (Optional[str]): The input message.
+            **kwargs: Additional keyword arguments, ignored.
 
         Returns:
             str: The generated message.
@@ -19,3 +23,16 @@ class FallbackHandler:
             "Desculpe, mas não posso responder a essa pergunta. "
             "Algo em que possa ajudar sobre notícias de Poços de Caldas e região?"
         )
+
+    async def apredict(self, message: Optional[str] = None, **kwargs) -> str:
+        """
+        Generate a fallback message based on the input message.
+
+        Args:
+            message (Optional[str]): The input message.
+            **kwargs: Additional keyword arguments, ignored.
+
+        Returns:
+            str: The generated message.
+        """
+        return self.predict(message, **kwargs)
@@ -1,8 +1,14 @@
+import asyncio
 from typing import Optional
-from langchain.chat_models import ChatOpenAI
 from langchain.memory.chat_memory import BaseChatMemory
+from loguru import logger
+from bot import BotConfig
+from bot.llms import get_chat_model
 from bot.handlers import PrivateHandler
 from bot.vector_databases.base import VectorDB
+from bot.intent_classifier import EmbeddingIntentClassifier
+
+config = BotConfig()
 
 
 class IntentionHandler(PrivateHandler):
@@ -24,6 +30,8 @@ class IntentionHandler(PrivateHandler):
         memory: BaseChatMemory,
         temperature: float = 0,
         verbose: bool = True,
+        classifier: Optional[EmbeddingIntentClassifier] = None,
+        classifier_threshold: Optional[float] = None,
     ):
         """
         Initialize the IntentionHandler.
@@ -33,12 +41,75 @@ class IntentionHandler(PrivateHandler):
             memory (BaseChatMemory): The chat memory.
             temperature (float): The temperature for generating responses.
             verbose (bool): Whether to enable verbose mode.
+            classifier (Optional[EmbeddingIntentClassifier]): A local classifier tried
+                before the language model.
+            classifier_threshold (Optional[float]): The minimum confidence of the local
+                classifier for its prediction to be used. Defaults to the configured
+                INTENT_CLASSIFIER_THRESHOLD.
         """
 
         self._llm_model = llm_model
         self._memory = memory
         self._temperature = temperature
         self._verbose = verbose
+        self.classifier = classifier
+        self.classifier_threshold = (
+            config.INTENT_CLASSIFIER_THRESHOLD if classifier_threshold is None else classifier_threshold
+        )
+
+    def predict(self, message, **kwargs) -> str:
+        """
+        Predict the intention of the message, with the local classifier when it is
+        confident enough and with the language model otherwise.
+
+        Args:
+            message (str): The input message.
+            **kwargs: Additional keyword arguments for the language model prediction.
+
+        Returns:
+            str: The predicted intention.
+        """
+        intention = self._classify(message)
+        if intention is not None:
+            return intention
+        return super().predict(message, **kwargs)
+
+    async def apredict(self, message, **kwargs) -> str:
+        """
+        Predict the intention of the message, with the local classifier when it is
+        confident enough and with the language model otherwise.
+
+        Args:
+            message (str): The input message.
+            **kwargs: Additional keyword arguments for the language model prediction.
+
+        Returns:
+            str: The predicted intention.
+        """
+        intention = await asyncio.to_thread(self._classify, message)
+        if intention is not None:
+            return intention
+        return await super().apredict(message, **kwargs)
+
+    def _classify(self, message: str) -> Optional[str]:
+        """
+        Classify the message with the local classifier.
+
+        Args:
+            message (str): The input message.
+
+        Returns:
+            Optional[str]: The intention, or None if there is no classifier or if its
+                confidence is below the threshold.
+        """
+        if self.classifier is None:
+            return None
+
+        intention, confidence = self.classifier.predict(message)
+        logger.debug(f"Intenção local: {intention!r} (confiança {confidence:.3f})")
+        if confidence < self.classifier_threshold:
+            return None
+        return intention
 
     @property
     def temperature(self):
@@ -82,4 +153,4 @@ class IntentionHandler(PrivateHandler):
 
     @property
     def llm(self):
-        return ChatOpenAI(model_name=self.llm_model, temperature=self.temperature)
+        return get_chat_model(self.llm_model, self.temperature)
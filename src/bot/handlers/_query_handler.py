@@ -1,6 +1,6 @@
 from langchain.memory.chat_memory import BaseChatMemory
-from langchain.chat_models import ChatOpenAI
 
+from bot.llms import get_chat_model
 from bot.handlers import PublicHandler
 from bot.vector_databases.base import VectorDB
 
@@ -87,4 +87,4 @@ class QueryHandler(PublicHandler):
 
     @property
     def llm(self):
-        return ChatOpenAI(model_name=self.llm_model, temperature=self.temperature)
+        return get_chat_model(self.llm_model, self.temperature)
@@ -1,6 +1,6 @@
 from typing import Optional
-from langchain.chat_models import ChatOpenAI
 from langchain.memory.chat_memory import BaseChatMemory
+from bot.llms import get_chat_model
 from bot.handlers import PrivateHandler
 from bot.vector_databases.base import VectorDB
 
@@ -72,4 +72,4 @@ class StandaloneHandler(PrivateHandler):
 
     @property
     def llm(self):
-        return ChatOpenAI(model_name=self.llm_model, temperature=self.temperature)
+        return get_chat_model(self.llm_model, self.temperature)
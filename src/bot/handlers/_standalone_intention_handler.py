@@ -0,0 +1,115 @@
+import json
+from typing import Optional, Tuple
+from langchain.memory.chat_memory import BaseChatMemory
+from bot.llms import get_chat_model
+from bot.handlers import PrivateHandler
+from bot.handlers.exceptions import HandlerOutputParsingError
+from bot.vector_databases.base import VectorDB
+
+
+class StandaloneIntentionHandler(PrivateHandler):
+    """
+    A class representing a handler that rewrites the user message as a standalone
+    question and classifies its intention in a single call.
+    Inherits from PrivateHandler.
+    """
+
+    _prompt_key: str = "prompt_standalone_intention"
+    _use_chat_history: bool = True
+    _use_context: bool = False
+    _llm_context_window_size: Optional[int] = None
+    _prompt_max_tokens: Optional[int] = None
+    _vector_database: Optional[VectorDB] = None
+
+    def __init__(
+        self,
+        llm_model: str,
+        memory: BaseChatMemory,
+        temperature: float = 0,
+        verbose: bool = True,
+    ):
+        """
+        Initialize the StandaloneIntentionHandler.
+
+        Args:
+            llm_model (str): The language model for processing messages.
+            memory (BaseChatMemory): The chat memory.
+            temperature (float): The temperature for generating responses.
+            verbose (bool): Whether to enable verbose mode.
+        """
+        self._llm_model = llm_model
+        self._memory = memory
+        self._temperature = temperature
+        self._verbose = verbose
+
+    @staticmethod
+    def parse(response: str) -> Tuple[str, str]:
+        """
+        Parse the JSON answer of the language model.
+
+        Args:
+            response (str): The language model answer.
+
+        Returns:
+            Tuple[str, str]: The standalone question and the intention.
+
+        Raises:
+            HandlerOutputParsingError: If the answer is not a JSON object with a
+                non-empty 'pergunta' and an 'intencao' strings.
+        """
+        start, end = response.find("{"), response.rfind("}")
+        try:
+            parsed = json.loads(response[start:end + 1])
+        except json.JSONDecodeError as err:
+            raise HandlerOutputParsingError(f"Invalid JSON answer: {response!r}") from err
+
+        question = parsed.get("pergunta") if isinstance(parsed, dict) else None
+        intention = parsed.get("intencao") if isinstance(parsed, dict) else None
+        if not isinstance(question, str) or not question.strip() or not isinstance(intention, str):
+            raise HandlerOutputParsingError(f"Missing fields in answer: {response!r}")
+
+        return question.strip(), intention
+
+    @property
+    def temperature(self):
+        return self._temperature
+
+    @property
+    def verbose(self):
+        return self._verbose
+
+    @property
+    def llm_model(self):
+        return self._llm_model
+
+    @property
+    def memory(self):
+        return self._memory
+
+    @property
+    def vector_database(self):
+        return self._vector_database
+
+    @property
+    def prompt_key(self):
+        return self._prompt_key
+
+    @property
+    def use_chat_history(self):
+        return self._use_chat_history
+
+    @property
+    def use_context(self):
+        return self._use_context
+
+    @property
+    def llm_context_window_size(self):
+        return self._llm_context_window_size
+
+    @property
+    def prompt_max_tokens(self):
+        return self._prompt_max_tokens
+
+    @property
+    def llm(self):
+        return get_chat_model(self.llm_model, self.temperature)
@@ -0,0 +1,2 @@
+class HandlerOutputParsingError(Exception):
+    pass
@@ -0,0 +1,244 @@
+import os
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+import pandas as pd
+from loguru import logger
+from pydantic import ValidationError
+
+from bot import BotConfig
+from bot.data_models import News
+from bot.vector_databases.base import NewsVectorDB
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+CONTENT_FOOTER = "Receba as notícias através"
+NEWS_FIELDS = set(News.model_fields) - {"n_tokens", "n_tokens_model"}
+
+Reader = Callable[[Optional[str], int], Iterator[pd.DataFrame]]
+
+
+class IngestSourceNotRecognizedError(Exception):
+    pass
+
+
+def read_csv(path: Optional[str], chunk_size: int) -> Iterator[pd.DataFrame]:
+    with pd.read_csv(path, chunksize=chunk_size) as chunks:
+        yield from chunks
+
+
+def read_jsonl(path: Optional[str], chunk_size: int) -> Iterator[pd.DataFrame]:
+    with pd.read_json(path, lines=True, chunksize=chunk_size) as chunks:
+        yield from chunks
+
+
+def read_parquet(path: Optional[str], chunk_size: int) -> Iterator[pd.DataFrame]:
+    if pq is None:
+        raise ImportError("Reading Parquet files requires pyarrow.")
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+        yield batch.to_pandas()
+
+
+def read_azure_sql(query: Optional[str], chunk_size: int) -> Iterator[pd.DataFrame]:
+    """
+    Read the raw news from the Azure SQL database, by chunks.
+
+    Args:
+        query (Optional[str]): The SQL query. Defaults to every row of the configured
+            raw data table.
+        chunk_size (int): The number of rows of each chunk.
+
+    Yields:
+        pd.DataFrame: The chunks of rows.
+    """
+    import pyodbc
+
+    config = BotConfig()
+    connection_string = (
+        "DRIVER={driver};SERVER={server};DATABASE={database};UID={username};PWD={password};"
+        "Connection Timeout={timeout};"
+    ).format(
+        driver=config.AZURE_SQL_DRIVER,
+        server=config.AZURE_SQL_SERVER,
+        database=config.AZURE_SQL_DATABASE,
+        username=config.AZURE_SQL_USERNAME,
+        password=config.AZURE_SQL_PASSWORD,
+        timeout=config.AZURE_SQL_TIMEOUT,
+    )
+    query = query or f"SELECT * FROM {config.RAW_DATA_SCHEMA}.{config.RAW_DATA_TABLE}"
+
+    connection = pyodbc.connect(connection_string, timeout=config.AZURE_SQL_TIMEOUT)
+    try:
+        yield from pd.read_sql(query, connection, chunksize=chunk_size)
+    finally:
+        connection.close()
+
+
+SOURCES: Dict[str, Reader] = {
+    "csv": read_csv,
+    "jsonl": read_jsonl,
+    "parquet": read_parquet,
+    "azure-sql": read_azure_sql,
+}
+
+EXTENSIONS = {
+    ".csv": "csv",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+}
+
+
+def register_source(label: str, reader: Reader) -> None:
+    """
+    Register a news source, to be read by chunks of rows.
+
+    Args:
+        label (str): The source label.
+        reader (Reader): A function of the source location and the chunk size,
+            yielding data frames with the news columns.
+    """
+    SOURCES[label] = reader
+
+
+def get_source(label: Optional[str], location: Optional[str] = None) -> Reader:
+    """
+    Get the reader of a news source.
+
+    Args:
+        label (Optional[str]): The source label. Defaults to the label matching the
+            file extension of the location.
+        location (Optional[str]): The source location.
+
+    Returns:
+        Reader: The source reader.
+    """
+    if label is None and location is not None:
+        label = EXTENSIONS.get(os.path.splitext(location)[1].lower())
+
+    if label not in SOURCES:
+        raise IngestSourceNotRecognizedError(f"Source '{label or location}' not recognized.")
+
+    return SOURCES[label]
+
+
+def parse_news(frame: pd.DataFrame, min_content_length: int = 0) -> Iterator[Optional[News]]:
+    """
+    Parse the rows of a chunk of raw news into news documents.
+
+    The content is cut at the newsletter footer and rows with a shorter content than
+    the minimum length, or with invalid fields, are skipped.
+
+    Args:
+        frame (pd.DataFrame): The raw news, with the news fields as columns and the
+            text in 'content' or 'document'. Categories are separated by '|'.
+        min_content_length (int): The minimum content length.
+
+    Yields:
+        Optional[News]: The news document of each row, or None if it was skipped.
+    """
+    frame = frame.rename(columns={"content": "document"})
+    frame = frame[[c for c in frame.columns if c in NEWS_FIELDS]]
+    frame = frame.astype(object).where(frame.notna(), None)
+
+    for record in frame.to_dict(orient="records"):
+        document = str(record.get("document") or "").split(CONTENT_FOOTER)[0].strip()
+        if len(document) < max(min_content_length, 1):
+            yield None
+            continue
+
+        record.update(
+            document=document,
+            date=_parse_date(record.get("date")),
+            categories=_parse_categories(record.get("categories")),
+        )
+        try:
+            yield News(**record)
+        except ValidationError as err:
+            logger.debug(f"Notícia {record.get('id')} ignorada: {err.error_count()} campos inválidos")
+            yield None
+
+
+def ingest(
+    vector_database: NewsVectorDB,
+    chunks: Iterable[pd.DataFrame],
+    batch_size: Optional[int] = None,
+    min_content_length: Optional[int] = None,
+) -> Dict[str, float]:
+    """
+    Ingest news into a vector database by batches: the documents of a batch are
+    embedded in a single call and upserted in a single request. The upserts are
+    grouped with bulk_upsert, so that the local store is written once per ingestion.
+
+    Args:
+        vector_database (NewsVectorDB): The vector database.
+        chunks (Iterable[pd.DataFrame]): The chunks of raw news.
+        batch_size (Optional[int]): The number of documents of each batch. Defaults
+            to the configured INGEST_BATCH_SIZE.
+        min_content_length (Optional[int]): The minimum content length of a news
+            document. Defaults to the configured INGEST_MIN_CONTENT_LENGTH.
+
+    Returns:
+        Dict[str, float]: The numbers of read, skipped and ingested documents and of
+            batches, the embedding, upsert and total times, in seconds, and the
+            throughput, in documents per second.
+    """
+    config = BotConfig()
+    batch_size = batch_size or config.INGEST_BATCH_SIZE
+    if min_content_length is None:
+        min_content_length = config.INGEST_MIN_CONTENT_LENGTH
+
+    stats = dict(read=0, skipped=0, ingested=0, batches=0, embedding_time=0.0, upsert_time=0.0)
+    start = perf_counter()
+
+    batch: Dict[str, News] = {}
+    with vector_database.bulk_upsert():
+        for frame in chunks:
+            for news in parse_news(frame, min_content_length):
+                stats["read"] += 1
+                if news is None:
+                    stats["skipped"] += 1
+                    continue
+
+                batch[str(news.id)] = news
+                if len(batch) >= batch_size:
+                    _add_batch(vector_database, list(batch.values()), stats)
+                    batch = {}
+
+        if batch:
+            _add_batch(vector_database, list(batch.values()), stats)
+        flush_start = perf_counter()
+    stats["upsert_time"] += perf_counter() - flush_start
+
+    stats["total_time"] = perf_counter() - start
+    stats["docs_per_second"] = stats["ingested"] / stats["total_time"] if stats["total_time"] else 0.0
+    return stats
+
+
+def _add_batch(vector_database: NewsVectorDB, news: List[News], stats: Dict[str, Any]) -> None:
+    start = perf_counter()
+    embeddings = vector_database.embed_documents([n.document for n in news])
+    embedded = perf_counter()
+    vector_database.add_news(news, embeddings=embeddings)
+
+    stats["embedding_time"] += embedded - start
+    stats["upsert_time"] += perf_counter() - embedded
+    stats["ingested"] += len(news)
+    stats["batches"] += 1
+    logger.info(f"Lote {stats['batches']}: {stats['ingested']} notícias adicionadas")
+
+
+def _parse_date(value: Any) -> Any:
+    return None if value is None else pd.Timestamp(value).date()
+
+
+def _parse_categories(value: Any) -> Optional[List[str]]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.split("|")
+    return [str(c).strip() for c in value if str(c).strip()] or None
@@ -0,0 +1,80 @@
+import json
+from importlib import resources
+from typing import Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from bot.embeddings import Embedding
+
+JSON_ENCODING = "utf-8"
+
+
+def load_intent_examples(filename: str = "intent_examples.json") -> Dict[str, List[str]]:
+    """
+    Load the labelled intent examples shipped with the bot.
+
+    Args:
+        filename (str): The examples file, in the 'bot.data' package.
+
+    Returns:
+        Dict[str, List[str]]: The example messages of each intention label.
+    """
+    filepath = resources.files("bot.data").joinpath(filename)
+    return json.loads(filepath.read_text(encoding=JSON_ENCODING))
+
+
+class EmbeddingIntentClassifier:
+    """
+    A nearest-centroid intent classifier over sentence embeddings.
+
+    Each intention is represented by the normalized mean of the embeddings of its
+    examples. A message gets the label of the most similar centroid, and its confidence
+    is the cosine similarity margin between the best and the second best centroids.
+
+    Messages with a smaller margin than INTENT_CLASSIFIER_THRESHOLD are left to the
+    language model. The threshold trades the share of messages classified locally for
+    their accuracy; benchmarks/intent_classifier.py measures both on the labelled
+    examples, left out one at a time, and should be run again to choose it whenever the
+    examples or the embedder change.
+    """
+
+    def __init__(
+        self,
+        embed_documents: Callable[[Sequence[str]], Sequence[Embedding]],
+        embed_query: Callable[[str], Embedding],
+        examples: Dict[str, List[str]],
+    ):
+        """
+        Initialize the EmbeddingIntentClassifier.
+
+        Args:
+            embed_documents (Callable): The function embedding the examples in batch.
+            embed_query (Callable): The function embedding a message to classify.
+            examples (Dict[str, List[str]]): The example messages of each label.
+        """
+        self.embed_query = embed_query
+        self.labels = list(examples)
+        self.centroids = np.stack(
+            [
+                self._normalize(self._normalize(np.asarray(embed_documents(texts))).mean(axis=0))
+                for texts in examples.values()
+            ]
+        )
+
+    def predict(self, message: str) -> Tuple[str, float]:
+        """
+        Predict the intention of a message.
+
+        Args:
+            message (str): The message.
+
+        Returns:
+            Tuple[str, float]: The intention label and the confidence of the prediction.
+        """
+        similarities = self.centroids @ self._normalize(np.asarray(self.embed_query(message)))
+        best, second = np.argsort(similarities)[::-1][:2]
+        return self.labels[best], float(similarities[best] - similarities[second])
+
+    @staticmethod
+    def _normalize(x: np.ndarray) -> np.ndarray:
+        return x / np.linalg.norm(x, axis=-1, keepdims=True)
@@ -0,0 +1,53 @@
+import asyncio
+import threading
+from functools import lru_cache
+from typing import Dict, Tuple
+from weakref import WeakKeyDictionary
+
+from langchain.chat_models import ChatOpenAI
+
+_async_chat_models: "WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, float], ChatOpenAI]]" = (
+    WeakKeyDictionary()
+)
+_async_chat_models_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def get_chat_model(model_name: str, temperature: float) -> ChatOpenAI:
+    """
+    Get the chat model shared by every handler with the same settings.
+
+    Each ChatOpenAI instance owns its own OpenAI HTTP client, so sharing one instance
+    per (model, temperature) reuses its pooled keep-alive connections across calls.
+
+    Args:
+        model_name (str): The language model name.
+        temperature (float): The temperature for generating responses.
+
+    Returns:
+        ChatOpenAI: The shared chat model.
+    """
+    return ChatOpenAI(model_name=model_name, temperature=temperature)
+
+
+def get_async_chat_model(model_name: str, temperature: float) -> ChatOpenAI:
+    """
+    Get the chat model shared by every handler with the same settings on the running
+    event loop.
+
+    The pooled connections of the async OpenAI HTTP client are bound to the event loop
+    that opened them, so each loop gets its own instance, released with the loop.
+
+    Args:
+        model_name (str): The language model name.
+        temperature (float): The temperature for generating responses.
+
+    Returns:
+        ChatOpenAI: The chat model of the running event loop.
+    """
+    loop = asyncio.get_running_loop()
+    with _async_chat_models_lock:
+        models = _async_chat_models.setdefault(loop, {})
+        if (model_name, temperature) not in models:
+            models[model_name, temperature] = ChatOpenAI(model_name=model_name, temperature=temperature)
+        return models[model_name, temperature]
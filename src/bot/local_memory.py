@@ -1,18 +1,40 @@
 import os
 import json
-from typing import Optional
+from typing import List, Optional
 from langchain.memory import ChatMessageHistory
+from langchain.schema.messages import BaseMessage, messages_from_dict, messages_to_dict
 
 
 JSON_ENCODING = "utf-8"
+READ_BLOCK_SIZE = 65536
 
 
 class LocalMemory:
+    """
+    A chat message history persisted in a local JSONL journal, one message per line.
+
+    Each update appends only the new messages, so a turn costs the same whatever the
+    conversation length, and a crash mid-write can only tear the last line, which is
+    skipped on load. Every `compact_every` appended messages, the journal is rewritten
+    with its last `max_messages` messages to a temporary file that atomically replaces
+    it. Loading reads only the last `load_last` messages, from the end of the file.
+    """
+
     def __init__(
-        self, localpath: str, message_history: Optional[ChatMessageHistory] = None
+        self,
+        localpath: str,
+        message_history: Optional[ChatMessageHistory] = None,
+        load_last: Optional[int] = None,
+        max_messages: Optional[int] = None,
+        compact_every: int = 100,
     ):
         self.localpath = localpath
         self.message_history = message_history
+        self.load_last = load_last
+        self.max_messages = max_messages
+        self.compact_every = compact_every
+        self._appended = 0
+        self._last_persisted: Optional[BaseMessage] = None
 
         if self.message_history is not None:
             self.dump()
@@ -29,19 +51,75 @@ class LocalMemory:
         return str(self.message_history)
 
     def dump(self):
-        atts = self.message_history.dict()
-        with open(self.localpath, "w", encoding=JSON_ENCODING) as f:
-            json.dump(atts, f)
+        messages = self.message_history.messages
+        if self.max_messages is not None:
+            messages = messages[-self.max_messages:]
+
+        tmp_path = f"{self.localpath}.tmp"
+        with open(tmp_path, "w", encoding=JSON_ENCODING) as f:
+            f.writelines(self._format_record(m) for m in messages_to_dict(messages))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.localpath)
+
+        self._appended = 0
+        self._last_persisted = self.message_history.messages[-1] if messages else None
 
     def update(self, message_history):
-        self.message_history = message_history
-        self.dump()
+        if message_history is not self.message_history:
+            self.message_history = message_history
+            self.dump()
+            return
+
+        new_messages = self._get_new_messages()
+        if new_messages is None:
+            self.dump()
+            return
+
+        if new_messages:
+            with open(self.localpath, "a", encoding=JSON_ENCODING) as f:
+                f.writelines(self._format_record(m) for m in messages_to_dict(new_messages))
+            self._appended += len(new_messages)
+            self._last_persisted = new_messages[-1]
+
+        if self._appended >= self.compact_every:
+            self.compact()
+
+    def compact(self):
+        records = self._read_records(self.max_messages)
+        tmp_path = f"{self.localpath}.tmp"
+        with open(tmp_path, "w", encoding=JSON_ENCODING) as f:
+            f.writelines(self._format_record(r) for r in records)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.localpath)
+        self._appended = 0
 
     def clear(self):
         self.message_history = ChatMessageHistory(messages=[])
+        self._appended = 0
+        self._last_persisted = None
         if self._check_if_local_file_exists():
             os.remove(self.localpath)
 
+    def _get_new_messages(self) -> Optional[List[BaseMessage]]:
+        """
+        Get the messages added to the history since the last write. The history may
+        have lost its oldest messages in between, e.g. pruned into a summary.
+
+        Returns:
+            Optional[List[BaseMessage]]: The new messages, or None if the last written
+                message is no longer in the history, so it must be written again whole.
+        """
+        messages = self.message_history.messages
+        if self._last_persisted is None:
+            return list(messages)
+
+        for i in range(len(messages) - 1, -1, -1):
+            if messages[i] is self._last_persisted:
+                return messages[i + 1:]
+        return None
+
     def _check_if_local_file_exists(self):
         return os.path.exists(self.localpath)
 
@@ -52,15 +130,94 @@ class LocalMemory:
 
     def _get_local_memory(self):
         try:
-            with open(self.localpath, "r", encoding=JSON_ENCODING) as f:
-                local_memory_attrs = json.load(f)
-            return ChatMessageHistory(**local_memory_attrs)
+            records = self._read_records(self.load_last)
         except FileNotFoundError:
             raise LocalMemoryNotFoundError(f"File {self.localpath} not found.")
 
+        if self._has_torn_tail():
+            self.compact()
+
+        message_history = ChatMessageHistory(messages=messages_from_dict(records))
+        self._last_persisted = message_history.messages[-1] if message_history.messages else None
+        return message_history
+
     def _create_local_memory(self):
-        with open(self.localpath, "w", encoding=JSON_ENCODING) as f:
-            json.dump({}, f)
+        open(self.localpath, "w", encoding=JSON_ENCODING).close()
+        return ChatMessageHistory()
+
+    def _has_torn_tail(self) -> bool:
+        with open(self.localpath, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() == 0:
+                return False
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b"\n"
+
+    def _read_records(self, last: Optional[int] = None) -> List[dict]:
+        """
+        Read the message records of the journal, skipping a torn last line. A file in
+        the former single JSON document format is read and converted to a journal.
+
+        Args:
+            last (Optional[int]): The number of records to read from the end of the
+                file. Defaults to every record.
+
+        Returns:
+            List[dict]: The message records, in order.
+        """
+        lines = self._read_lines() if last is None else self._read_last_lines(last + 1)
+
+        records = []
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if "type" not in record:
+                return self._convert_legacy_file(record, last)
+            records.append(record)
+
+        return records if last is None else records[-last:] if last else []
+
+    def _convert_legacy_file(self, attrs: dict, last: Optional[int]) -> List[dict]:
+        records = messages_to_dict(ChatMessageHistory(**attrs).messages)
+        with open(f"{self.localpath}.tmp", "w", encoding=JSON_ENCODING) as f:
+            f.writelines(self._format_record(r) for r in records)
+        os.replace(f"{self.localpath}.tmp", self.localpath)
+        return records if last is None else records[-last:] if last else []
+
+    def _read_lines(self) -> List[str]:
+        with open(self.localpath, "r", encoding=JSON_ENCODING) as f:
+            return [line for line in f if line.strip()]
+
+    def _read_last_lines(self, n: int) -> List[str]:
+        """
+        Read the last lines of the journal, reading the file backwards by blocks.
+
+        Args:
+            n (int): The number of lines.
+
+        Returns:
+            List[str]: The last non-empty lines, in order.
+        """
+        with open(self.localpath, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            data = b""
+            while position > 0 and data.count(b"\n") <= n:
+                size = min(READ_BLOCK_SIZE, position)
+                position -= size
+                f.seek(position)
+                data = f.read(size) + data
+
+        lines = [line for line in data.decode(JSON_ENCODING).splitlines() if line.strip()]
+        if position > 0:
+            lines = lines[1:]
+        return lines[-n:]
+
+    @staticmethod
+    def _format_record(record: dict) -> str:
+        return json.dumps(record, ensure_ascii=False) + "\n"
 
 
 class LocalMemoryNotFoundError(Exception):
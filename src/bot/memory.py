@@ -0,0 +1,166 @@
+from concurrent import futures
+from concurrent.futures import Executor, Future
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain.memory import ConversationSummaryBufferMemory
+from langchain.memory.chat_memory import BaseChatMemory
+from langchain.pydantic_v1 import Field, PrivateAttr
+from langchain.schema.messages import BaseMessage
+from loguru import logger
+
+from bot.executor import LLM, ExecutorBusyError, request_executor
+
+
+class BackgroundSummaryBufferMemory(ConversationSummaryBufferMemory):
+    """
+    A ConversationSummaryBufferMemory summarizing the messages pruned from its buffer
+    in a background worker, after the answer was returned, instead of while saving
+    the exchange.
+
+    The worker only summarizes a snapshot of the buffer, taken when the exchange is
+    saved, and never touches the chat memory. The summary is applied by the next call
+    of the session, on its own thread, removing the summarized messages only if they
+    are still at the start of the buffer. Until then, the memory serves its raw buffer.
+    When the executor queue is full, or without an executor, the memory prunes
+    synchronously, as its parent.
+    """
+
+    executor: Optional[Executor] = None
+    summary_stats: Dict[str, int] = Field(
+        default_factory=lambda: dict(background=0, critical_path=0, raw_buffer_reads=0, failed=0)
+    )
+
+    _pending: Optional[Future] = PrivateAttr(default=None)
+
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        """
+        Save an exchange in the buffer, and schedule the summarization of the messages
+        overflowing it.
+
+        Args:
+            inputs (Dict[str, Any]): The chain inputs.
+            outputs (Dict[str, str]): The chain outputs.
+        """
+        self._apply_summary()
+        BaseChatMemory.save_context(self, inputs, outputs)
+        self._schedule_summary()
+
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        self._apply_summary()
+        if self.is_summarizing:
+            self.summary_stats["raw_buffer_reads"] += 1
+        return super().load_memory_variables(inputs)
+
+    def prune(self) -> None:
+        if self.llm.get_num_tokens_from_messages(self.chat_memory.messages) > self.max_token_limit:
+            self.summary_stats["critical_path"] += 1
+        super().prune()
+
+    @property
+    def is_summarizing(self) -> bool:
+        return self._pending is not None and not self._pending.done()
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """
+        Wait for the summaries being computed in the background, if any, and apply
+        them, until the buffer fits in the token limit.
+
+        Args:
+            timeout (Optional[float]): The maximum waiting time for each summary, in
+                seconds.
+        """
+        while self._pending is not None:
+            done, _ = futures.wait([self._pending], timeout=timeout)
+            if not done:
+                return
+            self._apply_summary()
+
+    def clear(self) -> None:
+        self.wait()
+        super().clear()
+
+    def _schedule_summary(self) -> None:
+        """
+        Submit the summarization of a snapshot of the buffer, unless one is pending.
+        Without an executor, or when its queue is full, prune synchronously.
+        """
+        if self._pending is not None:
+            return
+
+        if self.executor is None:
+            self.prune()
+            return
+
+        try:
+            self._pending = self.executor.submit(
+                self._summarize, list(self.chat_memory.messages), self.moving_summary_buffer
+            )
+        except ExecutorBusyError:
+            self.prune()
+
+    def _summarize(
+        self, messages: List[BaseMessage], summary: str
+    ) -> Optional[Tuple[List[BaseMessage], str]]:
+        """
+        Summarize the messages overflowing a snapshot of the buffer.
+
+        Args:
+            messages (List[BaseMessage]): The snapshot of the buffer messages.
+            summary (str): The summary of the messages pruned before.
+
+        Returns:
+            Optional[Tuple[List[BaseMessage], str]]: The summarized messages and the new
+                summary, or None if the buffer fits in the token limit.
+        """
+        pruned = self._get_overflow(messages)
+        if not pruned:
+            return None
+
+        with request_executor.limit(LLM):
+            return pruned, self.predict_new_summary(pruned, summary)
+
+    def _apply_summary(self) -> None:
+        """
+        Apply the summary computed in the background, once done: remove the summarized
+        messages from the start of the buffer, replace the summary, and schedule the
+        summary of the messages saved meanwhile.
+        """
+        pending = self._pending
+        if pending is None or not pending.done():
+            return
+
+        self._pending = None
+        try:
+            result = pending.result()
+        except Exception as err:
+            self.summary_stats["failed"] += 1
+            logger.warning(f"Resumo da conversa adiado: {err}")
+            return
+
+        if result is None:
+            return
+
+        pruned, summary = result
+        messages = self.chat_memory.messages
+        if len(messages) < len(pruned) or not all(m is p for m, p in zip(messages, pruned)):
+            return
+
+        del messages[: len(pruned)]
+        self.moving_summary_buffer = summary
+        self.summary_stats["background"] += 1
+        self._schedule_summary()
+
+    def _get_overflow(self, messages: List[BaseMessage]) -> List[BaseMessage]:
+        """
+        Get the oldest messages to remove so that the buffer fits in the token limit.
+
+        Args:
+            messages (List[BaseMessage]): The buffer messages, consumed.
+
+        Returns:
+            List[BaseMessage]: The overflowing messages, in order.
+        """
+        pruned = []
+        while messages and self.llm.get_num_tokens_from_messages(messages) > self.max_token_limit:
+            pruned.append(messages.pop(0))
+        return pruned
@@ -1,22 +1,41 @@
+import asyncio
+from concurrent.futures import Future
+from typing import Dict, Optional, Tuple
 from uuid import uuid4
 
-from langchain.memory import ConversationSummaryBufferMemory, ChatMessageHistory
+from langchain.memory import ChatMessageHistory
 from langchain.llms import OpenAI
+from langchain.schema import BaseChatMessageHistory
 from loguru import logger
 
 from bot import BotConfig
-from bot.vector_databases import get_vector_database
+from bot.chat_history import ChatHistoryView
+from bot.data_models import SearchFilters
+from bot.executor import ExecutorBusyError
+from bot.pipeline import AskState, Pipeline, RecentResults, Stage, has_anaphora
+from bot.local_memory import LocalMemory
+from bot.memory import BackgroundSummaryBufferMemory
+from bot.resources import BotResources
 from bot.handlers import (
+    Handler,
     StandaloneHandler,
     QueryHandler,
     IntentionHandler,
     GreetingHandler,
     FallbackHandler,
+    StandaloneIntentionHandler,
 )
+from bot.handlers.exceptions import HandlerOutputParsingError
 
 
 config = BotConfig()
 
+BUSY_RESPONSE = (
+    "Estou recebendo muitas perguntas no momento. Por favor, tente novamente em instantes."
+)
+
+REWRITE_KEY_TURNS = 2
+
 
 class NewsBot:
 
@@ -24,20 +43,42 @@ class NewsBot:
     A class representing a News Bot for handling user queries and interactions.
     """
 
-    def __init__(self, verbose: bool = True):
+    def __init__(
+        self,
+        verbose: bool = True,
+        resources: Optional[BotResources] = None,
+        local_filepath: Optional[str] = None,
+        chat_history: Optional[BaseChatMessageHistory] = None,
+    ):
         """
         Initialize the NewsBot.
 
         Args:
             verbose (bool): Whether to enable verbose mode.
+            resources (Optional[BotResources]): The heavy resources, shared with the
+                other bots of the process. Defaults to resources of its own.
+            local_filepath (Optional[str]): The file the conversation is persisted in,
+                if any. A conversation already in the file is resumed.
+            chat_history (Optional[BaseChatMessageHistory]): The chat history of the
+                conversation, e.g. a StoredChatMessageHistory persisting it in a
+                ConversationStore. Takes precedence over local_filepath.
         """
         self.verbose = verbose
+        self.resources = resources or BotResources()
+        self._executor = self.resources.executor
+        self.vdb = self.resources.vector_database
+        self.answer_cache = self.resources.answer_cache
 
-        self.vdb = get_vector_database("chroma")
+        self.local_memory = None if chat_history else self._set_local_memory(local_filepath)
+        if chat_history is None:
+            chat_history = (
+                self.local_memory.message_history if self.local_memory else ChatMessageHistory()
+            )
 
-        self.memory = ConversationSummaryBufferMemory(
+        self.memory = BackgroundSummaryBufferMemory(
             llm=OpenAI(temperature=0),
-            chat_history=ChatMessageHistory(),
+            executor=self.resources.summary_executor if config.BACKGROUND_SUMMARY else None,
+            chat_memory=chat_history,
             return_messages=True,
             memory_key="chat_history",
             input_key="human_input",
@@ -46,44 +87,464 @@ class NewsBot:
         )
 
         self._set_handlers()
+        self._recent_rewrites = RecentResults(config.STANDALONE_RECENT_REWRITES)
+        self.pipeline = self._set_pipeline()
 
-    def ask(self, message: str):
+    def ask(self, message: str, filters: Optional[SearchFilters | dict] = None):
         """
         Execute the NewsBot to handle user input.
 
         Args:
             message (str): The user input message.
+            filters (Optional[SearchFilters | dict]): The filters applied to the news
+                search, e.g. the categories and dates selected in the UI.
+
+        Returns:
+            dict: A dictionary containing the response and execution ID, flagged as
+                busy when the bot is saturated and the message was rejected.
+        """
+        if isinstance(filters, dict):
+            filters = SearchFilters(**filters)
+
+        try:
+            state = self.pipeline.run(AskState(message=message, filters=filters))
+        except ExecutorBusyError as err:
+            logger.warning(f"Pergunta recusada: {err}")
+            return dict(response=BUSY_RESPONSE, execution_id=uuid4().hex, busy=True)
+        self._persist_memory()
+
+        return dict(response=state.response, execution_id=uuid4().hex)
+
+    async def aask(self, message: str, filters: Optional[SearchFilters | dict] = None):
+        """
+        Execute the NewsBot to handle user input without blocking the event loop.
+
+        Args:
+            message (str): The user input message.
+            filters (Optional[SearchFilters | dict]): The filters applied to the news
+                search, e.g. the categories and dates selected in the UI.
+
+        Returns:
+            dict: A dictionary containing the response and execution ID, flagged as
+                busy when the bot is saturated and the message was rejected.
+        """
+        if isinstance(filters, dict):
+            filters = SearchFilters(**filters)
+
+        state = AskState(message=message, filters=filters)
+        try:
+            await self.pipeline.arun(state)
+        except ExecutorBusyError as err:
+            logger.warning(f"Pergunta recusada: {err}")
+            return dict(response=BUSY_RESPONSE, execution_id=uuid4().hex, busy=True)
+        finally:
+            self._discard_speculative_context(state.speculative_context)
+        self._persist_memory()
+
+        return dict(response=state.response, execution_id=uuid4().hex)
+
+    def ask_stream(self, message: str, filters: Optional[SearchFilters | dict] = None):
+        """
+        Execute the NewsBot to handle user input, streaming the answer.
+
+        Every stage but the answer runs before returning, and the answer tokens are
+        yielded by the final handler as they are generated.
+
+        Args:
+            message (str): The user input message.
+            filters (Optional[SearchFilters | dict]): The filters applied to the news
+                search, e.g. the categories and dates selected in the UI.
+
+        Returns:
+            dict: A dictionary containing the response chunks iterator and execution ID,
+                flagged as busy when the bot is saturated and the message was rejected.
+        """
+        if isinstance(filters, dict):
+            filters = SearchFilters(**filters)
+
+        try:
+            state = self.pipeline.run(AskState(message=message, filters=filters, stream=True))
+        except ExecutorBusyError as err:
+            logger.warning(f"Pergunta recusada: {err}")
+            return dict(response=iter([BUSY_RESPONSE]), execution_id=uuid4().hex, busy=True)
+        if state.response_stream is None:
+            self._persist_memory()
+        response = state.response_stream or iter([state.response])
+
+        return dict(response=response, execution_id=uuid4().hex)
+
+    @property
+    def pipeline_stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Get how often each pipeline stage was run or skipped, and why.
+
+        Returns:
+            Dict[str, Dict[str, int]]: The counters of each stage.
+        """
+        return self.pipeline.stats
+
+    def _run_standalone_intention(self, state: AskState) -> None:
+        response = self.standalone_intention_handler.predict(state.message)
+        state.improved_message, state.intention = self._parse_standalone_intention(response)
+
+    async def _arun_standalone_intention(self, state: AskState) -> None:
+        response = await self.standalone_intention_handler.apredict(state.message)
+        state.improved_message, state.intention = self._parse_standalone_intention(response)
+
+    def _run_standalone(self, state: AskState) -> None:
+        state.improved_message = self.standalone_handler.predict(state.message)
+        self._recent_rewrites.put(self._get_rewrite_key(state.message), state.improved_message)
+
+    async def _arun_standalone(self, state: AskState) -> None:
+        state.improved_message = await self.standalone_handler.apredict(state.message)
+        self._recent_rewrites.put(self._get_rewrite_key(state.message), state.improved_message)
+
+    def _skip_standalone(self, state: AskState) -> None:
+        if state.improved_message is None:
+            rewrite = self._get_recent_rewrite(state.message)
+            state.improved_message = rewrite or state.message
+
+    def _run_answer_cache(self, state: AskState) -> None:
+        state.question_embedding = self.vdb.embed_query(state.improved_message)
+        state.collection_version = self.vdb.collection_version
+        self._read_answer_cache(state)
+
+    async def _arun_answer_cache(self, state: AskState) -> None:
+        state.question_embedding = await asyncio.to_thread(
+            self.vdb.embed_query, state.improved_message
+        )
+        state.collection_version = await asyncio.to_thread(lambda: self.vdb.collection_version)
+        self._read_answer_cache(state)
+
+    def _read_answer_cache(self, state: AskState) -> None:
+        """
+        Answer with the cached answer of a similar question, if any, recording the
+        exchange in the chat memory as the query handler would.
+
+        Args:
+            state (AskState): The pipeline state, with the question embedding and the
+                collection version.
+        """
+        state.response = self.answer_cache.get(
+            state.question_embedding, filters=state.filters, version=state.collection_version
+        )
+        if state.response is not None:
+            logger.debug(f"Resposta em cache: {state.improved_message}")
+            self.memory.save_context(
+                {"human_input": state.improved_message}, {"text": state.response}
+            )
+
+    def _write_answer_cache(self, state: AskState, handler) -> None:
+        if handler is self.query_handler and state.question_embedding is not None:
+            self.answer_cache.put(
+                state.question_embedding,
+                state.response,
+                filters=state.filters,
+                version=state.collection_version,
+            )
+
+    def _run_speculative_retrieval(self, state: AskState) -> None:
+        state.speculative_context = self._executor.submit(
+            self.query_handler.get_context, state.improved_message, filters=state.filters
+        )
+
+    async def _arun_speculative_retrieval(self, state: AskState) -> None:
+        state.speculative_context = asyncio.create_task(
+            self.query_handler.aget_context(state.improved_message, filters=state.filters)
+        )
+
+    def _run_intention(self, state: AskState) -> None:
+        state.intention = self.intention_handler.predict(state.improved_message)
+
+    async def _arun_intention(self, state: AskState) -> None:
+        state.intention = await self.intention_handler.apredict(state.improved_message)
+
+    def _run_answer(self, state: AskState) -> None:
+        logger.debug(f"Pergunta original: {state.message}")
+        logger.debug(f"Pergunta melhorada: {state.improved_message}")
+        logger.debug(f"Intenção: {state.intention}")
+
+        handler = self._route(state.intention)
+        context = self._resolve_speculative_context(handler, state.speculative_context)
+        if state.stream and isinstance(handler, Handler):
+            state.response_stream = self._stream_answer(state, handler, context)
+            return
+
+        state.response = handler.predict(
+            state.improved_message, filters=state.filters, context=context
+        )
+        self._write_answer_cache(state, handler)
+
+    def _stream_answer(self, state: AskState, handler: Handler, context: Optional[str]):
+        chunks = []
+        try:
+            for chunk in handler.stream(
+                state.improved_message, filters=state.filters, context=context
+            ):
+                chunks.append(chunk)
+                yield chunk
+        except ExecutorBusyError as err:
+            logger.warning(f"Pergunta recusada: {err}")
+            yield BUSY_RESPONSE
+            return
+
+        state.response = "".join(chunks)
+        self._write_answer_cache(state, handler)
+        self._persist_memory()
+
+    def _set_local_memory(self, local_filepath: Optional[str]) -> Optional[LocalMemory]:
+        """
+        Open the local journal of the conversation, resuming its last messages.
+
+        Args:
+            local_filepath (Optional[str]): The journal file, if any.
 
         Returns:
-            dict: A dictionary containing the response and execution ID.
+            Optional[LocalMemory]: The local memory, or None.
         """
-        improved_message = self.standalone_handler.predict(message)
-        logger.debug(f"Pergunta original: {message}")
-        logger.debug(f"Pergunta melhorada: {improved_message}")
+        if local_filepath is None:
+            return None
 
-        intention = self.intention_handler.predict(improved_message)
-        logger.debug(f"Intenção: {intention}")
+        return LocalMemory(
+            local_filepath,
+            load_last=config.LOCAL_MEMORY_LOAD_LAST,
+            max_messages=config.LOCAL_MEMORY_MAX_MESSAGES,
+            compact_every=config.LOCAL_MEMORY_COMPACT_EVERY,
+        )
+
+    def _persist_memory(self) -> None:
+        if self.local_memory is not None:
+            self.local_memory.update(self.memory.chat_memory)
 
+    async def _arun_answer(self, state: AskState) -> None:
+        logger.debug(f"Pergunta original: {state.message}")
+        logger.debug(f"Pergunta melhorada: {state.improved_message}")
+        logger.debug(f"Intenção: {state.intention}")
+
+        handler = self._route(state.intention)
+        context = None
+        speculative_context, state.speculative_context = state.speculative_context, None
+        if speculative_context is not None:
+            if self._uses_speculative_context(handler):
+                context = await speculative_context
+            else:
+                self._discard_speculative_context(speculative_context)
+        state.response = await handler.apredict(
+            state.improved_message, filters=state.filters, context=context
+        )
+        self._write_answer_cache(state, handler)
+
+    def _has_empty_history(self, state: AskState) -> bool:
+        return not self.memory.chat_memory.messages and not self.memory.moving_summary_buffer
+
+    def _get_rewrite_key(self, message: str, end: Optional[int] = None) -> Tuple[str, int]:
+        """
+        Get the key of a standalone rewrite: the message and the last turns of the chat
+        history it was rewritten against. The summary is left out, so that a background
+        summary does not change the key.
+
+        Args:
+            message (str): The user message.
+            end (Optional[int]): The number of history messages considered. Defaults
+                to the whole history.
+
+        Returns:
+            Tuple[str, int]: The normalized message and a hash of the last turns.
+        """
+        messages = self.memory.chat_memory.messages
+        end = len(messages) if end is None else end
+        turns = tuple(m.content for m in messages[max(0, end - 2 * REWRITE_KEY_TURNS):end])
+        return _normalize(message), hash(turns)
+
+    def _get_recent_rewrite(self, message: str) -> Optional[str]:
+        """
+        Get the recent standalone rewrite of a message against the same last turns.
+
+        A message repeated right after its own answer is matched too: its last
+        exchange holds the rewrite as question, and is left out of the key.
+
+        Args:
+            message (str): The user message.
+
+        Returns:
+            Optional[str]: The rewrite, or None if the message was not rewritten.
+        """
+        rewrite = self._recent_rewrites.get(self._get_rewrite_key(message))
+        messages = self.memory.chat_memory.messages
+        if rewrite is None and len(messages) >= 2:
+            previous = self._recent_rewrites.get(self._get_rewrite_key(message, len(messages) - 2))
+            if previous is not None and _normalize(messages[-2].content) == _normalize(previous):
+                rewrite = previous
+        return rewrite
+
+    def _set_pipeline(self) -> Pipeline:
+        """
+        Build the pipeline answering a message, with the conditions under which each
+        stage is skipped because it cannot change the result.
+
+        Returns:
+            Pipeline: The pipeline.
+        """
+        intention_known = ("intention_known", lambda state: state.intention is not None)
+        answered = ("answered", lambda state: state.response is not None)
+        return Pipeline(
+            [
+                Stage(
+                    "standalone_intention",
+                    self._run_standalone_intention,
+                    self._arun_standalone_intention,
+                    skip_conditions=[
+                        ("disabled", lambda state: not config.COMBINED_STANDALONE_INTENTION),
+                    ],
+                ),
+                Stage(
+                    "standalone",
+                    self._run_standalone,
+                    self._arun_standalone,
+                    skip_conditions=[
+                        ("resolved", lambda state: state.improved_message is not None),
+                        ("empty_history", self._has_empty_history),
+                        (
+                            "self_contained",
+                            lambda state: config.STANDALONE_SKIP_SELF_CONTAINED
+                            and not has_anaphora(state.message),
+                        ),
+                        (
+                            "seen",
+                            lambda state: self._get_recent_rewrite(state.message) is not None,
+                        ),
+                    ],
+                    on_skip=self._skip_standalone,
+                ),
+                Stage(
+                    "answer_cache",
+                    self._run_answer_cache,
+                    self._arun_answer_cache,
+                    skip_conditions=[("disabled", lambda state: not config.ANSWER_CACHE)],
+                ),
+                Stage(
+                    "speculative_retrieval",
+                    self._run_speculative_retrieval,
+                    self._arun_speculative_retrieval,
+                    skip_conditions=[
+                        answered,
+                        ("disabled", lambda state: not config.SPECULATIVE_RETRIEVAL),
+                        intention_known,
+                    ],
+                ),
+                Stage(
+                    "intention",
+                    self._run_intention,
+                    self._arun_intention,
+                    skip_conditions=[answered, intention_known],
+                ),
+                Stage("answer", self._run_answer, self._arun_answer, skip_conditions=[answered]),
+            ]
+        )
+
+    def _route(self, intention: str):
+        """
+        Get the handler answering a message of the given intention.
+
+        Args:
+            intention (str): The intention predicted by the IntentionHandler.
+
+        Returns:
+            The handler for the intention.
+        """
         handlers = {
             "inicio de conversa": self.greeting_handler,
             "consulta de conteudo": self.query_handler,
             "": self.fallback_handler,
         }
 
-        response = None
         for category, handler in handlers.items():
             if category in intention.lower().replace("ú", "u").replace("í", "i"):
-                response = handler.predict(improved_message)
-                break
+                return handler
 
-        return dict(response=response, execution_id=uuid4().hex)
+    def _uses_speculative_context(self, handler) -> bool:
+        """
+        Check whether a handler can use the context retrieved speculatively for the
+        QueryHandler while the intention was being classified.
+
+        Args:
+            handler: The handler routed to.
+
+        Returns:
+            bool: Whether the speculative context can be used.
+        """
+        return isinstance(handler, Handler) and handler.shares_context_with(self.query_handler)
+
+    def _resolve_speculative_context(
+        self, handler, speculative_context: Optional[Future]
+    ) -> Optional[str]:
+        """
+        Wait for the speculative context if the handler uses it, or discard it.
+
+        A retrieval still queued because every worker is busy is cancelled, and the
+        handler retrieves its context inline instead of waiting behind other sessions.
+
+        Args:
+            handler: The handler routed to.
+            speculative_context (Optional[Future]): The speculative context retrieval.
+
+        Returns:
+            Optional[str]: The context, or None if the handler has to get its own.
+        """
+        if speculative_context is None:
+            return None
+
+        if self._uses_speculative_context(handler):
+            if speculative_context.cancel():
+                return None
+            return speculative_context.result()
+
+        speculative_context.cancel()
+        return None
+
+    @staticmethod
+    def _discard_speculative_context(speculative_context: Optional[asyncio.Task]) -> None:
+        """
+        Cancel a speculative context retrieval that is no longer needed, and retrieve
+        its exception once done, so that a retrieval which already failed is not
+        reported as an exception never retrieved.
+
+        Args:
+            speculative_context (Optional[asyncio.Task]): The speculative context
+                retrieval, possibly already done.
+        """
+        if speculative_context is None:
+            return
+
+        speculative_context.cancel()
+        speculative_context.add_done_callback(_retrieve_exception)
+
+    def _parse_standalone_intention(self, response: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Parse the answer of the combined standalone and intention handler.
+
+        Args:
+            response (str): The combined handler answer.
+
+        Returns:
+            Tuple[Optional[str], Optional[str]]: The standalone question and the
+                intention, or (None, None) if the answer cannot be parsed, so that the
+                separate handlers are called instead.
+        """
+        try:
+            return self.standalone_intention_handler.parse(response)
+        except HandlerOutputParsingError as err:
+            logger.warning(f"Resposta combinada inválida, usando chamadas separadas: {err}")
+            return None, None
 
     def _set_handlers(self) -> None:
         """
         Initialize and set handlers for the NewsBot.
 
-        This method initializes various handlers such as StandaloneHandler, IntentionHandler,
-        QueryHandler, GreetingHandler, and FallbackHandler with specified configurations.
+        This method initializes various handlers such as StandaloneHandler,
+        StandaloneIntentionHandler, IntentionHandler, QueryHandler, GreetingHandler,
+        and FallbackHandler with specified configurations. The handlers share a single
+        chat history view, so the history is formatted once per message.
 
         Returns:
             None
@@ -93,10 +554,17 @@ class NewsBot:
             memory=self.memory,
             verbose=self.verbose,
         )
+        self.standalone_intention_handler = StandaloneIntentionHandler(
+            llm_model=config.LLM_MODEL_NAME,
+            memory=self.memory,
+            verbose=self.verbose,
+        )
         self.intention_handler = IntentionHandler(
             llm_model=config.LLM_MODEL_NAME,
             memory=self.memory,
             verbose=self.verbose,
+            classifier=self.resources.intent_classifier,
+            classifier_threshold=config.INTENT_CLASSIFIER_THRESHOLD,
         )
         self.query_handler = QueryHandler(
             llm_model=config.LLM_MODEL_NAME,
@@ -111,3 +579,24 @@ class NewsBot:
             verbose=self.verbose,
         )
         self.fallback_handler = FallbackHandler()
+
+        chat_history_view = ChatHistoryView(
+            self.memory, config.LLM_MODEL_NAME, max_tokens=config.CHAT_HISTORY_MAX_TOKENS
+        )
+        for handler in (
+            self.standalone_handler,
+            self.standalone_intention_handler,
+            self.intention_handler,
+            self.query_handler,
+            self.greeting_handler,
+        ):
+            handler.chat_history_view = chat_history_view
+
+
+def _normalize(message: str) -> str:
+    return " ".join(message.lower().split())
+
+
+def _retrieve_exception(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.debug(f"Busca especulativa descartada: {task.exception()}")
@@ -0,0 +1,214 @@
+import re
+from collections import Counter, OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from pydantic import BaseModel, ConfigDict
+
+from bot.data_models import SearchFilters
+
+
+ANAPHORA_PATTERN = re.compile(
+    r"\b("
+    r"ele|ela|eles|elas|dele|dela|deles|delas|nele|nela|neles|nelas|"
+    r"isso|isto|aquilo|disso|disto|daquilo|nisso|nisto|naquilo|"
+    r"esse|essa|esses|essas|este|esta|estes|estas|"
+    r"desse|dessa|desses|dessas|deste|desta|destes|destas|"
+    r"nesse|nessa|nesses|nessas|neste|nesta|nestes|nestas|"
+    r"aquele|aquela|aqueles|aquelas|daquele|daquela|naquele|naquela|"
+    r"mesmo|mesma|outro|outra|outros|outras|anterior|anteriores|acima|"
+    r"tamb[eé]m|lo|la|los|las|lhe|lhes"
+    r")\b",
+    re.IGNORECASE,
+)
+CONTINUATION_PATTERN = re.compile(r"^\s*(e|mas|ou|entao|então|por que|porque)\b", re.IGNORECASE)
+MIN_SELF_CONTAINED_WORDS = 4
+
+
+def has_anaphora(message: str) -> bool:
+    """
+    Check whether a message may refer to previous turns of the conversation.
+
+    The check is deliberately conservative: pronouns, demonstratives, messages
+    continuing the previous one ("E amanhã?") and very short messages all count as
+    references, so that only clearly self-contained questions skip the rewrite.
+
+    Args:
+        message (str): The user message.
+
+    Returns:
+        bool: Whether the message may need the chat history to be understood.
+    """
+    return (
+        len(message.split()) < MIN_SELF_CONTAINED_WORDS
+        or CONTINUATION_PATTERN.search(message) is not None
+        or ANAPHORA_PATTERN.search(message) is not None
+    )
+
+
+class AskState(BaseModel):
+    """
+    The state of a message going through the NewsBot pipeline.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    message: str
+    filters: Optional[SearchFilters] = None
+    improved_message: Optional[str] = None
+    intention: Optional[str] = None
+    question_embedding: Optional[Any] = None
+    collection_version: Optional[str] = None
+    speculative_context: Optional[Any] = None
+    response: Optional[str] = None
+    stream: bool = False
+    response_stream: Optional[Any] = None
+
+
+SkipCondition = Tuple[str, Callable[[AskState], bool]]
+
+
+class Stage:
+    """
+    A class representing a pipeline stage, with the cheap conditions under which
+    running it cannot change the result.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        run: Callable[[AskState], None],
+        arun: Callable[[AskState], Awaitable[None]],
+        skip_conditions: Sequence[SkipCondition] = (),
+        on_skip: Optional[Callable[[AskState], None]] = None,
+    ):
+        """
+        Initialize the Stage.
+
+        Args:
+            name (str): The stage name.
+            run (Callable): The function running the stage over the state.
+            arun (Callable): The coroutine function running the stage over the state.
+            skip_conditions (Sequence[SkipCondition]): The reasons to skip the stage and
+                their predicates, checked in order.
+            on_skip (Optional[Callable]): The function filling the state in when the
+                stage is skipped.
+        """
+        self.name = name
+        self.run = run
+        self.arun = arun
+        self.skip_conditions = list(skip_conditions)
+        self.on_skip = on_skip
+
+    def get_skip_reason(self, state: AskState) -> Optional[str]:
+        """
+        Get the first reason to skip the stage.
+
+        Args:
+            state (AskState): The pipeline state.
+
+        Returns:
+            Optional[str]: The reason, or None if the stage has to run.
+        """
+        for reason, condition in self.skip_conditions:
+            if condition(state):
+                return reason
+        return None
+
+
+class Pipeline:
+    """
+    A class representing a sequence of stages run over an AskState, counting how
+    often each stage is run or skipped, and why.
+    """
+
+    def __init__(self, stages: List[Stage]):
+        """
+        Initialize the Pipeline.
+
+        Args:
+            stages (List[Stage]): The stages, in execution order.
+        """
+        self.stages = stages
+        self._counters: Dict[str, Counter] = {stage.name: Counter() for stage in stages}
+
+    def run(self, state: AskState) -> AskState:
+        """
+        Run the stages over the state.
+
+        Args:
+            state (AskState): The initial state.
+
+        Returns:
+            AskState: The final state.
+        """
+        for stage in self.stages:
+            if not self._skip(stage, state):
+                stage.run(state)
+        return state
+
+    async def arun(self, state: AskState) -> AskState:
+        """
+        Run the stages over the state without blocking the event loop.
+
+        Args:
+            state (AskState): The initial state.
+
+        Returns:
+            AskState: The final state.
+        """
+        for stage in self.stages:
+            if not self._skip(stage, state):
+                await stage.arun(state)
+        return state
+
+    @property
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Get the number of runs and skips of each stage, with skips by reason.
+
+        Returns:
+            Dict[str, Dict[str, int]]: The counters of each stage.
+        """
+        return {name: dict(counter) for name, counter in self._counters.items()}
+
+    def reset_stats(self) -> None:
+        for counter in self._counters.values():
+            counter.clear()
+
+    def _skip(self, stage: Stage, state: AskState) -> bool:
+        reason = stage.get_skip_reason(state)
+        counter = self._counters[stage.name]
+        if reason is None:
+            counter["run"] += 1
+            return False
+
+        counter["skipped"] += 1
+        counter[f"skipped:{reason}"] += 1
+        if stage.on_skip is not None:
+            stage.on_skip(state)
+        return True
+
+
+class RecentResults:
+    """
+    A class representing a bounded LRU mapping of recently computed stage results.
+    """
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self._results: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._results
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        if key not in self._results:
+            return None
+        self._results.move_to_end(key)
+        return self._results[key]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        self._results[key] = value
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_size:
+            self._results.popitem(last=False)
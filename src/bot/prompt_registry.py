@@ -0,0 +1,91 @@
+import os
+import threading
+from importlib import resources
+from typing import Dict, Tuple
+
+from langchain.prompts import PromptTemplate
+from langchain.prompts import load_prompt
+
+from bot import BotConfig
+
+config = BotConfig()
+
+
+class PromptNotFoundError(Exception):
+    pass
+
+
+class PromptRegistry:
+    """
+    A class holding every prompt template of a prompts folder in memory.
+
+    The templates are parsed once, when the registry is created. If hot reload is
+    enabled, the modification time of a template file is checked on each access and
+    the template is parsed again only when the file has changed.
+    """
+
+    def __init__(self, prompts_folder: str = "bot.prompts", hot_reload: bool = False):
+        """
+        Initialize the PromptRegistry.
+
+        Args:
+            prompts_folder (str): The package holding the prompt JSON files.
+            hot_reload (bool): Whether to reload templates whose files have changed.
+        """
+        self.prompts_folder = prompts_folder
+        self.hot_reload = hot_reload
+        self._prompts: Dict[str, Tuple[float, PromptTemplate]] = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self) -> None:
+        """
+        Parse every prompt template found in the prompts folder.
+        """
+        folder = resources.files(self.prompts_folder)
+        for path in folder.iterdir():
+            if path.name.startswith("prompt_") and path.name.endswith(".json"):
+                self._load(path.name[: -len(".json")])
+
+    def get(self, key: str) -> PromptTemplate:
+        """
+        Get a prompt template based on the provided key.
+
+        Args:
+            key (str): The key identifying the prompt template, with or without
+                the '.json' extension.
+
+        Returns:
+            PromptTemplate: The loaded prompt template.
+        """
+        key = key.removesuffix(".json")
+
+        if key not in self._prompts:
+            return self._load(key)
+
+        mtime, prompt = self._prompts[key]
+        if self.hot_reload and self._get_mtime(key) != mtime:
+            return self._load(key)
+
+        return prompt
+
+    def _load(self, key: str) -> PromptTemplate:
+        filepath = self._get_filepath(key)
+        if not os.path.exists(filepath):
+            raise PromptNotFoundError(f"Prompt '{key}' not found in '{self.prompts_folder}'.")
+
+        with self._lock:
+            mtime = self._get_mtime(key)
+            prompt = load_prompt(filepath)
+            self._prompts[key] = (mtime, prompt)
+
+        return prompt
+
+    def _get_filepath(self, key: str) -> str:
+        return str(resources.files(self.prompts_folder).joinpath(f"{key}.json"))
+
+    def _get_mtime(self, key: str) -> float:
+        return os.stat(self._get_filepath(key)).st_mtime
+
+
+prompt_registry = PromptRegistry(hot_reload=config.PROMPTS_HOT_RELOAD)
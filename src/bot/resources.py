@@ -0,0 +1,77 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Optional
+
+from bot import BotConfig
+from bot.answer_cache import SemanticAnswerCache
+from bot.executor import BoundedThreadPoolExecutor
+from bot.intent_classifier import EmbeddingIntentClassifier, load_intent_examples
+from bot.vector_databases import get_vector_database
+from bot.vector_databases.base import VectorDB
+
+config = BotConfig()
+
+
+class BotResources:
+    """
+    A class holding the heavy resources of a NewsBot, which hold no conversational
+    state and can be shared by the bots of every session in a process: the vector
+    database with its embedder and client, the intent classifier, the answer cache
+    and the background executors.
+
+    The prompt registry and the tokenizers are module-level caches already shared.
+    """
+
+    def __init__(self, vector_database: Optional[VectorDB] = None):
+        """
+        Initialize the BotResources.
+
+        Args:
+            vector_database (Optional[VectorDB]): The vector database. Defaults to the
+                configured backend.
+        """
+        self.vector_database = vector_database or get_vector_database(
+            config.VECTORDATABASE_BACKEND
+        )
+        self.intent_classifier = self._set_intent_classifier()
+        self.answer_cache = SemanticAnswerCache(
+            max_size=config.ANSWER_CACHE_SIZE,
+            ttl=config.ANSWER_CACHE_TTL,
+            threshold=config.ANSWER_CACHE_THRESHOLD,
+        )
+        self.executor = ThreadPoolExecutor(
+            max_workers=config.EXECUTOR_VECTOR_QUERY_CONCURRENCY, thread_name_prefix="newsbot"
+        )
+        self.summary_executor = BoundedThreadPoolExecutor(
+            max_workers=config.SUMMARY_WORKERS,
+            max_queue=config.SUMMARY_QUEUE_SIZE,
+            thread_name_prefix="newsbot-summary",
+        )
+
+    def _set_intent_classifier(self) -> Optional[EmbeddingIntentClassifier]:
+        """
+        Build the local intent classifier over the retrieval embedder, if enabled.
+
+        Returns:
+            Optional[EmbeddingIntentClassifier]: The classifier, or None.
+        """
+        if not config.LOCAL_INTENT_CLASSIFIER:
+            return None
+
+        return EmbeddingIntentClassifier(
+            embed_documents=self.vector_database.embedder,
+            embed_query=self.vector_database.embed_query,
+            examples=load_intent_examples(),
+        )
+
+
+@lru_cache(maxsize=None)
+def get_shared_resources() -> BotResources:
+    """
+    Get the resources shared by every NewsBot of the process, building them on
+    first use.
+
+    Returns:
+        BotResources: The shared resources.
+    """
+    return BotResources()
@@ -0,0 +1,110 @@
+import threading
+from collections import OrderedDict
+from time import monotonic
+from typing import Callable, Dict, Optional, Tuple
+
+from bot.newsbot import NewsBot
+
+
+class SessionRegistry:
+    """
+    A class keeping one NewsBot per chat session, evicting the sessions idle for
+    longer than a time to live and the least recently used ones past a maximum
+    number of sessions.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[str], NewsBot],
+        ttl: float = 1800,
+        max_sessions: int = 1000,
+    ):
+        """
+        Initialize the SessionRegistry.
+
+        Args:
+            factory (Callable[[str], NewsBot]): The function creating the bot of a
+                session from its id.
+            ttl (float): The inactivity time after which a session is evicted, in
+                seconds.
+            max_sessions (int): The maximum number of sessions kept.
+        """
+        self.factory = factory
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions: OrderedDict[str, Tuple[NewsBot, float]] = OrderedDict()
+        self._creating: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, session_id: str) -> NewsBot:
+        """
+        Get the bot of a session, creating it on first use.
+
+        The bot is created outside the registry lock, under a lock of its session only,
+        so that creating a session neither blocks the other sessions nor runs twice.
+
+        Args:
+            session_id (str): The session id.
+
+        Returns:
+            NewsBot: The bot of the session.
+        """
+        with self._lock:
+            self._evict(monotonic())
+            bot = self._touch(session_id)
+            if bot is not None:
+                return bot
+            creating = self._creating.setdefault(session_id, threading.Lock())
+
+        with creating:
+            with self._lock:
+                bot = self._touch(session_id)
+            if bot is not None:
+                return bot
+
+            try:
+                bot = self.factory(session_id)
+            finally:
+                with self._lock:
+                    if self._creating.get(session_id) is creating:
+                        del self._creating[session_id]
+
+            with self._lock:
+                self._sessions[session_id] = (bot, monotonic())
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+        return bot
+
+    def remove(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return dict(sessions=len(self._sessions))
+
+    def _touch(self, session_id: str) -> Optional[NewsBot]:
+        """
+        Mark a session as the most recently used. Must be called holding the lock.
+
+        Args:
+            session_id (str): The session id.
+
+        Returns:
+            Optional[NewsBot]: The bot of the session, or None if it is not kept.
+        """
+        if session_id not in self._sessions:
+            return None
+        bot, _ = self._sessions.pop(session_id)
+        self._sessions[session_id] = (bot, monotonic())
+        return bot
+
+    def _evict(self, now: float) -> None:
+        while self._sessions:
+            session_id, (_, last_used) = next(iter(self._sessions.items()))
+            if now - last_used <= self.ttl:
+                break
+            del self._sessions[session_id]
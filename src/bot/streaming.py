@@ -0,0 +1,121 @@
+import json
+import re
+from typing import Dict, Optional
+
+ANSWER_FIELD = "resposta"
+
+
+def parse_answer(text: str) -> Dict[str, str]:
+    """
+    Parse an answer in the JSON format of the query prompt.
+
+    Args:
+        text (str): The complete answer.
+
+    Returns:
+        Dict[str, str]: The answer fields. Answers that are not a JSON object with the
+            answer field, e.g. greetings, are returned whole as the answer field.
+    """
+    start, end = text.find("{"), text.rfind("}")
+    try:
+        parsed = json.loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        parsed = None
+
+    if not isinstance(parsed, dict) or not isinstance(parsed.get(ANSWER_FIELD), str):
+        return {ANSWER_FIELD: text.strip()}
+
+    return {key: str(value) for key, value in parsed.items() if value is not None}
+
+
+class AnswerStream:
+    """
+    A class decoding the answer field of a JSON answer as its tokens arrive, so that
+    only the answer text is shown while it is generated.
+
+    Answers not starting as a JSON object are passed through unchanged.
+    """
+
+    _ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+    def __init__(self, field: str = ANSWER_FIELD):
+        """
+        Initialize the AnswerStream.
+
+        Args:
+            field (str): The JSON field holding the answer text.
+        """
+        self.text = ""
+        self.answer = ""
+        self._field_pattern = re.compile(rf'"{re.escape(field)}"\s*:\s*"')
+        self._is_json: Optional[bool] = None
+        self._position: Optional[int] = None
+        self._done = False
+
+    def feed(self, chunk: str) -> str:
+        """
+        Add a chunk of the answer.
+
+        Args:
+            chunk (str): The chunk, as generated by the language model.
+
+        Returns:
+            str: The answer text decoded so far.
+        """
+        self.text += chunk
+
+        if self._is_json is None and self.text.strip():
+            self._is_json = self.text.lstrip()[0] in "{`"
+
+        if self._is_json is False:
+            self.answer = self.text
+        elif self._is_json:
+            self._decode()
+
+        return self.answer
+
+    @property
+    def result(self) -> Dict[str, str]:
+        """
+        Parse the complete answer.
+
+        Returns:
+            Dict[str, str]: The answer fields.
+        """
+        return parse_answer(self.text)
+
+    def _decode(self) -> None:
+        if self._done:
+            return
+
+        if self._position is None:
+            match = self._field_pattern.search(self.text)
+            if match is None:
+                return
+            self._position = match.end()
+
+        text, i = self.text, self._position
+        while i < len(text):
+            char = text[i]
+            if char == '"':
+                self._done = True
+                break
+            if char != "\\":
+                self.answer += char
+                i += 1
+                continue
+            if i + 1 >= len(text):
+                break
+            escape = text[i + 1]
+            if escape == "u":
+                if i + 6 > len(text):
+                    break
+                try:
+                    self.answer += chr(int(text[i + 2:i + 6], 16))
+                except ValueError:
+                    self.answer += text[i:i + 6]
+                i += 6
+            else:
+                self.answer += self._ESCAPES.get(escape, escape)
+                i += 2
+        self._position = i
@@ -0,0 +1,59 @@
+from bisect import bisect_left
+from functools import lru_cache
+from itertools import accumulate
+from typing import List
+
+import tiktoken
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model_name: str) -> tiktoken.Encoding:
+    """
+    Get the tokenizer encoding for a model, loading it only once per model.
+
+    Args:
+        model_name (str): The language model name.
+
+    Returns:
+        tiktoken.Encoding: The encoding used by the model.
+    """
+    return tiktoken.encoding_for_model(model_name)
+
+
+def count_tokens(text: str, model_name: str) -> int:
+    """
+    Count the number of tokens of a text for a model.
+
+    Args:
+        text (str): The text to count tokens for.
+        model_name (str): The language model name.
+
+    Returns:
+        int: The number of tokens.
+    """
+    return len(get_encoding(model_name).encode(text))
+
+
+def pack_context(
+    fragments: List[str], token_counts: List[int], max_tokens: int, separator_tokens: int = 1
+) -> List[str]:
+    """
+    Keep the longest prefix of fragments whose joined size stays below a token budget.
+
+    Each fragment is tokenized only once by the caller; the prefix is found with a
+    binary search over the cumulative token counts, including one separator between
+    consecutive fragments.
+
+    Args:
+        fragments (List[str]): The fragments, in order of priority.
+        token_counts (List[int]): The number of tokens of each fragment.
+        max_tokens (int): The token budget, which the packed fragments must stay below.
+        separator_tokens (int): The number of tokens of the separator joining fragments.
+
+    Returns:
+        List[str]: The fragments that fit in the budget.
+    """
+    cumulative = list(
+        accumulate(count + separator_tokens * (i > 0) for i, count in enumerate(token_counts))
+    )
+    return fragments[: bisect_left(cumulative, max_tokens)]
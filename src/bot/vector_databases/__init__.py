@@ -1,8 +1,17 @@
-from bot.vector_databases._chroma import NewsChromaVectorDB
+from bot.vector_databases._chroma import (
+    ChromaVectorDB,
+    NewsChromaVectorDB,
+    NewsPersistentChromaVectorDB,
+)
+from bot.vector_databases._numpy import NumpyVectorDB, NewsNumpyVectorDB
 from bot.vector_databases.exceptions import VectorDatabaseNotRecognizedError
 
 __all__ = [
     "ChromaVectorDB",
+    "NewsChromaVectorDB",
+    "NewsPersistentChromaVectorDB",
+    "NumpyVectorDB",
+    "NewsNumpyVectorDB",
     "get_vector_database",
 ]
 
@@ -10,6 +19,8 @@ __all__ = [
 def get_vector_database(label: str):
     _vdbs_mapping = {
         "chroma": NewsChromaVectorDB,
+        "chroma-embedded": NewsPersistentChromaVectorDB,
+        "numpy": NewsNumpyVectorDB,
     }
 
     if label not in _vdbs_mapping:
@@ -1,12 +1,21 @@
-from typing import List, Tuple
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from uuid import uuid4
 
 import chromadb
+from loguru import logger
 from chromadb.config import Settings
+from chromadb.errors import InvalidCollectionException
+from requests.adapters import HTTPAdapter
 from chromadb.api.models.Collection import Collection
 from chromadb.utils.embedding_functions import SentenceTransformerEmbeddingFunction
 
-from bot.vector_databases.base import VectorDB
-from bot.data_models import News, BaseVectorDatabaseResult, VectorDatabaseNewsResult
+from bot.vector_databases.base import VectorDB, NewsVectorDB, DATE_FIELD, CATEGORY_FIELD_PREFIX
+from bot.data_models import BaseVectorDatabaseResult, SearchFilters, date_to_int
+from bot.embeddings import Embedding
+
+
+VERSION_METADATA_KEY = "version"
 
 
 class ChromaVectorDB(VectorDB):
@@ -19,29 +28,62 @@ class ChromaVectorDB(VectorDB):
         Initialize the ChromaVectorDB.
         """
         super().__init__()
+        self._collection: Optional[Collection] = None
         self.chroma_client = self._set_client()
         self.embedder = self._set_embedder()
+        self.query_embedding_cache = self._set_query_embedding_cache()
 
     def get_most_similar(
-        self, query: str, n_neighbors: int = 1000, n_results: int = 10, **kwargs
+        self,
+        query: str,
+        n_neighbors: Optional[int] = None,
+        n_results: int = 10,
+        include: Optional[List[str]] = None,
+        filters: Optional[SearchFilters] = None,
+        **kwargs,
     ) -> List[BaseVectorDatabaseResult]:
         """
         Get the most similar results from the ChromaVectorDB based on the query.
 
+        If 'documents' or 'metadatas' are left out of `include`, the query only returns
+        ids and distances, and the bodies are fetched afterwards for the `n_results`
+        survivors only.
+
         Args:
             query (str): The query string.
-            n_neighbors (int): The number of neighbors to consider.
+            n_neighbors (Optional[int]): The number of neighbors to consider. Defaults
+                to `n_results` plus the configured over-fetch margin.
             n_results (int): The number of results to retrieve.
+            include (Optional[List[str]]): The fields returned by the query. Defaults to
+                the configured projection.
+            filters (Optional[SearchFilters]): The filters applied by ChromaDB before
+                the similarity search.
             **kwargs: Additional keyword arguments.
 
         Returns:
             List[BaseVectorDatabaseResult]: List of vector database results.
         """
-        res = self.collection.query(
-            query_texts=query,
-            n_results=n_neighbors,
+        if n_neighbors is None:
+            n_neighbors = n_results + self.bot_config.VECTORDATABASE_OVERFETCH
+
+        if include is None:
+            include = self.bot_config.VECTORDATABASE_QUERY_INCLUDE
+
+        query_kwargs = dict(
+            query_embeddings=[self.embed_query(query)],
+            n_results=max(n_neighbors, n_results),
+            include=list(dict.fromkeys([*include, "distances"])),
+            where=self._build_where(filters),
             **kwargs,
         )
+        try:
+            res = self.collection.query(**query_kwargs)
+        except InvalidCollectionException as err:
+            # The collection was recreated by another process since the handle was
+            # resolved, so the query is retried once against the new one.
+            logger.warning(f"Coleção recriada, consultando novamente: {err}")
+            self.invalidate_collection()
+            res = self.collection.query(**query_kwargs)
 
         result = dict(
             [
@@ -50,6 +92,9 @@ class ChromaVectorDB(VectorDB):
             ]
         )
 
+        if result.get("documents") is None or result.get("metadatas") is None:
+            result.update(self._get_documents(result["ids"][0]))
+
         return [
             self._format_search_result(*args)
             for args in zip(
@@ -60,6 +105,78 @@ class ChromaVectorDB(VectorDB):
             )
         ]
 
+    @staticmethod
+    def _build_where(filters: Optional[SearchFilters]) -> Optional[Dict[str, Any]]:
+        """
+        Build the ChromaDB metadata filter matching the search filters.
+
+        Args:
+            filters (Optional[SearchFilters]): The search filters.
+
+        Returns:
+            Optional[Dict[str, Any]]: The ChromaDB 'where' filter, or None if there is
+                nothing to filter.
+        """
+        if filters is None:
+            return None
+
+        conditions = []
+        if filters.date_start is not None:
+            conditions.append({DATE_FIELD: {"$gte": date_to_int(filters.date_start)}})
+        if filters.date_end is not None:
+            conditions.append({DATE_FIELD: {"$lte": date_to_int(filters.date_end)}})
+        if filters.categories:
+            categories = [{f"{CATEGORY_FIELD_PREFIX}{c}": True} for c in filters.categories]
+            conditions.append(categories[0] if len(categories) == 1 else {"$or": categories})
+
+        if not conditions:
+            return None
+        return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+    def _get_documents(self, ids: List[str]) -> Dict[str, List[List]]:
+        """
+        Fetch the documents and metadatas of the given ids, keeping their order.
+
+        Args:
+            ids (List[str]): The document ids.
+
+        Returns:
+            Dict[str, List[List]]: The documents and metadatas, shaped as query results.
+        """
+        res = self.collection.get(ids=ids, include=["documents", "metadatas"])
+        position = {id: i for i, id in enumerate(res["ids"])}
+        return dict(
+            documents=[[res["documents"][position[id]] for id in ids]],
+            metadatas=[[res["metadatas"][position[id]] for id in ids]],
+        )
+
+    def upsert(
+        self,
+        ids: List[str],
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+        embeddings: Optional[Sequence[Embedding]] = None,
+    ) -> None:
+        """
+        Insert or update documents in the ChromaDB collection.
+
+        Args:
+            ids (List[str]): The document ids.
+            documents (List[str]): The document contents.
+            metadatas (List[Dict[str, Any]]): The document metadatas.
+            embeddings (Optional[Sequence[Embedding]]): The document embeddings.
+                Defaults to embedding the documents with the collection embedder.
+        """
+        self.collection.upsert(
+            ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings
+        )
+
+        version = uuid4().hex
+        self.collection.modify(
+            metadata=dict(self.collection.metadata or {}, **{VERSION_METADATA_KEY: version})
+        )
+        self._set_collection_version(version)
+
     @property
     def collection(self) -> Collection:
         """
@@ -68,9 +185,55 @@ class ChromaVectorDB(VectorDB):
         Returns:
             Collection: The ChromaDB collection.
         """
-        return self.chroma_client.get_collection(
-            self.bot_config.EMBEDDING_COLLECTION, embedding_function=self.embedder
+        if self._collection is None:
+            self._collection = self.chroma_client.get_collection(
+                self.bot_config.EMBEDDING_COLLECTION, embedding_function=self.embedder
+            )
+        return self._collection
+
+    def invalidate_collection(self) -> None:
+        """
+        Forget the cached collection handle, so that it is resolved again on next use.
+        """
+        self._collection = None
+
+    def recreate_collection(self) -> Collection:
+        """
+        Delete the collection, if it exists, and create it again empty.
+
+        Returns:
+            Collection: The new ChromaDB collection.
+        """
+        name = self.bot_config.EMBEDDING_COLLECTION
+        if name in [c.name for c in self.chroma_client.list_collections()]:
+            self.chroma_client.delete_collection(name)
+
+        version = uuid4().hex
+        self._collection = self.chroma_client.create_collection(
+            name, metadata={VERSION_METADATA_KEY: version}, embedding_function=self.embedder
         )
+        self._set_collection_version(version)
+        return self._collection
+
+    def _read_collection_version(self) -> Optional[str]:
+        """
+        Read the collection version from the collection metadata on the server, where
+        the processes writing to the collection store it. The fresh collection handle
+        replaces the cached one, which no longer exists if the collection was recreated.
+
+        Returns:
+            Optional[str]: The collection version, or None if it cannot be read, so that
+                the answers cached against a known version are not served.
+        """
+        try:
+            collection = self.chroma_client.get_collection(
+                self.bot_config.EMBEDDING_COLLECTION, embedding_function=self.embedder
+            )
+        except Exception as err:
+            logger.warning(f"Versão da coleção indisponível: {err}")
+            return None
+        self._collection = collection
+        return (collection.metadata or {}).get(VERSION_METADATA_KEY)
 
     def _set_embedder(self) -> SentenceTransformerEmbeddingFunction:
         """
@@ -90,15 +253,12 @@ class ChromaVectorDB(VectorDB):
         Returns:
             HttpClient: The ChromaDB client.
         """
-        _settings = Settings(
-            allow_reset=True,
-            anonymized_telemetry=True,
-            persist_directory=self.bot_config.VECTORDATABASE_PERSIST_DIRECTORY,
-        )
-        return chromadb.HttpClient(
+        return _get_http_client(
             host=self.bot_config.VECTORDATABASE_HOSTNAME,
             port=self.bot_config.VECTORDATABASE_PORT,
-            settings=_settings,
+            persist_directory=self.bot_config.VECTORDATABASE_PERSIST_DIRECTORY,
+            anonymized_telemetry=self.bot_config.VECTORDATABASE_ANONYMIZED_TELEMETRY,
+            pool_size=self.bot_config.VECTORDATABASE_HTTP_POOL_SIZE,
         )
 
     @staticmethod
@@ -121,25 +281,82 @@ class ChromaVectorDB(VectorDB):
         return key, processed_value
 
 
-class NewsChromaVectorDB(ChromaVectorDB):
+@lru_cache(maxsize=None)
+def _get_http_client(
+    host: str, port: int, persist_directory: str, anonymized_telemetry: bool, pool_size: int
+) -> chromadb.HttpClient:
+    """
+    Get the ChromaDB HTTP client shared by every vector database of the process.
+
+    The client keeps a single requests session, whose keep-alive connection pool is
+    sized to the number of threads expected to query the server concurrently.
+
+    Args:
+        host (str): The ChromaDB server hostname.
+        port (int): The ChromaDB server port.
+        persist_directory (str): The persist directory setting.
+        anonymized_telemetry (bool): Whether to send anonymized telemetry.
+        pool_size (int): The maximum number of pooled connections.
+
+    Returns:
+        HttpClient: The ChromaDB client.
+    """
+    _settings = Settings(
+        allow_reset=True,
+        anonymized_telemetry=anonymized_telemetry,
+        persist_directory=persist_directory,
+    )
+    client = chromadb.HttpClient(host=host, port=port, settings=_settings)
+
+    session = getattr(getattr(client, "_server", None), "_session", None)
+    if session is not None:
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+    return client
+
+
+class NewsChromaVectorDB(ChromaVectorDB, NewsVectorDB):
     """
     A class representing a vector database specifically designed for news documents.
-    Inherits from ChromaVectorDB.
+    Inherits from ChromaVectorDB and NewsVectorDB.
     """
 
-    @staticmethod
-    def _format_search_result(*args) -> VectorDatabaseNewsResult:
-        """
-        Format the search result for news documents.
+    pass
 
-        Args:
-            *args (Tuple): Tuple containing id, distance, document, and metadata.
+
+class NewsPersistentChromaVectorDB(NewsChromaVectorDB):
+    """
+    A class representing a news vector database opening the persisted ChromaDB
+    in-process, without going through a chroma-server.
+    Inherits from NewsChromaVectorDB.
+    """
+
+    def _set_client(self) -> chromadb.PersistentClient:
+        """
+        Set the in-process ChromaDB client.
 
         Returns:
-            VectorDatabaseNewsResult: The formatted search result.
+            PersistentClient: The ChromaDB client.
         """
-        id, d, doc, meta = args
-        if isinstance(meta.get("categories", ""), str):
-            meta["categories"] = meta.get("categories", "").split("|")
-        news = News(**dict([("id", id), ("document", doc)] + list(meta.items())))
-        return VectorDatabaseNewsResult(distance=d, doc=news)
+        return _get_persistent_client(
+            path=self.bot_config.VECTORDATABASE_PERSIST_DIRECTORY,
+            anonymized_telemetry=self.bot_config.VECTORDATABASE_ANONYMIZED_TELEMETRY,
+        )
+
+
+@lru_cache(maxsize=None)
+def _get_persistent_client(path: str, anonymized_telemetry: bool) -> chromadb.PersistentClient:
+    """
+    Get the in-process ChromaDB client shared by every vector database of the process.
+
+    Args:
+        path (str): The directory of the persisted database.
+        anonymized_telemetry (bool): Whether to send anonymized telemetry.
+
+    Returns:
+        PersistentClient: The ChromaDB client.
+    """
+    _settings = Settings(allow_reset=True, anonymized_telemetry=anonymized_telemetry)
+    return chromadb.PersistentClient(path=path, settings=_settings)
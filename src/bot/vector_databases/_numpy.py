@@ -0,0 +1,360 @@
+import shutil
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from chromadb.utils.embedding_functions import SentenceTransformerEmbeddingFunction
+
+from bot.vector_databases.base import VectorDB, NewsVectorDB, DATE_FIELD, CATEGORY_FIELD_PREFIX
+from bot.vector_databases._store import EmbeddingStore
+from bot.data_models import BaseVectorDatabaseResult, SearchFilters, date_to_int
+from bot.embeddings import Embedding
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+
+SEARCH_BLOCK_SIZE = 8192
+
+
+class NumpyVectorDB(VectorDB):
+    """
+    A class representing an in-process vector database answering queries with
+    vectorized distance computations over a memory-mapped EmbeddingStore, or a FAISS
+    index when FAISS is installed and enabled.
+
+    Distances are squared L2 distances, as in the default ChromaDB space.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Initialize the NumpyVectorDB.
+
+        Args:
+            path (Optional[str]): The directory of the embedding store. Defaults to the
+                configured local store path.
+        """
+        super().__init__()
+        self.path = path or self.bot_config.VECTORDATABASE_LOCAL_STORE_PATH
+        self._collection: Optional[EmbeddingStore] = None
+        self._index = None
+        self._pending_upserts: Optional[List[Tuple]] = None
+        self.embedder = self._set_embedder()
+        self.query_embedding_cache = self._set_query_embedding_cache()
+
+    def get_most_similar(
+        self,
+        query: str,
+        n_neighbors: Optional[int] = None,
+        n_results: int = 10,
+        include: Optional[List[str]] = None,
+        filters: Optional[SearchFilters] = None,
+        **kwargs,
+    ) -> List[BaseVectorDatabaseResult]:
+        """
+        Get the most similar results from the NumpyVectorDB based on the query.
+
+        Args:
+            query (str): The query string.
+            n_neighbors (Optional[int]): Unused, kept for compatibility with the other
+                vector databases, since no result is transferred before truncation.
+            n_results (int): The number of results to retrieve.
+            include (Optional[List[str]]): Unused, kept for compatibility with the
+                other vector databases.
+            filters (Optional[SearchFilters]): The filters selecting the candidates
+                before the similarity search.
+            **kwargs: Additional keyword arguments.
+
+        Returns:
+            List[BaseVectorDatabaseResult]: List of vector database results.
+        """
+        collection = self.collection
+        distances, positions = self._search(
+            self.embed_query(query), n_results, candidates=self._filter(filters)
+        )
+        return [
+            self._format_search_result(
+                collection.get_id(i),
+                float(d),
+                collection.get_document(i),
+                collection.get_metadata(i),
+            )
+            for d, i in zip(distances, positions)
+        ]
+
+    def upsert(
+        self,
+        ids: List[str],
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+        embeddings: Optional[Sequence[Embedding]] = None,
+    ) -> None:
+        """
+        Insert or update documents and write the embedding store again, or, inside
+        a bulk_upsert block, when the block exits.
+
+        Args:
+            ids (List[str]): The document ids.
+            documents (List[str]): The document contents.
+            metadatas (List[Dict[str, Any]]): The document metadatas.
+            embeddings (Optional[Sequence[Embedding]]): The document embeddings.
+                Defaults to embedding the documents.
+        """
+        if not ids:
+            return
+
+        if embeddings is None:
+            embeddings = self.embedder(documents)
+        upsert = (ids, documents, metadatas, np.asarray(embeddings, dtype=np.float32))
+
+        if self._pending_upserts is not None:
+            self._pending_upserts.append(upsert)
+        else:
+            self._write([upsert])
+
+    @contextmanager
+    def bulk_upsert(self) -> Iterator[None]:
+        """
+        Keep the upserts made inside the block in memory and write the embedding store
+        once when the block exits, instead of once per upsert, since each write copies
+        the whole store. The upserts made before an error are still written.
+        """
+        if self._pending_upserts is not None:
+            yield
+            return
+
+        self._pending_upserts = []
+        try:
+            yield
+        finally:
+            upserts, self._pending_upserts = self._pending_upserts, None
+            if upserts:
+                self._write(upserts)
+
+    def _write(self, upserts: List[Tuple]) -> None:
+        """
+        Merge upserts into the documents of the embedding store and write it again.
+
+        Args:
+            upserts (List[Tuple]): The ids, documents, metadatas and embeddings of each
+                upsert, in order.
+        """
+        dimension = upserts[0][3].shape[1]
+        collection = self.collection
+        if collection is None:
+            all_ids, all_documents, all_metadatas = [], [], []
+            all_embeddings = np.empty((0, dimension), dtype=np.float32)
+        else:
+            all_ids = [collection.get_id(i) for i in range(len(collection))]
+            all_documents = [collection.get_document(i) for i in range(len(collection))]
+            all_metadatas = [collection.get_metadata(i) for i in range(len(collection))]
+            all_embeddings = np.array(collection.embeddings, dtype=np.float32)
+
+        position = {id: i for i, id in enumerate(all_ids)}
+        stored = len(all_ids)
+        new_rows = []
+        for ids, documents, metadatas, embeddings in upserts:
+            for id, document, metadata, embedding in zip(ids, documents, metadatas, embeddings):
+                if id in position:
+                    all_documents[position[id]] = document
+                    all_metadatas[position[id]] = metadata
+                    if position[id] < stored:
+                        all_embeddings[position[id]] = embedding
+                    else:
+                        new_rows[position[id] - stored] = embedding
+                else:
+                    position[id] = len(all_ids)
+                    all_ids.append(id)
+                    all_documents.append(document)
+                    all_metadatas.append(metadata)
+                    new_rows.append(embedding)
+
+        if new_rows:
+            all_embeddings = np.vstack([all_embeddings, np.stack(new_rows)])
+
+        self._collection = EmbeddingStore.write(
+            self.path,
+            ids=all_ids,
+            embeddings=all_embeddings,
+            documents=all_documents,
+            metadatas=all_metadatas,
+            dtype=self.bot_config.VECTORDATABASE_LOCAL_STORE_DTYPE,
+        )
+        self._set_collection_version(self._collection.version)
+        self._set_index()
+
+    @property
+    def collection(self) -> Optional[EmbeddingStore]:
+        """
+        Get the embedding store, opening it on first use, and again when another
+        process wrote a new version.
+
+        Returns:
+            Optional[EmbeddingStore]: The embedding store, or None if none was written.
+        """
+        version = self.collection_version
+        if version is None:
+            self._collection = None
+        elif self._collection is None or self._collection.version != version:
+            self._collection = EmbeddingStore(self.path)
+            self._set_index()
+        return self._collection
+
+    def recreate_collection(self) -> None:
+        """
+        Delete the embedding store, so that the next upsert writes it again empty.
+        """
+        shutil.rmtree(self.path, ignore_errors=True)
+        self._collection = None
+        self._index = None
+        self._set_collection_version(None)
+
+    def _read_collection_version(self) -> Optional[str]:
+        return EmbeddingStore.get_version(self.path)
+
+    def _set_index(self) -> None:
+        """
+        Build the FAISS index, if enabled. The index holds its own copy of the
+        embeddings, which is not shared between processes.
+        """
+        self._index = None
+        if faiss is not None and self.bot_config.VECTORDATABASE_FAISS_INDEX and len(self._collection):
+            embeddings = np.asarray(self._collection.embeddings, dtype=np.float32)
+            self._index = faiss.IndexFlatL2(embeddings.shape[1])
+            self._index.add(embeddings)
+
+    def _filter(self, filters: Optional[SearchFilters]) -> Optional[np.ndarray]:
+        """
+        Select the rows matching the search filters, using the metadata columns.
+
+        Args:
+            filters (Optional[SearchFilters]): The search filters.
+
+        Returns:
+            Optional[np.ndarray]: The positions of the matching rows, or None if there
+                is nothing to filter.
+        """
+        collection = self.collection
+        if collection is None or filters is None or filters.is_empty:
+            return None
+
+        mask = np.ones(len(collection), dtype=bool)
+
+        if filters.date_start is not None or filters.date_end is not None:
+            dates = self._get_numeric_column(DATE_FIELD)
+            if filters.date_start is not None:
+                mask &= dates >= date_to_int(filters.date_start)
+            if filters.date_end is not None:
+                mask &= dates <= date_to_int(filters.date_end)
+
+        if filters.categories:
+            categories = np.zeros(len(collection), dtype=bool)
+            for category in filters.categories:
+                categories |= self._get_numeric_column(f"{CATEGORY_FIELD_PREFIX}{category}") > 0
+            mask &= categories
+
+        return np.flatnonzero(mask)
+
+    def _get_numeric_column(self, name: str) -> np.ndarray:
+        """
+        Get the values of a numeric metadata column, with missing values as -1.
+
+        Args:
+            name (str): The column name.
+
+        Returns:
+            np.ndarray: The column values.
+        """
+        collection = self.collection
+        if name not in collection.columns:
+            return np.full(len(collection), -1)
+
+        column = collection.get_column(name)
+        return np.where(column["mask"], column["values"], -1)
+
+    def _search(
+        self, embedding: List[float], k: int, candidates: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the k nearest embeddings of a query embedding.
+
+        Args:
+            embedding (List[float]): The query embedding.
+            k (int): The number of neighbors.
+            candidates (Optional[np.ndarray]): The positions of the rows to search in.
+                Defaults to every row.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The squared L2 distances and the positions
+                of the neighbors, sorted by distance.
+        """
+        collection = self.collection
+        if collection is None:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+
+        k = min(k, len(collection) if candidates is None else len(candidates))
+        if k == 0:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+
+        query = np.asarray(embedding, dtype=np.float32)
+
+        if candidates is None and self._index is not None:
+            distances, positions = self._index.search(query[None, :], k)
+            return distances[0], positions[0]
+
+        embeddings, squared_norms = collection.embeddings, collection.squared_norms
+        if candidates is not None:
+            embeddings, squared_norms = embeddings[candidates], squared_norms[candidates]
+
+        distances = squared_norms - 2 * self._dot(embeddings, query) + query @ query
+        positions = np.argpartition(distances, k - 1)[:k]
+        positions = positions[np.argsort(distances[positions])]
+        distances = distances[positions]
+        return distances, positions if candidates is None else candidates[positions]
+
+    @staticmethod
+    def _dot(embeddings: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """
+        Compute the dot product of every embedding with the query.
+
+        float32 matrices are multiplied in place over the memory map; other dtypes are
+        converted block by block, so no full-size private copy is made.
+
+        Args:
+            embeddings (np.ndarray): The embedding matrix.
+            query (np.ndarray): The float32 query embedding.
+
+        Returns:
+            np.ndarray: The dot products.
+        """
+        if embeddings.dtype == np.float32:
+            return embeddings @ query
+
+        return np.concatenate(
+            [
+                embeddings[i:i + SEARCH_BLOCK_SIZE].astype(np.float32) @ query
+                for i in range(0, len(embeddings), SEARCH_BLOCK_SIZE)
+            ]
+        )
+
+    def _set_embedder(self) -> SentenceTransformerEmbeddingFunction:
+        """
+        Set the embedder for NumpyVectorDB.
+
+        Returns:
+            SentenceTransformerEmbeddingFunction: The embedding function.
+        """
+        return SentenceTransformerEmbeddingFunction(
+            model_name=self.bot_config.HUGGINGFACE_EMBEDDING_MODEL_NAME
+        )
+
+
+class NewsNumpyVectorDB(NumpyVectorDB, NewsVectorDB):
+    """
+    A class representing an in-process vector database for news documents.
+    Inherits from NumpyVectorDB and NewsVectorDB.
+    """
+
+    pass
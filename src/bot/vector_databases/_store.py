@@ -0,0 +1,257 @@
+import json
+import os
+import shutil
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
+
+import numpy as np
+
+CURRENT_FILENAME = "CURRENT"
+MANIFEST_FILENAME = "manifest.json"
+EMBEDDINGS_FILENAME = "embeddings.npy"
+SQUARED_NORMS_FILENAME = "squared_norms.npy"
+IDS_FILENAME = "ids.npy"
+DOCUMENT_COLUMN = "document"
+JSON_ENCODING = "utf-8"
+
+_COLUMN_TYPES = {bool: "bool", int: "int", float: "float", str: "str"}
+
+
+class EmbeddingStore:
+    """
+    A class representing a read-only embedding store laid out as memory-mappable files.
+
+    Each write creates a new version of the store in its own subdirectory, and the
+    CURRENT file of the store directory holds the name of the current version. A
+    version directory holds:
+        - manifest.json: the number of rows, the embedding dtype, and the type and file
+          name of each column;
+        - embeddings.npy: the embedding matrix, one row per document;
+        - squared_norms.npy: the squared L2 norm of each embedding;
+        - ids.npy: the document ids, in row order;
+        - <file>.bin and <file>.offsets.npy: the UTF-8 values of a text column,
+          concatenated, and the offsets of each row;
+        - <file>.npy and <file>.mask.npy: the values of a numeric column and whether
+          each row has a value.
+
+    Column files are named after the position of the column, since metadata keys,
+    such as categories, may hold characters that are not allowed in file names.
+
+    Every file is opened with mmap, so worker processes on the same host share the
+    page cache instead of holding private copies, and opening the store is nearly free.
+    """
+
+    def __init__(self, path: str):
+        """
+        Open an EmbeddingStore.
+
+        Args:
+            path (str): The directory of the store.
+        """
+        self.path = path
+        self.version = self.get_version(path)
+        if self.version is None:
+            raise FileNotFoundError(f"No embedding store in {path}.")
+
+        with open(self._get_filepath(MANIFEST_FILENAME), "r", encoding=JSON_ENCODING) as f:
+            self.manifest = json.load(f)
+
+        self.embeddings = self._load_array(EMBEDDINGS_FILENAME)
+        self.squared_norms = self._load_array(SQUARED_NORMS_FILENAME)
+        self.ids = self._load_array(IDS_FILENAME)
+        files = self.manifest.get("files", {})
+        self._columns = {
+            name: self._open_column(files.get(name, name), kind)
+            for name, kind in self.manifest["columns"].items()
+        }
+
+    def __len__(self) -> int:
+        return self.manifest["count"]
+
+    @property
+    def columns(self) -> List[str]:
+        return [name for name in self._columns if name != DOCUMENT_COLUMN]
+
+    def get_id(self, i: int) -> str:
+        return str(self.ids[i])
+
+    def get_document(self, i: int) -> str:
+        return self._get_value(DOCUMENT_COLUMN, i)
+
+    def get_metadata(self, i: int) -> Dict[str, Any]:
+        """
+        Get the metadata of a row, leaving out empty values.
+
+        Args:
+            i (int): The row.
+
+        Returns:
+            Dict[str, Any]: The metadata.
+        """
+        meta = {name: self._get_value(name, i) for name in self.columns}
+        return {key: value for key, value in meta.items() if value is not None}
+
+    def get_column(self, name: str) -> Dict[str, np.ndarray]:
+        """
+        Get the arrays of a column.
+
+        Args:
+            name (str): The column name.
+
+        Returns:
+            Dict[str, np.ndarray]: The column arrays: 'values' and 'mask' for numeric
+                columns, 'data' and 'offsets' for text columns.
+        """
+        return self._columns[name]
+
+    @classmethod
+    def write(
+        cls,
+        path: str,
+        ids: List[str],
+        embeddings: np.ndarray,
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+        dtype: str = "float32",
+    ) -> "EmbeddingStore":
+        """
+        Write a store, replacing any store already in the directory.
+
+        The files are written and synced to a new version directory first, and the
+        CURRENT file is then replaced with a single atomic rename, so readers and a
+        crash at any point see either the former or the new store. The former version
+        is kept for the readers that were opening it, and older ones are deleted.
+
+        Args:
+            path (str): The directory of the store.
+            ids (List[str]): The document ids.
+            embeddings (np.ndarray): The embedding matrix.
+            documents (List[str]): The document contents.
+            metadatas (List[Dict[str, Any]]): The document metadatas.
+            dtype (str): The dtype of the stored embeddings, 'float32' or 'float16'.
+
+        Returns:
+            EmbeddingStore: The written store.
+        """
+        previous = cls.get_version(path)
+        version = uuid4().hex
+        version_path = os.path.join(path, version)
+        os.makedirs(version_path)
+
+        embeddings = np.ascontiguousarray(embeddings, dtype=dtype)
+        float_embeddings = embeddings.astype(np.float32)
+        np.save(os.path.join(version_path, EMBEDDINGS_FILENAME), embeddings)
+        np.save(
+            os.path.join(version_path, SQUARED_NORMS_FILENAME),
+            np.einsum("ij,ij->i", float_embeddings, float_embeddings),
+        )
+        np.save(os.path.join(version_path, IDS_FILENAME), np.array(ids, dtype=str))
+
+        columns = {DOCUMENT_COLUMN: documents}
+        for name in sorted({key for meta in metadatas for key in meta}):
+            columns[name] = [meta.get(name) for meta in metadatas]
+
+        files = {name: f"column_{i}" for i, name in enumerate(columns)}
+        kinds = {
+            name: cls._write_column(version_path, files[name], values)
+            for name, values in columns.items()
+        }
+
+        manifest = dict(count=len(ids), dtype=str(embeddings.dtype), columns=kinds, files=files)
+        with open(os.path.join(version_path, MANIFEST_FILENAME), "w", encoding=JSON_ENCODING) as f:
+            json.dump(manifest, f)
+
+        for filename in os.listdir(version_path):
+            _fsync(os.path.join(version_path, filename))
+
+        current_tmp_path = os.path.join(path, f"{CURRENT_FILENAME}.{version}.tmp")
+        with open(current_tmp_path, "w", encoding=JSON_ENCODING) as f:
+            f.write(version)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(current_tmp_path, os.path.join(path, CURRENT_FILENAME))
+
+        for name in os.listdir(path):
+            if name not in (version, previous, CURRENT_FILENAME):
+                target = os.path.join(path, name)
+                if os.path.isdir(target):
+                    shutil.rmtree(target, ignore_errors=True)
+                else:
+                    os.remove(target)
+
+        return cls(path)
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return EmbeddingStore.get_version(path) is not None
+
+    @staticmethod
+    def get_version(path: str) -> Optional[str]:
+        """
+        Get the current version of the store in a directory, reading only its CURRENT
+        file, so that it is cheap to check whether another process wrote the store.
+
+        Args:
+            path (str): The directory of the store.
+
+        Returns:
+            Optional[str]: The current version, or None if no store was written.
+        """
+        try:
+            with open(os.path.join(path, CURRENT_FILENAME), "r", encoding=JSON_ENCODING) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _write_column(path: str, filename: str, values: List[Any]) -> str:
+        types = {type(v) for v in values if v is not None}
+        if types == {int, float}:
+            types = {float}
+        kind = _COLUMN_TYPES.get(next(iter(types)), "str") if len(types) == 1 else "str"
+
+        if kind == "str":
+            encoded = [b"" if v is None else str(v).encode(JSON_ENCODING) for v in values]
+            offsets = np.zeros(len(values) + 1, dtype=np.int64)
+            np.cumsum([len(v) for v in encoded], out=offsets[1:])
+            with open(os.path.join(path, f"{filename}.bin"), "wb") as f:
+                f.write(b"".join(encoded))
+            np.save(os.path.join(path, f"{filename}.offsets.npy"), offsets)
+        else:
+            dtypes = dict(bool=np.bool_, int=np.int64, float=np.float64)
+            data = np.array([0 if v is None else v for v in values], dtype=dtypes[kind])
+            np.save(os.path.join(path, f"{filename}.npy"), data)
+
+        np.save(os.path.join(path, f"{filename}.mask.npy"), np.array([v is not None for v in values]))
+        return kind
+
+    def _open_column(self, filename: str, kind: str) -> Dict[str, Any]:
+        mask = self._load_array(f"{filename}.mask.npy")
+        if kind != "str":
+            return dict(kind=kind, values=self._load_array(f"{filename}.npy"), mask=mask)
+
+        filepath = self._get_filepath(f"{filename}.bin")
+        data = np.memmap(filepath, dtype=np.uint8, mode="r") if os.path.getsize(filepath) else b""
+        return dict(kind=kind, data=data, offsets=self._load_array(f"{filename}.offsets.npy"), mask=mask)
+
+    def _get_value(self, name: str, i: int) -> Optional[Any]:
+        column = self._columns[name]
+        if not column["mask"][i]:
+            return None
+
+        if column["kind"] != "str":
+            return column["values"][i].item()
+
+        start, end = column["offsets"][i], column["offsets"][i + 1]
+        return bytes(column["data"][start:end]).decode(JSON_ENCODING)
+
+    def _load_array(self, filename: str) -> np.ndarray:
+        return np.load(self._get_filepath(filename), mmap_mode="r")
+
+    def _get_filepath(self, filename: str) -> str:
+        return os.path.join(self.path, self.version, filename)
+
+
+def _fsync(filepath: str) -> None:
+    with open(filepath, "rb") as f:
+        os.fsync(f.fileno())
@@ -1,21 +1,200 @@
+import asyncio
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from time import monotonic
+from typing import Any, Dict, Iterator, List, Optional, Sequence
 
 from bot import BotConfig
+from bot.data_models import News, VectorDatabaseNewsResult, date_to_int
+from bot.embeddings import Embedding, QueryEmbeddingCache
+from bot.executor import EMBEDDING, request_executor
+
+
+DATE_FIELD = "date_int"
+CATEGORY_FIELD_PREFIX = "category:"
 
 
 class VectorDB(ABC):
     def __init__(self):
         self.bot_config = BotConfig()
+        self._collection_version: Optional[str] = None
+        self._collection_version_read_at: Optional[float] = None
 
     @property
     @abstractmethod
     def collection(self):
         pass
 
+    @property
+    def collection_version(self) -> Optional[str]:
+        """
+        Get the version of the collection. Every write changes it, from any process,
+        since it is stored in the database itself. It is read again at most every
+        VECTORDATABASE_VERSION_CHECK_INTERVAL seconds.
+
+        Returns:
+            Optional[str]: The collection version, or None if there is no collection.
+        """
+        interval = self.bot_config.VECTORDATABASE_VERSION_CHECK_INTERVAL
+        read_at = self._collection_version_read_at
+        if read_at is None or monotonic() - read_at >= interval:
+            self._set_collection_version(self._read_collection_version())
+        return self._collection_version
+
+    def _set_collection_version(self, version: Optional[str]) -> None:
+        self._collection_version = version
+        self._collection_version_read_at = monotonic()
+
+    @abstractmethod
+    def _read_collection_version(self) -> Optional[str]:
+        pass
+
     @abstractmethod
     def get_most_similar(self):
         pass
 
+    async def aget_most_similar(self, *args, **kwargs):
+        """
+        Get the most similar results without blocking the event loop.
+
+        The search runs in a worker thread, since neither the ChromaDB client nor the
+        embedding model offer an async API.
+
+        Args:
+            *args: The arguments of get_most_similar.
+            **kwargs: The keyword arguments of get_most_similar.
+
+        Returns:
+            List[BaseVectorDatabaseResult]: List of vector database results.
+        """
+        return await asyncio.to_thread(self.get_most_similar, *args, **kwargs)
+
+    @abstractmethod
+    def upsert(
+        self,
+        ids: List[str],
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+        embeddings: Optional[Sequence[Embedding]] = None,
+    ) -> None:
+        pass
+
+    @contextmanager
+    def bulk_upsert(self) -> Iterator[None]:
+        """
+        Group the upserts made inside the block. Databases that rewrite their whole
+        collection on each upsert write it once, when the block exits; the others
+        upsert as usual.
+        """
+        yield
+
     @abstractmethod
     def _set_embedder(self):
         pass
+
+    def embed_query(self, query: str) -> Embedding:
+        """
+        Get the embedding of a query, reusing cached embeddings of repeated queries.
+
+        Args:
+            query (str): The query string.
+
+        Returns:
+            Embedding: The query embedding.
+        """
+        return self.query_embedding_cache(query)
+
+    def embed_documents(self, documents: List[str]) -> List[Embedding]:
+        """
+        Get the embeddings of documents in a single call to the embedder, so that the
+        model encodes them in batches instead of one forward pass per document.
+
+        Args:
+            documents (List[str]): The documents.
+
+        Returns:
+            List[Embedding]: The document embeddings, in order.
+        """
+        return [list(e) for e in self.embedder(documents)]
+
+    def _set_query_embedding_cache(self) -> QueryEmbeddingCache:
+        """
+        Set the query embedding cache in front of the embedder. Cache misses hold a
+        slot of the embedding resource class while the embedder runs.
+
+        Returns:
+            QueryEmbeddingCache: The query embedding cache.
+        """
+        return QueryEmbeddingCache(
+            request_executor.wrap(EMBEDDING, self.embedder),
+            model_name=self.bot_config.HUGGINGFACE_EMBEDDING_MODEL_NAME,
+            max_size=self.bot_config.EMBEDDING_CACHE_SIZE,
+            path=self.bot_config.EMBEDDING_CACHE_PATH,
+            max_entries=self.bot_config.EMBEDDING_CACHE_MAX_ENTRIES,
+        )
+
+
+class NewsVectorDB(VectorDB, ABC):
+    """
+    Abstract base class for vector databases storing news documents.
+    """
+
+    def add_news(self, news: List[News], embeddings: Optional[Sequence[Embedding]] = None) -> None:
+        """
+        Add news documents to the collection, storing in their metadata the token
+        count of their prompt representation for the configured language model.
+
+        The collection version changes, so that answers cached against the former
+        documents are no longer served.
+
+        Args:
+            news (List[News]): The news documents.
+            embeddings (Optional[Sequence[Embedding]]): The document embeddings, if
+                already computed. Defaults to embedding the documents.
+        """
+        model_name = self.bot_config.LLM_MODEL_NAME
+        self.upsert(
+            ids=[str(n.id) for n in news],
+            documents=[n.document for n in news],
+            metadatas=[self._format_metadata(n.precompute_tokens(model_name)) for n in news],
+            embeddings=embeddings,
+        )
+
+    @staticmethod
+    def _format_metadata(news: News) -> Dict[str, Any]:
+        """
+        Format the metadata of a news document to be stored in the vector database.
+
+        Besides the news fields, the date is stored as a sortable integer and each
+        category as a boolean field, so that searches can be filtered natively.
+
+        Args:
+            news (News): The news document.
+
+        Returns:
+            Dict[str, Any]: The metadata, without empty values.
+        """
+        meta = news.model_dump(exclude={"id", "document"}, exclude_none=True)
+        meta["date"] = str(news.date)
+        meta[DATE_FIELD] = date_to_int(news.date)
+        if news.categories is not None:
+            meta["categories"] = "|".join(news.categories)
+            meta.update({f"{CATEGORY_FIELD_PREFIX}{c}": True for c in news.categories})
+        return meta
+
+    @staticmethod
+    def _format_search_result(*args) -> VectorDatabaseNewsResult:
+        """
+        Format the search result for news documents.
+
+        Args:
+            *args (Tuple): Tuple containing id, distance, document, and metadata.
+
+        Returns:
+            VectorDatabaseNewsResult: The formatted search result.
+        """
+        id, d, doc, meta = args
+        if isinstance(meta.get("categories", ""), str):
+            meta["categories"] = meta.get("categories", "").split("|")
+        news = News(**dict([("id", id), ("document", doc)] + list(meta.items())))
+        return VectorDatabaseNewsResult(distance=d, doc=news)
@@ -163,7 +163,7 @@ def sidebar() -> dict:
     Returns
     -------
     dict
-        Filters selected by the user.
+        Filters selected by the user, None for the ones left at their default.
     """
 
     sbar = st.sidebar
@@ -202,10 +202,13 @@ def sidebar() -> dict:
     date_start = col_date_1.date_input("Data de início", value=date_min, min_value=date_min, max_value=date_max, format="DD/MM/YYYY")
     date_end = col_date_2.date_input("Data final", value=date_max, min_value=date_min, max_value=date_max, format="DD/MM/YYYY")
 
+    # Only the constraints the user narrowed are sent, so the default range and an empty
+    # selection search every news, including those outside the range or ingested before
+    # the dates and categories were stored.
     filters = {
-        "categories": categories,
-        "date_start": date_start.strftime("%Y-%m-%d"),
-        "date_end": date_end.strftime("%Y-%m-%d")
+        "categories": categories or None,
+        "date_start": date_start.strftime("%Y-%m-%d") if date_start != date_min.date() else None,
+        "date_end": date_end.strftime("%Y-%m-%d") if date_end != date_max.date() else None,
     }
 
     return filters
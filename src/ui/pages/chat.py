@@ -2,7 +2,11 @@ import os, sys
 import streamlit as st
 import uuid
 
-from bot import NewsBot
+from bot import BotConfig, NewsBot
+from bot.conversation_store import StoredChatMessageHistory, get_conversation_store
+from bot.resources import get_shared_resources
+from bot.sessions import SessionRegistry
+from bot.streaming import AnswerStream
 from loguru import logger
 
 sys.path.append(os.getcwd())
@@ -14,6 +18,8 @@ from ui.components import (
     sidebar,
 )
 
+config = BotConfig()
+
 
 def chat():
     st.title("Chatbot de Notícias - Poços de Caldas")
@@ -27,14 +33,20 @@ def chat():
 
         with st.spinner("..."):
             news_bot = load_news_bot()
-            response = news_bot.execute(prompt)
+            response = news_bot.ask_stream(prompt, filters=st.session_state["filters"])
 
         with st.chat_message("assistant"):
-            st.markdown(response["response"])
+            placeholder = st.empty()
+            stream = AnswerStream()
+            for chunk in response["response"]:
+                placeholder.markdown(stream.feed(chunk) + "▌")
+            answer = stream.result["resposta"]
+            placeholder.markdown(answer)
+
         st.session_state["messages"].append(
             {
                 "role": "assistant",
-                "response": response["response"],
+                "response": answer,
                 "execution_id": response["execution_id"],
             }
         )
@@ -42,7 +54,7 @@ def chat():
             {
                 response["execution_id"]: {
                     "message": prompt,
-                    "response": response["response"],
+                    "response": stream.text,
                     "filters": filters,
                 }
             }
@@ -52,10 +64,30 @@ def chat():
 
 
 @st.cache_resource(show_spinner=False)
-def load_news_bot():
-    return NewsBot(
-        local_filepath=f"{st.session_state['username']}_{st.session_state['session_id']}.json"
+def load_session_registry():
+    return SessionRegistry(
+        factory=create_news_bot, ttl=config.SESSION_TTL, max_sessions=config.SESSION_MAX
+    )
+
+
+def create_news_bot(session_key):
+    store = get_conversation_store()
+    if store is None:
+        return NewsBot(resources=get_shared_resources(), local_filepath=f"{session_key}.jsonl")
+
+    store.maybe_cleanup()
+    chat_history = StoredChatMessageHistory(
+        store,
+        session_id=session_key,
+        user_id=st.session_state["username"],
+        load_last=config.LOCAL_MEMORY_LOAD_LAST,
     )
+    return NewsBot(resources=get_shared_resources(), chat_history=chat_history)
+
+
+def load_news_bot():
+    session_key = f"{st.session_state['username']}_{st.session_state['session_id']}"
+    return load_session_registry().get(session_key)
 
 
 if __name__ == "__main__":
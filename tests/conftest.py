@@ -0,0 +1,131 @@
+import zlib
+from typing import Callable, List
+
+import numpy as np
+import pytest
+from langchain.memory import ConversationBufferMemory
+from langchain.pydantic_v1 import Field
+from langchain_community.chat_models.fake import FakeListChatModel
+from langchain_community.llms.openai import BaseOpenAI
+
+from bot import tokens
+from bot.handlers import (
+    _base,
+    _greeting_handler,
+    _intention_handler,
+    _query_handler,
+    _standalone_handler,
+    _standalone_intention_handler,
+)
+from bot.newsbot import NewsBot
+from bot.resources import BotResources
+from bot.vector_databases import NewsNumpyVectorDB, NumpyVectorDB
+
+EMBEDDING_SIZE = 16
+
+HANDLER_MODULES = [
+    _greeting_handler,
+    _intention_handler,
+    _query_handler,
+    _standalone_handler,
+    _standalone_intention_handler,
+]
+
+
+class WhitespaceEncoding:
+    """
+    A tokenizer with one token per word, so that token counts are easy to predict and
+    no tiktoken encoding has to be downloaded.
+    """
+
+    def encode(self, text: str, **kwargs) -> List[str]:
+        return text.split()
+
+
+class FakeEmbedder:
+    """
+    An embedder summing a pseudo-random vector per word, so that texts sharing words
+    are close and the same text always gets the same embedding.
+    """
+
+    def __init__(self):
+        self.calls: List[List[str]] = []
+
+    def __call__(self, input: List[str]) -> List[List[float]]:
+        self.calls.append(list(input))
+        return [self.embed(text) for text in input]
+
+    @staticmethod
+    def embed(text: str) -> List[float]:
+        embedding = np.zeros(EMBEDDING_SIZE)
+        for word in text.lower().split():
+            embedding += np.random.default_rng(zlib.crc32(word.encode())).standard_normal(EMBEDDING_SIZE)
+        return embedding.tolist()
+
+
+class RecordingChatModel(FakeListChatModel):
+    """
+    A fake chat model answering its responses in turn and recording its prompts.
+    """
+
+    prompts: List[str] = Field(default_factory=list)
+
+    def _call(self, messages, *args, **kwargs) -> str:
+        self.prompts.append(messages[0].content)
+        return super()._call(messages, *args, **kwargs)
+
+    def _stream(self, messages, *args, **kwargs):
+        self.prompts.append(messages[0].content)
+        return super()._stream(messages, *args, **kwargs)
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setattr(tokens, "get_encoding", lambda model_name: WhitespaceEncoding())
+    monkeypatch.setattr(BaseOpenAI, "get_token_ids", lambda self, text: WhitespaceEncoding().encode(text))
+
+
+@pytest.fixture
+def embedder(monkeypatch) -> FakeEmbedder:
+    embedder = FakeEmbedder()
+    monkeypatch.setattr(NumpyVectorDB, "_set_embedder", lambda self: embedder)
+    return embedder
+
+
+@pytest.fixture
+def vector_database(tmp_path, embedder) -> NewsNumpyVectorDB:
+    return NewsNumpyVectorDB(path=str(tmp_path / "numpy"))
+
+
+@pytest.fixture
+def memory() -> ConversationBufferMemory:
+    return ConversationBufferMemory(memory_key="history", input_key="human_input")
+
+
+@pytest.fixture
+def chat_model(monkeypatch) -> Callable[[List[str]], RecordingChatModel]:
+    """
+    Get a factory of fake chat models, used by every handler once created.
+    """
+
+    def install(responses: List[str]) -> RecordingChatModel:
+        model = RecordingChatModel(responses=responses)
+        for module in HANDLER_MODULES:
+            monkeypatch.setattr(module, "get_chat_model", lambda *args: model)
+        monkeypatch.setattr(_base, "get_async_chat_model", lambda *args: model)
+        return model
+
+    return install
+
+
+@pytest.fixture
+def newsbot(vector_database) -> NewsBot:
+    """
+    Get a NewsBot over the fake vector database, without the local intent classifier,
+    whose predictions over fake embeddings are meaningless. Its chat model is installed
+    with the chat_model fixture.
+    """
+    resources = BotResources(vector_database=vector_database)
+    resources.intent_classifier = None
+    return NewsBot(verbose=False, resources=resources)
@@ -0,0 +1,86 @@
+import datetime
+import uuid
+
+import pytest
+
+from bot.answer_cache import SemanticAnswerCache
+from bot.data_models import News, SearchFilters
+
+
+@pytest.fixture
+def cache() -> SemanticAnswerCache:
+    return SemanticAnswerCache(max_size=2, ttl=60, threshold=0.95)
+
+
+def test_hit_on_a_similar_question(cache):
+    cache.put([1.0, 0.0, 0.0], "resposta", version="v1")
+
+    assert cache.get([0.99, 0.05, 0.0], version="v1") == "resposta"
+    assert cache.get([0.0, 1.0, 0.0], version="v1") is None
+    assert cache.stats == dict(hits=1, misses=1, size=1)
+
+
+def test_miss_under_other_filters(cache):
+    filters = SearchFilters(categories=["cultura"], date_start=datetime.date(2023, 1, 1))
+    cache.put([1.0, 0.0], "resposta", filters=filters)
+
+    assert cache.get([1.0, 0.0]) is None
+    assert cache.get([1.0, 0.0], filters=SearchFilters(categories=["cultura"])) is None
+    assert cache.get([1.0, 0.0], filters=filters) == "resposta"
+
+
+def test_empty_filters_share_the_scope_of_no_filters(cache):
+    cache.put([1.0, 0.0], "resposta", filters=SearchFilters())
+
+    assert cache.get([1.0, 0.0]) == "resposta"
+
+
+def test_new_collection_version_invalidates(cache):
+    cache.put([1.0, 0.0], "resposta", version="v1")
+
+    assert cache.get([1.0, 0.0], version="v2") is None
+    assert cache.stats["size"] == 0
+    assert cache.get([1.0, 0.0], version="v1") is None
+
+
+def test_answers_expire(cache, monkeypatch):
+    cache.put([1.0, 0.0], "resposta")
+
+    monkeypatch.setattr("bot.answer_cache.monotonic", lambda: float("inf"))
+
+    assert cache.get([1.0, 0.0]) is None
+
+
+def test_least_recently_used_answers_are_evicted(cache):
+    cache.put([1.0, 0.0, 0.0], "a")
+    cache.put([0.0, 1.0, 0.0], "b")
+    cache.put([0.0, 0.0, 1.0], "c")
+
+    assert cache.get([1.0, 0.0, 0.0]) is None
+    assert cache.get([0.0, 1.0, 0.0]) == "b"
+    assert cache.get([0.0, 0.0, 1.0]) == "c"
+
+
+def test_newsbot_answers_from_the_cache_until_the_news_change(newsbot, chat_model, vector_database):
+    model = chat_model(["Consulta de conteudo", '{"resposta":"ok"}', "Consulta de conteudo", '{"resposta":"ok2"}'])
+    question = "Quais as notícias de hoje sobre a prefeitura?"
+    vector_database.bot_config.VECTORDATABASE_VERSION_CHECK_INTERVAL = 0
+
+    assert newsbot.ask(question)["response"] == '{"resposta":"ok"}'
+    assert newsbot.ask(question)["response"] == '{"resposta":"ok"}'
+    assert len(model.prompts) == 2
+
+    vector_database.add_news(
+        [
+            News(
+                id=uuid.uuid4(),
+                title="Nova notícia",
+                document="A prefeitura anunciou obras",
+                date=datetime.date(2023, 1, 1),
+                link="https://example.com",
+            )
+        ]
+    )
+
+    assert newsbot.ask(question)["response"] == '{"resposta":"ok2"}'
+    assert len(model.prompts) == 4
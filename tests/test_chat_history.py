@@ -0,0 +1,94 @@
+import pytest
+
+from bot import chat_history
+from bot.chat_history import ChatHistoryView
+from bot.handlers import StandaloneHandler, _base
+
+MODEL = "gpt-3.5-turbo"
+
+
+@pytest.fixture
+def counted(monkeypatch):
+    lines = []
+    count_tokens = chat_history.count_tokens
+
+    def record(line, model_name):
+        lines.append(line)
+        return count_tokens(line, model_name)
+
+    monkeypatch.setattr(chat_history, "count_tokens", record)
+    return lines
+
+
+def add_turn(memory, question: str, answer: str) -> None:
+    memory.chat_memory.add_user_message(question)
+    memory.chat_memory.add_ai_message(answer)
+
+
+def test_formats_the_history(memory):
+    add_turn(memory, "oi", "olá, tudo bem?")
+
+    assert ChatHistoryView(memory, MODEL).get() == "Human: oi\nAI: olá, tudo bem?\n"
+
+
+def test_keeps_the_most_recent_messages_within_the_budget(memory):
+    add_turn(memory, "um dois", "três quatro cinco")
+    add_turn(memory, "seis", "sete oito")
+
+    def get(max_tokens):
+        return ChatHistoryView(memory, MODEL, max_tokens=max_tokens).get()
+
+    assert get(None) == "Human: um dois\nAI: três quatro cinco\nHuman: seis\nAI: sete oito\n"
+    assert get(12) == "Human: um dois\nAI: três quatro cinco\nHuman: seis\nAI: sete oito\n"
+    assert get(11) == "AI: três quatro cinco\nHuman: seis\nAI: sete oito\n"
+    assert get(8) == "Human: seis\nAI: sete oito\n"
+    assert get(4) == "AI: sete oito\n"
+    assert get(2) == ""
+
+
+def test_messages_are_counted_once(memory, counted):
+    view = ChatHistoryView(memory, MODEL, max_tokens=100)
+    add_turn(memory, "oi", "olá")
+    first = view.get()
+
+    assert view.get() is first
+    add_turn(memory, "tudo bem?", "sim")
+    assert view.get() == "Human: oi\nAI: olá\nHuman: tudo bem?\nAI: sim\n"
+    assert counted == ["Human: oi\n", "AI: olá\n", "Human: tudo bem?\n", "AI: sim\n"]
+
+
+def test_pruned_messages_are_dropped(memory, counted):
+    view = ChatHistoryView(memory, MODEL)
+    add_turn(memory, "oi", "olá")
+    add_turn(memory, "tudo bem?", "sim")
+    view.get()
+
+    del memory.chat_memory.messages[:2]
+    add_turn(memory, "e você?", "também")
+
+    assert view.get() == "Human: tudo bem?\nAI: sim\nHuman: e você?\nAI: também\n"
+    assert len(counted) == 6
+
+
+def test_cleared_memory_is_formatted_again(memory):
+    view = ChatHistoryView(memory, MODEL)
+    add_turn(memory, "oi", "olá")
+    view.get()
+
+    memory.clear()
+    assert view.get() == ""
+
+    add_turn(memory, "de novo", "olá")
+    assert view.get() == "Human: de novo\nAI: olá\n"
+
+
+def test_handlers_share_the_view(memory, monkeypatch):
+    monkeypatch.setattr(_base.config, "CHAT_HISTORY_MAX_TOKENS", 2)
+    handler = StandaloneHandler(llm_model=MODEL, memory=memory)
+    add_turn(memory, "oi", "olá")
+
+    assert handler.get_chat_history() == "AI: olá\n"
+
+    other = StandaloneHandler(llm_model=MODEL, memory=memory)
+    other.chat_history_view = handler.chat_history_view
+    assert other.get_chat_history() is handler.get_chat_history()
@@ -0,0 +1,104 @@
+import datetime
+import types
+import uuid
+
+import pytest
+import requests
+
+from bot.data_models import News
+from bot.vector_databases import ChromaVectorDB, NewsPersistentChromaVectorDB
+from bot.vector_databases import _chroma
+
+
+@pytest.fixture
+def chroma(tmp_path, monkeypatch, embedder) -> NewsPersistentChromaVectorDB:
+    monkeypatch.setenv("VECTORDATABASE_PERSIST_DIRECTORY", str(tmp_path / "chroma"))
+    monkeypatch.setenv("VECTORDATABASE_ANONYMIZED_TELEMETRY", "false")
+    monkeypatch.setattr(ChromaVectorDB, "_set_embedder", lambda self: embedder)
+
+    vdb = NewsPersistentChromaVectorDB()
+    vdb.recreate_collection()
+    return vdb
+
+
+def make_news(i: int) -> News:
+    return News(
+        id=uuid.uuid4(),
+        title=f"Notícia {i}",
+        document=f"documento número {i}",
+        date=datetime.date(2023, 1, i + 1),
+        link=f"https://example.com/{i}",
+    )
+
+
+def test_collection_handle_is_cached(chroma, mocker):
+    get_collection = mocker.spy(chroma.chroma_client, "get_collection")
+    chroma.invalidate_collection()
+
+    assert chroma.collection is chroma.collection
+    assert get_collection.call_count == 1
+
+    chroma.invalidate_collection()
+    chroma.collection
+    assert get_collection.call_count == 2
+
+
+def test_clients_are_shared(chroma):
+    assert NewsPersistentChromaVectorDB().chroma_client is chroma.chroma_client
+
+
+def test_http_client_pools_connections(mocker):
+    session = requests.Session()
+    server = types.SimpleNamespace(_session=session)
+    http_client = mocker.patch.object(
+        _chroma.chromadb, "HttpClient", return_value=types.SimpleNamespace(_server=server)
+    )
+
+    client = _chroma._get_http_client("chroma-test", 8001, "chroma_db", False, 7)
+
+    assert _chroma._get_http_client("chroma-test", 8001, "chroma_db", False, 7) is client
+    assert http_client.call_count == 1
+    assert session.get_adapter("http://chroma-test:8001")._pool_maxsize == 7
+
+
+def test_upsert_and_search(chroma):
+    news = [make_news(i) for i in range(3)]
+    chroma.add_news(news)
+
+    [result] = chroma.get_most_similar("documento número 1", n_results=1)
+    assert result.doc.id == news[1].id
+    assert result.doc.title == "Notícia 1"
+
+
+def test_search_fetches_bodies_of_survivors_only(chroma, mocker):
+    news = [make_news(i) for i in range(5)]
+    chroma.add_news(news)
+    get = mocker.spy(type(chroma.collection), "get")
+
+    results = chroma.get_most_similar("documento número 2", n_results=2, include=["distances"])
+
+    assert results[0].doc.id == news[2].id
+    assert len(get.call_args.kwargs["ids"]) == 2
+
+
+def test_search_after_another_process_recreates_the_collection(chroma):
+    chroma.add_news([make_news(0)])
+    chroma.collection
+    other = NewsPersistentChromaVectorDB()
+    other.recreate_collection()
+    news = make_news(1)
+    other.add_news([news])
+
+    [result] = chroma.get_most_similar("documento número 1", n_results=1)
+
+    assert result.doc.id == news.id
+
+
+def test_version_check_swaps_the_collection_handle(chroma, monkeypatch):
+    monkeypatch.setattr(chroma.bot_config, "VECTORDATABASE_VERSION_CHECK_INTERVAL", 0)
+    chroma.collection
+    other = NewsPersistentChromaVectorDB()
+    other.recreate_collection()
+
+    assert chroma.collection_version == other.collection_version
+    assert chroma.collection.id == other.collection.id
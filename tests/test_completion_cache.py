@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from bot.completion_cache import CompletionCache
+from bot.handlers import QueryHandler, StandaloneHandler, _base
+
+
+@pytest.fixture
+def cache(tmp_path) -> CompletionCache:
+    return CompletionCache(str(tmp_path / "completions.sqlite"), max_entries=2)
+
+
+@pytest.fixture
+def cached_handler(cache, memory, vector_database, monkeypatch) -> QueryHandler:
+    monkeypatch.setattr(_base, "completion_cache", cache)
+    return QueryHandler(llm_model="gpt-3.5-turbo", memory=memory, vector_database=vector_database)
+
+
+def test_keys_depend_on_the_whole_request():
+    key = CompletionCache.get_key("gpt-3.5-turbo", 0, "prompt")
+
+    assert CompletionCache.get_key("gpt-3.5-turbo", 0, "prompt") == key
+    assert CompletionCache.get_key("gpt-4", 0, "prompt") != key
+    assert CompletionCache.get_key("gpt-3.5-turbo", 0.5, "prompt") != key
+    assert CompletionCache.get_key("gpt-3.5-turbo", 0, "prompt ") != key
+
+
+def test_hit_and_miss(cache):
+    cache.put("a", "resposta")
+
+    assert cache.get("a", handler="Handler") == "resposta"
+    assert cache.get("b", handler="Handler") is None
+    assert cache.stats == {"Handler": dict(hits=1, misses=1, hit_rate=0.5)}
+
+
+def test_least_recently_used_completions_are_evicted(cache):
+    cache.put("a", "1")
+    cache.put("b", "2")
+    cache.get("a")
+    cache.put("c", "3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+
+
+def test_cache_is_shared_through_the_file(cache):
+    cache.put("a", "resposta")
+
+    assert CompletionCache(cache.path).get("a") == "resposta"
+
+    cache.clear()
+    assert CompletionCache(cache.path).get("a") is None
+
+
+def test_handler_reuses_cached_completions(cached_handler, chat_model, memory):
+    model = chat_model(["primeira", "segunda"])
+
+    assert cached_handler.predict("oi") == "primeira"
+    memory.clear()
+    assert cached_handler.predict("oi") == "primeira"
+
+    assert len(model.prompts) == 1
+    assert [m.content for m in memory.chat_memory.messages] == ["oi", "primeira"]
+
+
+def test_async_handler_reuses_cached_completions(cached_handler, chat_model, memory):
+    model = chat_model(["primeira", "segunda"])
+
+    assert asyncio.run(cached_handler.apredict("oi")) == "primeira"
+    memory.clear()
+    assert asyncio.run(cached_handler.apredict("oi")) == "primeira"
+
+    assert len(model.prompts) == 1
+    assert [m.content for m in memory.chat_memory.messages] == ["oi", "primeira"]
+
+
+def test_handler_skips_the_cache_when_sampling(cache, memory, chat_model, monkeypatch):
+    monkeypatch.setattr(_base, "completion_cache", cache)
+    handler = StandaloneHandler(llm_model="gpt-3.5-turbo", memory=memory, temperature=0.7)
+    model = chat_model(["primeira", "segunda"])
+
+    assert handler.predict("oi") == "primeira"
+    memory.clear()
+    assert handler.predict("oi") == "segunda"
+    assert len(model.prompts) == 2
@@ -0,0 +1,102 @@
+import pytest
+from langchain.schema.messages import AIMessage, HumanMessage
+
+from bot import conversation_store
+from bot.conversation_store import ConversationStore, StoredChatMessageHistory
+
+
+@pytest.fixture
+def store(tmp_path) -> ConversationStore:
+    return ConversationStore(str(tmp_path / "conversations" / "store.sqlite"), ttl=60, cleanup_interval=10)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(conversation_store, "time", lambda: now[0])
+    return now
+
+
+def turn(i: int):
+    return [HumanMessage(content=f"pergunta {i}"), AIMessage(content=f"resposta {i}")]
+
+
+def test_round_trip(store):
+    store.add_messages("s1", turn(0), user_id="u1")
+    store.add_messages("s1", turn(1), user_id="u1")
+    store.add_messages("s2", turn(2), user_id="u1")
+
+    assert store.get_messages("s1") == turn(0) + turn(1)
+    assert store.get_messages("s1", last=3) == turn(0)[1:] + turn(1)
+    assert store.get_messages("s2") == turn(2)
+    assert store.get_messages("inexistente") == []
+
+
+def test_store_is_shared_through_the_file(store):
+    store.add_messages("s1", turn(0))
+
+    assert ConversationStore(store.path).get_messages("s1") == turn(0)
+
+
+def test_list_sessions_by_last_activity(store, clock):
+    store.add_messages("s1", turn(0), user_id="u1")
+    clock[0] += 1
+    store.add_messages("s2", turn(1), user_id="u1")
+    store.add_messages("s3", turn(2), user_id="u2")
+    clock[0] += 1
+    store.add_messages("s1", turn(3), user_id="u1")
+
+    sessions = store.list_sessions("u1")
+
+    assert [s["session_id"] for s in sessions] == ["s1", "s2"]
+    assert sessions[0] == dict(session_id="s1", created_at=1000.0, updated_at=1002.0)
+
+
+def test_delete_session(store):
+    store.add_messages("s1", turn(0), user_id="u1")
+
+    store.delete_session("s1")
+
+    assert store.get_messages("s1") == []
+    assert store.list_sessions("u1") == []
+
+
+def test_cleanup_deletes_inactive_sessions(store, clock):
+    store.add_messages("s1", turn(0), user_id="u1")
+    clock[0] += 50
+    store.add_messages("s2", turn(1), user_id="u1")
+    clock[0] += 20
+
+    assert store.cleanup() == 1
+    assert store.get_messages("s1") == []
+    assert store.get_messages("s2") == turn(1)
+    assert store.cleanup(ttl=10) == 1
+    assert ConversationStore(store.path).cleanup() == 0
+
+
+def test_maybe_cleanup_waits_for_the_interval(store, clock):
+    store.add_messages("s1", turn(0))
+    clock[0] += 55
+    assert store.maybe_cleanup() == 0
+
+    clock[0] += 9
+    assert store.maybe_cleanup() == 0
+    assert store.get_messages("s1") == turn(0)
+
+    clock[0] += 1
+    assert store.maybe_cleanup() == 1
+
+
+def test_stored_history_writes_through(store):
+    history = StoredChatMessageHistory(store, "s1", user_id="u1")
+    history.add_user_message("pergunta 0")
+    history.add_ai_message("resposta 0")
+    history.add_messages(turn(1))
+
+    assert history.messages == turn(0) + turn(1)
+    assert StoredChatMessageHistory(store, "s1", load_last=2).messages == turn(1)
+    assert [s["session_id"] for s in store.list_sessions("u1")] == ["s1"]
+
+    history.clear()
+    assert history.messages == []
+    assert store.get_messages("s1") == []
@@ -0,0 +1,61 @@
+import datetime
+import uuid
+
+import pytest
+
+from bot.data_models import News
+from bot.tokens import count_tokens, pack_context
+
+MODEL = "gpt-3.5-turbo"
+
+
+@pytest.fixture
+def news() -> News:
+    return News(
+        id=uuid.uuid4(),
+        title="Festival de inverno",
+        document="O festival de inverno começa na praça central",
+        date=datetime.date(2023, 7, 1),
+        link="https://example.com/festival",
+        author="Ana",
+        categories=["cultura"],
+    )
+
+
+@pytest.mark.parametrize("order", [None, 1, 2, 10])
+def test_precomputed_tokens_match_the_representation(news, order):
+    expected = count_tokens(news.repr(order), MODEL)
+
+    assert news.precompute_tokens(MODEL).count_tokens(MODEL, order) == expected
+
+
+def test_precomputed_tokens_are_used_for_their_model(news):
+    news.precompute_tokens(MODEL)
+    news.n_tokens = 1000
+
+    assert news.count_tokens(MODEL, order=3) == 1000 + count_tokens("\n<noticia_3>\n</noticia_3>", MODEL)
+
+
+def test_precomputed_tokens_are_ignored_for_another_model(news):
+    news.precompute_tokens(MODEL)
+    news.n_tokens = 1000
+
+    assert news.count_tokens("gpt-4", order=1) == count_tokens(news.repr(1), "gpt-4")
+
+
+def test_add_news_stores_the_token_count(vector_database, news):
+    vector_database.add_news([news])
+
+    [result] = vector_database.get_most_similar(news.document, n_results=1)
+    assert result.doc.n_tokens == count_tokens(news.repr_body(order=1), MODEL)
+    assert result.doc.n_tokens_model == MODEL
+    assert result.doc.categories == ["cultura"]
+
+
+def test_pack_context_keeps_the_prefix_below_the_budget():
+    fragments = ["a b", "c d e", "f", "g h"]
+    token_counts = [2, 3, 1, 2]
+
+    assert pack_context(fragments, token_counts, max_tokens=8) == ["a b", "c d e"]
+    assert pack_context(fragments, token_counts, max_tokens=9) == ["a b", "c d e", "f"]
+    assert pack_context(fragments, token_counts, max_tokens=2) == []
@@ -0,0 +1,92 @@
+import sqlite3
+from unittest import mock
+
+import pytest
+
+from bot import embeddings
+from bot.embeddings import QueryEmbeddingCache
+
+
+def test_repeated_queries_are_embedded_once(embedder):
+    cache = QueryEmbeddingCache(embedder, model_name="modelo")
+
+    assert cache("Notícias de hoje") == cache("  notícias   DE hoje ")
+    assert embedder.calls == [["Notícias de hoje"]]
+    assert cache.stats == dict(hits=1, misses=1, size=1)
+
+
+def test_least_recently_used_queries_are_evicted(embedder):
+    cache = QueryEmbeddingCache(embedder, model_name="modelo", max_size=2)
+    cache("a")
+    cache("b")
+    cache("a")
+    cache("c")
+
+    cache("a")
+    cache("b")
+
+    assert [call[0] for call in embedder.calls] == ["a", "b", "c", "b"]
+
+
+def test_persistent_tier_is_shared(embedder, tmp_path):
+    path = str(tmp_path / "embeddings.sqlite")
+    embedding = QueryEmbeddingCache(embedder, model_name="modelo", path=path)("notícias")
+
+    other = QueryEmbeddingCache(embedder, model_name="modelo", path=path)
+
+    assert other("notícias") == pytest.approx(embedding, rel=1e-6)
+    assert len(embedder.calls) == 1
+    assert QueryEmbeddingCache(embedder, model_name="outro", path=path)("notícias") is not None
+    assert len(embedder.calls) == 2
+
+
+def test_clear(embedder, tmp_path):
+    cache = QueryEmbeddingCache(embedder, model_name="modelo", path=str(tmp_path / "embeddings.sqlite"))
+    cache("notícias")
+    cache.clear()
+    cache("notícias")
+
+    assert len(embedder.calls) == 2
+
+
+def test_persistent_tier_runs_in_wal_mode(embedder, tmp_path):
+    cache = QueryEmbeddingCache(embedder, model_name="modelo", path=str(tmp_path / "embeddings.sqlite"))
+
+    assert cache._connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_persistent_tier_evicts_the_least_recently_used(embedder, tmp_path, monkeypatch):
+    clock = iter(range(100))
+    monkeypatch.setattr(embeddings, "time", lambda: next(clock))
+    path = str(tmp_path / "embeddings.sqlite")
+    cache = QueryEmbeddingCache(embedder, model_name="modelo", max_size=1, path=path, max_entries=2)
+    cache("a")
+    cache("b")
+    cache("a")
+    cache("c")
+
+    keys = {row[0] for row in cache._connection.execute("SELECT key FROM query_embeddings")}
+    assert keys == {"modelo:a", "modelo:c"}
+
+
+def test_unavailable_persistent_tier_is_a_miss(embedder, tmp_path):
+    cache = QueryEmbeddingCache(embedder, model_name="modelo", path=str(tmp_path / "embeddings.sqlite"))
+    cache._connection = mock.Mock(execute=mock.Mock(side_effect=sqlite3.OperationalError("database is locked")))
+
+    assert cache("notícias") == cache("notícias")
+    assert len(embedder.calls) == 1
+    assert cache.stats["misses"] == 1
+
+
+def test_persistent_tier_of_a_former_version_is_migrated(embedder, tmp_path):
+    path = str(tmp_path / "embeddings.sqlite")
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE query_embeddings (key TEXT PRIMARY KEY, embedding BLOB)")
+    connection.commit()
+    connection.close()
+
+    cache = QueryEmbeddingCache(embedder, model_name="modelo", path=path)
+    cache("notícias")
+
+    assert QueryEmbeddingCache(embedder, model_name="modelo", path=path)("notícias") is not None
+    assert len(embedder.calls) == 1
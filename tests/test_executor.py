@@ -0,0 +1,184 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from bot.executor import (
+    EMBEDDING,
+    LLM,
+    VECTOR_QUERY,
+    BoundedThreadPoolExecutor,
+    ExecutorBusyError,
+    ResourceLimiter,
+    request_executor,
+)
+from bot.handlers import QueryHandler
+from bot.newsbot import BUSY_RESPONSE
+
+
+def wait_until(condition, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.001)
+
+
+@pytest.fixture
+def limiters(monkeypatch):
+    """
+    Replace the limiters of the shared request executor with tight ones.
+    """
+
+    def install(max_queue: int = 1, **concurrency) -> dict:
+        limiters = {
+            name: ResourceLimiter(name, concurrency.get(name, 1), max_queue=max_queue, timeout=1)
+            for name in (LLM, EMBEDDING, VECTOR_QUERY)
+        }
+        monkeypatch.setattr(request_executor, "limiters", limiters)
+        return limiters
+
+    return install
+
+
+def test_slots_are_granted_in_arrival_order():
+    limiter = ResourceLimiter("test", max_concurrency=1, max_queue=3, timeout=2)
+    order = []
+
+    def call(i):
+        with limiter.limit():
+            order.append(i)
+
+    threads = []
+    with limiter.limit():
+        for i in range(3):
+            threads.append(threading.Thread(target=call, args=(i,)))
+            threads[-1].start()
+            wait_until(lambda: limiter.waiting == i + 1)
+    for thread in threads:
+        thread.join()
+
+    assert order == [0, 1, 2]
+    assert limiter.stats["admitted"] == 4
+    assert limiter.active == 0
+
+
+def test_caller_is_rejected_when_the_queue_is_full():
+    limiter = ResourceLimiter("test", max_concurrency=1, max_queue=0)
+
+    with limiter.limit():
+        with pytest.raises(ExecutorBusyError):
+            with limiter.limit():
+                pass
+
+    assert limiter.rejected == 1
+    assert limiter.active == 0
+
+
+def test_caller_is_rejected_after_the_timeout():
+    limiter = ResourceLimiter("test", max_concurrency=1, max_queue=1, timeout=0.01)
+
+    with limiter.limit():
+        with pytest.raises(ExecutorBusyError):
+            with limiter.limit():
+                pass
+        assert limiter.waiting == 0
+
+    assert limiter.rejected == 1
+    assert limiter.active == 0
+
+
+def test_cancelled_async_waiter_leaves_the_queue():
+    limiter = ResourceLimiter("test", max_concurrency=1, max_queue=1, timeout=2)
+
+    async def main():
+        async def wait():
+            async with limiter.alimit():
+                pass
+
+        async with limiter.alimit():
+            task = asyncio.create_task(wait())
+            while limiter.waiting == 0:
+                await asyncio.sleep(0)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            assert limiter.waiting == 0
+
+    asyncio.run(main())
+
+    assert limiter.active == 0
+
+
+def test_async_waiter_cancelled_while_granted_does_not_leak_the_slot():
+    limiter = ResourceLimiter("test", max_concurrency=1, max_queue=1, timeout=2)
+
+    async def main():
+        async def wait():
+            async with limiter.alimit():
+                pass
+
+        async with limiter.alimit():
+            task = asyncio.create_task(wait())
+            while limiter.waiting == 0:
+                await asyncio.sleep(0)
+        # The slot is handed over to the waiter, which is cancelled before it resumes.
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(main())
+
+    assert limiter.active == 0
+    assert limiter.waiting == 0
+
+
+def test_bounded_thread_pool_rejects_tasks_beyond_its_queue():
+    executor = BoundedThreadPoolExecutor(max_workers=1, max_queue=1, thread_name_prefix="test")
+    release = threading.Event()
+    try:
+        running = executor.submit(release.wait)
+        queued = executor.submit(lambda: "queued")
+
+        with pytest.raises(ExecutorBusyError):
+            executor.submit(lambda: "rejected")
+
+        release.set()
+        assert queued.result(timeout=2) == "queued"
+        running.result(timeout=2)
+        assert executor.submit(lambda: "admitted").result(timeout=2) == "admitted"
+    finally:
+        release.set()
+        executor.shutdown()
+
+
+def test_vector_query_holds_its_slot_while_embedding_the_query(
+    limiters, embedder, memory, vector_database, monkeypatch
+):
+    limiters = limiters()
+    active = []
+    embed = type(embedder).__call__
+
+    def call(self, input):
+        active.append((limiters[VECTOR_QUERY].active, limiters[EMBEDDING].active))
+        return embed(self, input)
+
+    monkeypatch.setattr(type(embedder), "__call__", call)
+    handler = QueryHandler(llm_model="gpt-3.5-turbo", memory=memory, vector_database=vector_database)
+
+    handler.get_context("praça central")
+
+    assert active == [(1, 1)]
+    assert {name: limiter.active for name, limiter in limiters.items()} == {
+        LLM: 0, EMBEDDING: 0, VECTOR_QUERY: 0
+    }
+
+
+def test_ask_answers_busy_when_the_executor_is_saturated(limiters, newsbot, chat_model):
+    limiters = limiters(max_queue=0, **{LLM: 0})
+    chat_model(["Consulta de conteudo", '{"resposta":"ok"}'])
+
+    result = newsbot.ask("Quais são as notícias?")
+
+    assert result["busy"] is True
+    assert result["response"] == BUSY_RESPONSE
+    assert limiters[LLM].rejected == 1
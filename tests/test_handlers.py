@@ -0,0 +1,81 @@
+import json
+import os
+import sys
+
+import pytest
+from langchain.prompts import PromptTemplate
+
+from bot.handlers import QueryHandler, StandaloneHandler
+from bot.llms import get_chat_model
+from bot.prompt_registry import PromptNotFoundError, PromptRegistry
+
+
+@pytest.fixture
+def prompts_package(tmp_path, monkeypatch):
+    package = tmp_path / "test_prompts"
+    package.mkdir()
+    (package / "__init__.py").write_text("")
+    (package / "prompt_echo.json").write_text(
+        json.dumps(dict(_type="prompt", input_variables=["human_input"], template="v1 {human_input}"))
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, "test_prompts", raising=False)
+    return package
+
+
+def test_get_chat_model_is_shared_by_settings():
+    assert get_chat_model("gpt-3.5-turbo", 0) is get_chat_model("gpt-3.5-turbo", 0)
+    assert get_chat_model("gpt-3.5-turbo", 0) is not get_chat_model("gpt-3.5-turbo", 0.5)
+
+
+def test_chain_is_built_once(memory, vector_database, chat_model):
+    chat_model(["ok"])
+    handler = QueryHandler(llm_model="gpt-3.5-turbo", memory=memory, vector_database=vector_database)
+
+    assert handler.chain is handler.chain
+    assert handler.chain.memory == memory
+
+
+def test_chain_is_rebuilt_with_a_new_prompt(memory, chat_model, monkeypatch):
+    chat_model(["ok"])
+    handler = StandaloneHandler(llm_model="gpt-3.5-turbo", memory=memory)
+    chain = handler.chain
+
+    prompt = PromptTemplate.from_template("{history} {human_input}")
+    monkeypatch.setattr(handler, "get_prompt", lambda key: prompt)
+
+    assert handler.chain is not chain
+    assert handler.chain.prompt == prompt
+    assert handler.chain is handler.chain
+
+
+def test_predict_reuses_the_chat_model(memory, chat_model):
+    model = chat_model(["primeira", "segunda"])
+    handler = StandaloneHandler(llm_model="gpt-3.5-turbo", memory=memory)
+
+    assert handler.predict("oi") == "primeira"
+    assert handler.predict("tudo bem?") == "segunda"
+    assert len(model.prompts) == 2
+
+
+def test_prompt_registry_parses_templates_once(prompts_package):
+    registry = PromptRegistry(prompts_folder="test_prompts")
+
+    assert registry.get("prompt_echo") is registry.get("prompt_echo.json")
+    assert registry.get("prompt_echo").format(human_input="oi") == "v1 oi"
+
+    with pytest.raises(PromptNotFoundError):
+        registry.get("prompt_missing")
+
+
+def test_prompt_registry_hot_reload(prompts_package):
+    registry = PromptRegistry(prompts_folder="test_prompts", hot_reload=True)
+    prompt = registry.get("prompt_echo")
+    assert registry.get("prompt_echo") is prompt
+
+    path = prompts_package / "prompt_echo.json"
+    path.write_text(path.read_text().replace("v1", "v2"))
+    mtime = path.stat().st_mtime
+    os.utime(path, (mtime + 1, mtime + 1))
+
+    assert registry.get("prompt_echo").format(human_input="oi") == "v2 oi"
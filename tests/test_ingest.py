@@ -0,0 +1,180 @@
+import importlib
+import uuid
+
+import pandas as pd
+import pytest
+
+import bot
+from bot import BotConfig, ingest
+from bot.ingest import (
+    CONTENT_FOOTER,
+    IngestSourceNotRecognizedError,
+    get_source,
+    parse_news,
+    read_csv,
+    read_jsonl,
+    register_source,
+)
+from bot.vector_databases._store import EmbeddingStore
+
+CONTENT = "A prefeitura anunciou a reforma da praça central, que começa na próxima semana."
+
+
+def make_rows(n: int, **fields):
+    return [
+        dict(
+            id=str(uuid.uuid4()),
+            title=f"Notícia {i}",
+            content=f"{CONTENT} {i}",
+            date="2023-01-01",
+            link=f"https://example.com/{i}",
+            categories="cidade|obras",
+            **fields,
+        )
+        for i in range(n)
+    ]
+
+
+def test_parse_news():
+    rows = make_rows(1, author="Ana")
+    rows[0]["content"] = f"{CONTENT}\n{CONTENT_FOOTER} do WhatsApp"
+
+    [news] = parse_news(pd.DataFrame(rows), min_content_length=10)
+
+    assert news.document == CONTENT
+    assert news.categories == ["cidade", "obras"]
+    assert str(news.date) == "2023-01-01"
+    assert news.author == "Ana"
+
+
+def test_parse_news_skips_short_and_invalid_rows():
+    rows = make_rows(4)
+    rows[1]["content"] = "curta"
+    rows[2]["content"] = None
+    rows[3]["id"] = "não é um uuid"
+
+    parsed = list(parse_news(pd.DataFrame(rows), min_content_length=10))
+
+    assert [news is not None for news in parsed] == [True, False, False, False]
+
+
+def test_get_source():
+    assert get_source(None, "noticias.CSV") is read_csv
+    assert get_source(None, "noticias.ndjson") is read_jsonl
+    assert get_source("csv", "noticias.txt") is read_csv
+
+    with pytest.raises(IngestSourceNotRecognizedError):
+        get_source(None, "noticias.txt")
+
+
+def test_register_source(monkeypatch):
+    monkeypatch.setattr(ingest, "SOURCES", dict(ingest.SOURCES))
+
+    def reader(location, chunk_size):
+        yield pd.DataFrame(make_rows(2))
+
+    register_source("memoria", reader)
+
+    assert get_source("memoria") is reader
+
+
+@pytest.mark.parametrize("extension", [".csv", ".jsonl"])
+def test_readers_yield_chunks(tmp_path, extension):
+    path = str(tmp_path / f"noticias{extension}")
+    frame = pd.DataFrame(make_rows(5))
+    if extension == ".csv":
+        frame.to_csv(path, index=False)
+    else:
+        frame.to_json(path, orient="records", lines=True)
+
+    chunks = list(get_source(None, path)(path, 2))
+
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert list(pd.concat(chunks)["id"]) == list(frame["id"])
+
+
+def test_ingest_by_batches(vector_database, embedder):
+    rows = make_rows(7)
+    rows[6]["content"] = "curta"
+    chunks = [pd.DataFrame(rows[:4]), pd.DataFrame(rows[4:])]
+
+    stats = ingest.ingest(vector_database, chunks, batch_size=3, min_content_length=10)
+
+    assert {key: stats[key] for key in ("read", "skipped", "ingested", "batches")} == dict(
+        read=7, skipped=1, ingested=6, batches=2
+    )
+    assert [len(call) for call in embedder.calls] == [3, 3]
+    assert len(vector_database.collection) == 6
+
+
+def test_ingest_writes_the_local_store_once(vector_database, mocker):
+    write = mocker.spy(EmbeddingStore, "write")
+
+    stats = ingest.ingest(vector_database, [pd.DataFrame(make_rows(7))], batch_size=3, min_content_length=10)
+
+    assert stats["batches"] == 3
+    assert write.call_count == 1
+    assert len(vector_database.collection) == 7
+
+
+def test_bulk_upsert_writes_the_upserts_made_before_an_error(vector_database):
+    news = list(parse_news(pd.DataFrame(make_rows(4))))
+
+    with pytest.raises(RuntimeError):
+        with vector_database.bulk_upsert():
+            vector_database.add_news(news[:2])
+            vector_database.add_news(news[1:3])
+            raise RuntimeError
+
+    assert len(vector_database.collection) == 3
+
+
+def test_ingest_deduplicates_ids_within_a_batch(vector_database, embedder):
+    rows = make_rows(3)
+    rows[2]["id"] = rows[0]["id"]
+
+    stats = ingest.ingest(vector_database, [pd.DataFrame(rows)], batch_size=10, min_content_length=10)
+
+    assert stats["ingested"] == 2
+    assert len(vector_database.collection) == 2
+    [result] = vector_database.get_most_similar(f"{CONTENT} 2", n_results=1)
+    assert str(result.doc.id) == rows[0]["id"]
+    assert result.doc.document == f"{CONTENT} 2"
+
+
+def test_ingest_reads_the_defaults_from_the_environment(vector_database, monkeypatch):
+    monkeypatch.setenv("INGEST_BATCH_SIZE", "2")
+    monkeypatch.setenv("INGEST_MIN_CONTENT_LENGTH", "1000")
+
+    stats = ingest.ingest(vector_database, [pd.DataFrame(make_rows(3))])
+
+    assert stats["skipped"] == 3
+
+
+def test_cli_ingest(tmp_path, embedder, monkeypatch):
+    pytest.importorskip("streamlit")
+    from typer.testing import CliRunner
+
+    from bot.__main__ import app
+
+    path = tmp_path / "noticias.csv"
+    pd.DataFrame(make_rows(3)).to_csv(path, index=False)
+    monkeypatch.setenv("VECTORDATABASE_BACKEND", "numpy")
+    monkeypatch.setenv("VECTORDATABASE_LOCAL_STORE_PATH", str(tmp_path / "numpy"))
+    monkeypatch.setenv("INGEST_MIN_CONTENT_LENGTH", "10")
+
+    result = CliRunner().invoke(app, ["ingest", str(path), "--batch-size", "2"])
+
+    assert result.exit_code == 0, result.output
+    assert "3 news ingested (0 of 3 skipped) in 2 batches" in result.output
+
+
+def test_importing_the_bot_loads_the_env_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / ".env").write_text("INGEST_BATCH_SIZE=7\n")
+    monkeypatch.setenv("INGEST_BATCH_SIZE", "")
+    monkeypatch.delenv("INGEST_BATCH_SIZE")
+
+    importlib.reload(bot)
+
+    assert BotConfig().INGEST_BATCH_SIZE == 7
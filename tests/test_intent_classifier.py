@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from bot import BotConfig
+from bot.handlers import IntentionHandler
+from bot.intent_classifier import EmbeddingIntentClassifier, load_intent_examples
+
+EXAMPLES = {
+    "Inicio de conversa": ["olá bom dia", "oi tudo bem", "boa tarde olá"],
+    "Consulta de conteudo": ["notícias da praça central", "obras na praça", "o que aconteceu na cidade"],
+}
+
+
+@pytest.fixture
+def classifier(embedder) -> EmbeddingIntentClassifier:
+    return EmbeddingIntentClassifier(
+        embed_documents=embedder, embed_query=embedder.embed, examples=EXAMPLES
+    )
+
+
+def make_handler(memory, classifier, threshold) -> IntentionHandler:
+    return IntentionHandler(
+        llm_model="gpt-3.5-turbo",
+        memory=memory,
+        verbose=False,
+        classifier=classifier,
+        classifier_threshold=threshold,
+    )
+
+
+def test_classifier_predicts_the_nearest_centroid(classifier):
+    label, confidence = classifier.predict("olá bom dia")
+
+    assert label == "Inicio de conversa"
+    assert confidence > 0
+    assert classifier.predict("notícias da praça central")[0] == "Consulta de conteudo"
+
+
+def test_classifier_embeds_the_examples_in_one_call_per_label(classifier, embedder):
+    assert [len(call) for call in embedder.calls] == [3, 3]
+
+
+def test_local_classifier_is_disabled_by_default():
+    assert BotConfig().LOCAL_INTENT_CLASSIFIER is False
+
+
+def test_intent_examples_are_shipped():
+    examples = load_intent_examples()
+
+    assert {"Inicio de conversa", "Consulta de conteudo"} <= set(examples)
+    assert all(examples.values())
+
+
+def test_confident_prediction_skips_the_language_model(memory, classifier, chat_model):
+    model = chat_model(["Consulta de conteudo"])
+    _, confidence = classifier.predict("olá bom dia")
+    handler = make_handler(memory, classifier, threshold=confidence - 0.01)
+
+    assert handler.predict("olá bom dia") == "Inicio de conversa"
+    assert asyncio.run(handler.apredict("olá bom dia")) == "Inicio de conversa"
+    assert model.prompts == []
+
+
+def test_low_margin_prediction_falls_back_to_the_language_model(memory, classifier, chat_model):
+    model = chat_model(["Consulta de conteudo"])
+    _, confidence = classifier.predict("olá bom dia")
+    handler = make_handler(memory, classifier, threshold=confidence + 0.01)
+
+    assert handler.predict("olá bom dia") == "Consulta de conteudo"
+    assert len(model.prompts) == 1
+
+
+def test_without_a_classifier_the_language_model_answers(memory, chat_model):
+    model = chat_model(["Inicio de conversa"])
+    handler = make_handler(memory, classifier=None, threshold=None)
+
+    assert handler.predict("olá bom dia") == "Inicio de conversa"
+    assert handler.classifier_threshold == BotConfig().INTENT_CLASSIFIER_THRESHOLD
+    assert len(model.prompts) == 1
@@ -0,0 +1,132 @@
+import json
+
+import pytest
+from langchain.memory import ChatMessageHistory
+
+from bot import local_memory
+from bot.local_memory import LocalMemory
+
+
+@pytest.fixture
+def path(tmp_path) -> str:
+    return str(tmp_path / "memory.jsonl")
+
+
+def add_turns(history: ChatMessageHistory, start: int, stop: int) -> None:
+    for i in range(start, stop):
+        history.add_user_message(f"pergunta {i}")
+        history.add_ai_message(f"resposta {i}")
+
+
+def read_lines(path: str):
+    with open(path, encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+def test_round_trip(path):
+    memory = LocalMemory(path)
+    add_turns(memory.message_history, 0, 2)
+    memory.update(memory.message_history)
+
+    messages = LocalMemory(path).message_history.messages
+
+    assert [m.content for m in messages] == ["pergunta 0", "resposta 0", "pergunta 1", "resposta 1"]
+    assert [m.type for m in messages] == ["human", "ai", "human", "ai"]
+
+
+def test_update_appends_new_messages_only(path):
+    memory = LocalMemory(path)
+    add_turns(memory.message_history, 0, 1)
+    memory.update(memory.message_history)
+    first_lines = read_lines(path)
+
+    add_turns(memory.message_history, 1, 2)
+    memory.update(memory.message_history)
+    memory.update(memory.message_history)
+
+    lines = read_lines(path)
+    assert lines[:2] == first_lines
+    assert [json.loads(line)["data"]["content"] for line in lines[2:]] == ["pergunta 1", "resposta 1"]
+
+
+def test_load_last_messages(path, monkeypatch):
+    monkeypatch.setattr(local_memory, "READ_BLOCK_SIZE", 16)
+    memory = LocalMemory(path)
+    add_turns(memory.message_history, 0, 5)
+    memory.update(memory.message_history)
+
+    messages = LocalMemory(path, load_last=3).message_history.messages
+
+    assert [m.content for m in messages] == ["resposta 3", "pergunta 4", "resposta 4"]
+    assert LocalMemory(path, load_last=0).message_history.messages == []
+
+
+def test_compaction_keeps_the_last_messages(path):
+    memory = LocalMemory(path, max_messages=4, compact_every=6)
+    add_turns(memory.message_history, 0, 2)
+    memory.update(memory.message_history)
+    assert len(read_lines(path)) == 4
+
+    add_turns(memory.message_history, 2, 3)
+    memory.update(memory.message_history)
+
+    lines = read_lines(path)
+    assert [json.loads(line)["data"]["content"] for line in lines] == [
+        "pergunta 1",
+        "resposta 1",
+        "pergunta 2",
+        "resposta 2",
+    ]
+
+
+def test_pruned_history_is_written_again(path):
+    memory = LocalMemory(path)
+    add_turns(memory.message_history, 0, 2)
+    memory.update(memory.message_history)
+
+    del memory.message_history.messages[:2]
+    add_turns(memory.message_history, 2, 3)
+    memory.update(memory.message_history)
+    assert len(read_lines(path)) == 6
+
+    del memory.message_history.messages[:]
+    add_turns(memory.message_history, 3, 4)
+    memory.update(memory.message_history)
+
+    assert [json.loads(line)["data"]["content"] for line in read_lines(path)] == ["pergunta 3", "resposta 3"]
+
+
+def test_torn_last_line_is_skipped_and_repaired(path):
+    memory = LocalMemory(path)
+    add_turns(memory.message_history, 0, 1)
+    memory.update(memory.message_history)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"type": "human", "data": {"con')
+
+    messages = LocalMemory(path).message_history.messages
+
+    assert [m.content for m in messages] == ["pergunta 0", "resposta 0"]
+    assert len(read_lines(path)) == 2
+
+
+def test_legacy_file_is_converted(path):
+    history = ChatMessageHistory()
+    add_turns(history, 0, 1)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(history.dict(), f)
+
+    messages = LocalMemory(path).message_history.messages
+
+    assert [m.content for m in messages] == ["pergunta 0", "resposta 0"]
+    assert [json.loads(line)["type"] for line in read_lines(path)] == ["human", "ai"]
+
+
+def test_clear_removes_the_journal(path, tmp_path):
+    memory = LocalMemory(path)
+    add_turns(memory.message_history, 0, 1)
+    memory.update(memory.message_history)
+
+    memory.clear()
+
+    assert memory.message_history.messages == []
+    assert not (tmp_path / "memory.jsonl").exists()
@@ -0,0 +1,139 @@
+from concurrent.futures import Executor, Future
+
+import pytest
+from langchain.schema.messages import HumanMessage
+from langchain_community.llms.openai import OpenAI
+
+from bot.executor import ExecutorBusyError
+from bot.memory import BackgroundSummaryBufferMemory
+
+
+class ManualExecutor(Executor):
+    """
+    An executor running its tasks only when asked to, so that tests decide when the
+    background summary is done.
+    """
+
+    def __init__(self):
+        self.tasks = []
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        future = Future()
+        self.tasks.append((future, fn, args, kwargs))
+        return future
+
+    def run(self):
+        tasks, self.tasks = self.tasks, []
+        for future, fn, args, kwargs in tasks:
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except Exception as err:
+                future.set_exception(err)
+
+
+class BusyExecutor(Executor):
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        raise ExecutorBusyError("busy")
+
+
+@pytest.fixture
+def summaries(monkeypatch):
+    """
+    Replace the summarization by the language model with a record of the summarized
+    messages.
+    """
+    calls = []
+
+    def predict_new_summary(self, messages, existing_summary):
+        calls.append([m.content for m in messages])
+        return f"resumo {len(calls)}"
+
+    monkeypatch.setattr(BackgroundSummaryBufferMemory, "predict_new_summary", predict_new_summary)
+    return calls
+
+
+def make_memory(executor) -> BackgroundSummaryBufferMemory:
+    # Each message counts its prefix and words: "Human: a b c" is 4 tokens.
+    return BackgroundSummaryBufferMemory(
+        llm=OpenAI(temperature=0), executor=executor, max_token_limit=6, input_key="human_input"
+    )
+
+
+def save(memory, i: int):
+    memory.save_context({"human_input": f"pergunta {i} x"}, {"output": f"resposta {i} y"})
+
+
+def test_background_summary_is_applied_on_the_next_save(summaries):
+    executor = ManualExecutor()
+    memory = make_memory(executor)
+
+    save(memory, 1)
+    assert memory.is_summarizing
+    assert len(memory.chat_memory.messages) == 2
+
+    executor.run()
+    save(memory, 2)
+
+    assert summaries == [["pergunta 1 x"]]
+    assert memory.moving_summary_buffer == "resumo 1"
+    assert [m.content for m in memory.chat_memory.messages] == [
+        "resposta 1 y", "pergunta 2 x", "resposta 2 y"
+    ]
+    assert memory.summary_stats["background"] == 1
+    assert memory.summary_stats["critical_path"] == 0
+    assert len(executor.tasks) == 1
+
+
+def test_raw_buffer_is_served_while_summarizing(summaries):
+    memory = make_memory(ManualExecutor())
+    save(memory, 1)
+
+    variables = memory.load_memory_variables({})
+
+    assert "pergunta 1 x" in variables["history"]
+    assert memory.summary_stats["raw_buffer_reads"] == 1
+
+
+def test_stale_summary_is_discarded(summaries):
+    executor = ManualExecutor()
+    memory = make_memory(executor)
+    save(memory, 1)
+
+    executor.run()
+    memory.chat_memory.messages[0] = HumanMessage(content="pergunta editada")
+    save(memory, 2)
+
+    assert memory.moving_summary_buffer == ""
+    assert memory.chat_memory.messages[0].content == "pergunta editada"
+    assert memory.summary_stats["background"] == 0
+    assert len(executor.tasks) == 1
+
+
+def test_busy_executor_prunes_synchronously(summaries):
+    memory = make_memory(BusyExecutor())
+
+    save(memory, 1)
+
+    assert summaries == [["pergunta 1 x"]]
+    assert memory.moving_summary_buffer == "resumo 1"
+    assert [m.content for m in memory.chat_memory.messages] == ["resposta 1 y"]
+    assert memory.summary_stats["critical_path"] == 1
+    assert not memory.is_summarizing
+
+
+def test_failed_summary_is_counted_and_keeps_the_buffer(monkeypatch):
+    def predict_new_summary(self, messages, existing_summary):
+        raise RuntimeError("modelo indisponível")
+
+    monkeypatch.setattr(BackgroundSummaryBufferMemory, "predict_new_summary", predict_new_summary)
+    executor = ManualExecutor()
+    memory = make_memory(executor)
+    save(memory, 1)
+
+    executor.run()
+    save(memory, 2)
+
+    assert memory.summary_stats["failed"] == 1
+    assert memory.moving_summary_buffer == ""
+    assert len(memory.chat_memory.messages) == 4
+    assert len(executor.tasks) == 1
@@ -0,0 +1,145 @@
+import datetime
+import uuid
+
+import numpy as np
+import pytest
+
+from bot.data_models import News, SearchFilters
+from bot.vector_databases import ChromaVectorDB, NewsNumpyVectorDB
+from bot.vector_databases._store import EmbeddingStore
+
+
+def make_news(i: int, categories=None) -> News:
+    return News(
+        id=uuid.uuid4(),
+        title=f"Notícia {i}",
+        document=f"documento número {i}",
+        date=datetime.date(2023, 1, i + 1),
+        link=f"https://example.com/{i}",
+        categories=categories,
+    )
+
+
+@pytest.fixture
+def news():
+    return [
+        make_news(0, ["política"]),
+        make_news(1, ["cultura"]),
+        make_news(2, ["cultura", "esporte"]),
+        make_news(3),
+    ]
+
+
+def test_search_returns_the_nearest_documents(vector_database, news, embedder):
+    vector_database.add_news(news)
+
+    results = vector_database.get_most_similar("documento número 2", n_results=4)
+
+    query = np.array(embedder.embed("documento número 2"))
+    expected = sorted(
+        ((np.sum((np.array(embedder.embed(n.document)) - query) ** 2), n.id) for n in news)
+    )
+    assert [r.doc.id for r in results] == [id for _, id in expected]
+    assert [r.distance for r in results] == pytest.approx([d for d, _ in expected], rel=1e-4, abs=1e-3)
+
+
+def test_search_truncates_to_n_results(vector_database, news):
+    vector_database.add_news(news)
+
+    assert len(vector_database.get_most_similar("documento", n_results=2)) == 2
+    assert len(vector_database.get_most_similar("documento", n_results=10)) == 4
+
+
+def test_upsert_updates_existing_ids(vector_database, news):
+    vector_database.add_news(news)
+    news[1].title = "Notícia atualizada"
+    vector_database.add_news([news[1]])
+
+    assert len(vector_database.collection) == 4
+    [result] = vector_database.get_most_similar(news[1].document, n_results=1)
+    assert result.doc.title == "Notícia atualizada"
+
+
+def test_empty_upsert_writes_nothing(vector_database, embedder):
+    vector_database.upsert(ids=[], documents=[], metadatas=[])
+
+    assert vector_database.collection is None
+    assert embedder.calls == []
+
+
+def test_search_without_a_collection(vector_database):
+    assert vector_database.get_most_similar("documento") == []
+
+
+@pytest.mark.parametrize(
+    "filters, expected",
+    [
+        (SearchFilters(categories=["cultura"]), [1, 2]),
+        (SearchFilters(categories=["política", "esporte"]), [0, 2]),
+        (SearchFilters(date_start=datetime.date(2023, 1, 2), date_end=datetime.date(2023, 1, 3)), [1, 2]),
+        (SearchFilters(categories=["cultura"], date_start=datetime.date(2023, 1, 3)), [2]),
+        (SearchFilters(categories=["inexistente"]), []),
+        (SearchFilters(), [0, 1, 2, 3]),
+    ],
+)
+def test_search_filters(vector_database, news, filters, expected):
+    vector_database.add_news(news)
+
+    results = vector_database.get_most_similar("documento", n_results=10, filters=filters)
+
+    assert sorted(r.doc.id for r in results) == sorted(news[i].id for i in expected)
+
+
+@pytest.mark.parametrize(
+    "filters, expected",
+    [
+        (None, None),
+        (SearchFilters(), None),
+        (SearchFilters(categories=["cultura"]), {"category:cultura": True}),
+        (
+            SearchFilters(categories=["cultura", "esporte"], date_start=datetime.date(2023, 1, 2)),
+            {
+                "$and": [
+                    {"date_int": {"$gte": 20230102}},
+                    {"$or": [{"category:cultura": True}, {"category:esporte": True}]},
+                ]
+            },
+        ),
+    ],
+)
+def test_chroma_where_filter(filters, expected):
+    assert ChromaVectorDB._build_where(filters) == expected
+
+
+def test_other_instances_see_new_versions(vector_database, news, monkeypatch):
+    monkeypatch.setattr(vector_database.bot_config, "VECTORDATABASE_VERSION_CHECK_INTERVAL", 0)
+    vector_database.add_news(news[:2])
+    other = NewsNumpyVectorDB(path=vector_database.path)
+    monkeypatch.setattr(other.bot_config, "VECTORDATABASE_VERSION_CHECK_INTERVAL", 0)
+    assert len(other.collection) == 2
+
+    vector_database.add_news(news[2:])
+
+    assert other.collection_version == vector_database.collection_version
+    assert len(other.collection) == 4
+    assert EmbeddingStore.get_version(vector_database.path) == vector_database.collection_version
+
+
+def test_recreate_collection(vector_database, news):
+    vector_database.add_news(news)
+    vector_database.recreate_collection()
+
+    assert vector_database.collection is None
+    assert vector_database.collection_version is None
+
+
+def test_categories_that_are_not_file_names(vector_database):
+    news = [make_news(0, ["Saúde/Bem-estar"]), make_news(1, ["cultura"])]
+    vector_database.add_news(news)
+
+    results = vector_database.get_most_similar(
+        "documento", n_results=10, filters=SearchFilters(categories=["Saúde/Bem-estar"])
+    )
+
+    assert [r.doc.id for r in results] == [news[0].id]
+    assert results[0].doc.categories == ["Saúde/Bem-estar"]
@@ -0,0 +1,148 @@
+import asyncio
+
+import pytest
+
+from bot.pipeline import AskState, Pipeline, RecentResults, Stage, has_anaphora
+
+
+@pytest.mark.parametrize(
+    "message, expected",
+    [
+        ("Quais as notícias mais recentes de Poços de Caldas?", False),
+        ("Notícias sobre o trânsito no centro", False),
+        ("E amanhã?", True),
+        ("O que ele disse sobre isso?", True),
+        ("Mas e a prefeitura, o que fez?", True),
+        ("Tem mais?", True),
+    ],
+)
+def test_has_anaphora(message, expected):
+    assert has_anaphora(message) is expected
+
+
+def make_pipeline(runs):
+    def run(name):
+        def _run(state):
+            runs.append(name)
+            if name == "rewrite":
+                state.improved_message = state.message.upper()
+
+        return _run
+
+    def arun(name):
+        async def _arun(state):
+            run(name)(state)
+
+        return _arun
+
+    return Pipeline(
+        [
+            Stage(
+                "rewrite",
+                run("rewrite"),
+                arun("rewrite"),
+                skip_conditions=[("short", lambda state: len(state.message) < 5)],
+                on_skip=lambda state: setattr(state, "improved_message", state.message),
+            ),
+            Stage(
+                "answer",
+                run("answer"),
+                arun("answer"),
+                skip_conditions=[("answered", lambda state: state.response is not None)],
+            ),
+        ]
+    )
+
+
+def test_pipeline_skips_stages():
+    runs = []
+    pipeline = make_pipeline(runs)
+
+    state = pipeline.run(AskState(message="oi"))
+    assert runs == ["answer"]
+    assert state.improved_message == "oi"
+
+    runs.clear()
+    state = pipeline.run(AskState(message="bom dia", response="pronto"))
+    assert runs == ["rewrite"]
+    assert state.improved_message == "BOM DIA"
+
+    assert pipeline.stats == {
+        "rewrite": {"run": 1, "skipped": 1, "skipped:short": 1},
+        "answer": {"run": 1, "skipped": 1, "skipped:answered": 1},
+    }
+
+    pipeline.reset_stats()
+    assert pipeline.stats == {"rewrite": {}, "answer": {}}
+
+
+def test_pipeline_arun_skips_stages():
+    runs = []
+    pipeline = make_pipeline(runs)
+
+    state = asyncio.run(pipeline.arun(AskState(message="oi")))
+
+    assert runs == ["answer"]
+    assert state.improved_message == "oi"
+
+
+def test_recent_results_evicts_the_least_recently_used():
+    results = RecentResults(max_size=2)
+    results.put("a", 1)
+    results.put("b", 2)
+    results.get("a")
+    results.put("c", 3)
+
+    assert "a" in results and "c" in results
+    assert "b" not in results
+    assert results.get("b") is None
+
+
+def test_newsbot_skips_the_standalone_rewrite(newsbot, chat_model):
+    model = chat_model(
+        [
+            "Consulta de conteudo",
+            '{"resposta":"ok"}',
+            "Quais as notícias sobre o prefeito?",
+            "Consulta de conteudo",
+            '{"resposta":"ok2"}',
+            "Consulta de conteudo",
+            '{"resposta":"ok3"}',
+        ]
+    )
+
+    assert newsbot.ask("Quais as notícias de hoje?")["response"] == '{"resposta":"ok"}'
+    assert len(model.prompts) == 2
+
+    assert newsbot.ask("E dele?")["response"] == '{"resposta":"ok2"}'
+    assert len(model.prompts) == 5
+
+    response = asyncio.run(newsbot.aask("Quais as notícias sobre a prefeitura?"))
+    assert response["response"] == '{"resposta":"ok3"}'
+    assert len(model.prompts) == 7
+
+    assert newsbot.pipeline_stats["standalone"] == {
+        "run": 1,
+        "skipped": 2,
+        "skipped:empty_history": 1,
+        "skipped:self_contained": 1,
+    }
+
+
+def test_newsbot_reuses_the_rewrite_of_a_repeated_message(newsbot, chat_model):
+    model = chat_model(
+        [
+            "Consulta de conteudo",
+            '{"resposta":"ok"}',
+            "Quais as notícias sobre o filho do prefeito?",
+            "Consulta de conteudo",
+            '{"resposta":"ok2"}',
+        ]
+    )
+    newsbot.ask("Quais as notícias sobre o prefeito?")
+    newsbot.ask("E do filho dele?")
+
+    assert newsbot.ask("e do  filho dele?")["response"] == '{"resposta":"ok2"}'
+    assert len(model.prompts) == 5
+    assert newsbot.pipeline_stats["standalone"]["skipped:seen"] == 1
+    assert newsbot.pipeline_stats["answer_cache"]["run"] == 3
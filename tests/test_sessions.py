@@ -0,0 +1,122 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from bot import sessions
+from bot.sessions import SessionRegistry
+
+
+class Factory:
+    """
+    A session factory counting the sessions it creates.
+    """
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = []
+
+    def __call__(self, session_id: str):
+        self.calls.append(session_id)
+        time.sleep(self.delay)
+        return object()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(sessions, "monotonic", lambda: now[0])
+    return now
+
+
+def test_sessions_are_kept(clock):
+    factory = Factory()
+    registry = SessionRegistry(factory)
+
+    assert registry.get("a") is registry.get("a")
+    assert registry.get("a") is not registry.get("b")
+    assert factory.calls == ["a", "b"]
+    assert registry.stats == dict(sessions=2)
+
+
+def test_idle_sessions_expire(clock):
+    factory = Factory()
+    registry = SessionRegistry(factory, ttl=60)
+    first = registry.get("a")
+    registry.get("b")
+
+    clock[0] += 50
+    assert registry.get("b") is not None
+    clock[0] += 20
+
+    assert registry.get("a") is not first
+    assert factory.calls == ["a", "b", "a"]
+    assert len(registry) == 2
+
+
+def test_least_recently_used_session_is_evicted_at_capacity(clock):
+    factory = Factory()
+    registry = SessionRegistry(factory, max_sessions=2)
+    registry.get("a")
+    registry.get("b")
+    registry.get("a")
+
+    registry.get("c")
+
+    assert len(registry) == 2
+    registry.get("a")
+    registry.get("b")
+    assert factory.calls == ["a", "b", "c", "b"]
+
+
+def test_concurrent_gets_create_a_session_once():
+    factory = Factory(delay=0.05)
+    registry = SessionRegistry(factory)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        bots = list(executor.map(registry.get, ["a"] * 8))
+
+    assert factory.calls == ["a"]
+    assert all(bot is bots[0] for bot in bots)
+
+
+def test_creating_a_session_does_not_block_the_others():
+    release = threading.Event()
+
+    def factory(session_id):
+        if session_id == "lento":
+            release.wait(2)
+        return object()
+
+    registry = SessionRegistry(factory)
+    thread = threading.Thread(target=registry.get, args=("lento",))
+    thread.start()
+    try:
+        time.sleep(0.01)
+        start = time.monotonic()
+        registry.get("rápido")
+        assert time.monotonic() - start < 1
+        assert thread.is_alive()
+    finally:
+        release.set()
+        thread.join()
+
+    assert len(registry) == 2
+
+
+def test_failed_creation_is_retried():
+    calls = []
+
+    def factory(session_id):
+        calls.append(session_id)
+        if len(calls) == 1:
+            raise RuntimeError("banco indisponível")
+        return object()
+
+    registry = SessionRegistry(factory)
+    with pytest.raises(RuntimeError):
+        registry.get("a")
+
+    assert registry.get("a") is not None
+    assert calls == ["a", "a"]
@@ -0,0 +1,130 @@
+import asyncio
+import datetime
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import pytest
+
+from bot import newsbot as newsbot_module
+from bot.data_models import News
+from bot.handlers import FallbackHandler
+from bot.newsbot import NewsBot
+
+DOCUMENT = "A prefeitura anunciou a reforma da praça central"
+
+
+@pytest.fixture
+def queries(newsbot, vector_database, mocker):
+    """
+    Count the queries to the vector database, which holds a single news document.
+    """
+    vector_database.add_news(
+        [
+            News(
+                id=uuid.uuid4(),
+                title="Reforma da praça",
+                document=DOCUMENT,
+                date=datetime.date(2023, 7, 1),
+                link="https://example.com/praca",
+            )
+        ]
+    )
+    return mocker.spy(vector_database, "get_most_similar")
+
+
+def test_query_handler_reuses_the_speculative_context(newsbot, chat_model, queries):
+    model = chat_model(["Consulta de conteudo", '{"resposta":"ok"}'])
+
+    assert newsbot.ask("Quais as notícias da praça?")["response"] == '{"resposta":"ok"}'
+
+    assert queries.call_count == 1
+    assert queries.call_args.args[0] == "Quais as notícias da praça?"
+    assert DOCUMENT in model.prompts[-1]
+    assert newsbot.pipeline_stats["speculative_retrieval"]["run"] == 1
+
+
+def test_query_handler_reuses_the_speculative_context_async(newsbot, chat_model, queries):
+    model = chat_model(["Consulta de conteudo", '{"resposta":"ok"}'])
+
+    asyncio.run(newsbot.aask("Quais as notícias da praça?"))
+
+    assert queries.call_count == 1
+    assert DOCUMENT in model.prompts[-1]
+
+
+def test_speculative_retrieval_uses_the_standalone_question(newsbot, chat_model, queries):
+    chat_model(
+        [
+            "Consulta de conteudo",
+            '{"resposta":"ok"}',
+            "Quais as notícias sobre a reforma da praça?",
+            "Consulta de conteudo",
+            '{"resposta":"ok2"}',
+        ]
+    )
+    newsbot.ask("Quais as notícias da praça?")
+    queries.reset_mock()
+
+    newsbot.ask("E sobre a reforma dela?")
+
+    assert queries.call_count == 1
+    assert queries.call_args.args[0] == "Quais as notícias sobre a reforma da praça?"
+
+
+def test_fallback_discards_the_speculative_context(newsbot, chat_model, queries, mocker):
+    model = chat_model(["Previsão do tempo"])
+    resolve = mocker.spy(newsbot, "_resolve_speculative_context")
+
+    assert newsbot.ask("Vai chover amanhã?")["response"] == FallbackHandler().predict()
+
+    assert resolve.call_args.args[1] is not None
+    assert resolve.spy_return is None
+    assert len(model.prompts) == 1
+
+
+def test_fallback_cancels_the_speculative_context_async(newsbot, chat_model, queries, mocker):
+    chat_model(["Previsão do tempo"])
+    discard = mocker.spy(NewsBot, "_discard_speculative_context")
+
+    asyncio.run(newsbot.aask("Vai chover amanhã?"))
+
+    task = discard.call_args_list[0].args[0]
+    assert task.cancelled() or task.done()
+
+
+def test_queued_speculative_retrieval_is_cancelled_and_done_inline(newsbot, chat_model, queries):
+    model = chat_model(["Consulta de conteudo", '{"resposta":"ok"}'])
+    release = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=1)
+    executor.submit(release.wait)
+    newsbot._executor = executor
+    try:
+        newsbot.ask("Quais as notícias da praça?")
+    finally:
+        release.set()
+        executor.shutdown()
+
+    assert queries.call_count == 1
+    assert DOCUMENT in model.prompts[-1]
+
+
+def test_no_speculative_retrieval_when_the_intention_is_known(newsbot, chat_model, queries, monkeypatch):
+    monkeypatch.setattr(newsbot_module.config, "COMBINED_STANDALONE_INTENTION", True)
+    chat_model(['{"pergunta": "Olá!", "intencao": "Inicio de conversa"}', "Olá, tudo bem?"])
+
+    newsbot.ask("Olá!")
+
+    assert newsbot.pipeline_stats["speculative_retrieval"]["skipped:intention_known"] == 1
+    assert queries.call_count == 1
+
+
+def test_resolve_speculative_context(newsbot):
+    done = Future()
+    done.set_result("contexto")
+    pending = Future()
+
+    assert newsbot._resolve_speculative_context(newsbot.query_handler, None) is None
+    assert newsbot._resolve_speculative_context(newsbot.query_handler, done) == "contexto"
+    assert newsbot._resolve_speculative_context(newsbot.fallback_handler, pending) is None
+    assert pending.cancelled()
@@ -0,0 +1,86 @@
+import pytest
+
+from bot import newsbot as newsbot_module
+from bot.handlers import FallbackHandler
+from bot.handlers._standalone_intention_handler import StandaloneIntentionHandler
+from bot.handlers.exceptions import HandlerOutputParsingError
+
+FALLBACK_RESPONSE = FallbackHandler().predict()
+
+
+@pytest.fixture
+def combined(monkeypatch):
+    monkeypatch.setattr(newsbot_module.config, "COMBINED_STANDALONE_INTENTION", True)
+
+
+@pytest.mark.parametrize(
+    "response",
+    [
+        '{"pergunta": "Quais as notícias de hoje?", "intencao": "Consulta de conteudo"}',
+        '```json\n{"pergunta": "Quais as notícias de hoje?", "intencao": "Consulta de conteudo"}\n```',
+        'Claro! {"pergunta": " Quais as notícias de hoje? ", "intencao": "Consulta de conteudo"} Até mais.',
+    ],
+)
+def test_parse(response):
+    assert StandaloneIntentionHandler.parse(response) == ("Quais as notícias de hoje?", "Consulta de conteudo")
+
+
+@pytest.mark.parametrize(
+    "response",
+    [
+        "Consulta de conteudo",
+        '{"pergunta": "Quais as notícias de hoje?"}',
+        '{"intencao": "Consulta de conteudo"}',
+        '{"pergunta": " ", "intencao": "Consulta de conteudo"}',
+        '{"pergunta": "Quais as notícias de hoje?", "intencao": null}',
+        '{"pergunta": "Quais as notícias de hoje?", "intencao": "Consulta de conteudo"',
+    ],
+)
+def test_parse_rejects_incomplete_answers(response):
+    with pytest.raises(HandlerOutputParsingError):
+        StandaloneIntentionHandler.parse(response)
+
+
+def test_invalid_answer_is_parsed_as_unknown(newsbot):
+    assert newsbot._parse_standalone_intention('{"pergunta": "Quais?"}') == (None, None)
+
+
+def test_combined_call_replaces_the_separate_calls(newsbot, chat_model, combined):
+    model = chat_model(
+        [
+            '{"pergunta": "Quais as notícias de hoje?", "intencao": "Consulta de conteudo"}',
+            '{"resposta":"ok"}',
+        ]
+    )
+
+    assert newsbot.ask("Quais as notícias de hoje?")["response"] == '{"resposta":"ok"}'
+    assert len(model.prompts) == 2
+    assert newsbot.pipeline_stats["standalone"]["skipped:resolved"] == 1
+    assert newsbot.pipeline_stats["intention"]["skipped:intention_known"] == 1
+
+
+def test_unknown_intention_is_routed_to_the_fallback(newsbot, chat_model, combined):
+    model = chat_model(['{"pergunta": "Vai chover amanhã?", "intencao": "Previsão do tempo"}'])
+
+    assert newsbot.ask("Vai chover amanhã?")["response"] == FALLBACK_RESPONSE
+    assert len(model.prompts) == 1
+
+
+def test_invalid_combined_answer_falls_back_to_the_separate_calls(newsbot, chat_model, combined):
+    model = chat_model(
+        [
+            '{"pergunta": "Quais as notícias sobre o prefeito?", "intencao": "Consulta de conteudo"}',
+            '{"resposta":"ok"}',
+            "Não entendi a pergunta.",
+            "Quais as notícias sobre a esposa do prefeito?",
+            "Consulta de conteudo",
+            '{"resposta":"ok2"}',
+        ]
+    )
+    newsbot.ask("Quais as notícias sobre o prefeito?")
+
+    assert newsbot.ask("E da esposa dele?")["response"] == '{"resposta":"ok2"}'
+    assert len(model.prompts) == 6
+    assert "Quais as notícias sobre a esposa do prefeito?" in model.prompts[-1]
+    assert newsbot.pipeline_stats["standalone"]["run"] == 1
+    assert newsbot.pipeline_stats["intention"]["run"] == 1
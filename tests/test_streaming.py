@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+from bot.handlers import QueryHandler
+from bot.streaming import AnswerStream, parse_answer
+
+ANSWER = json.dumps({"resposta": 'Olá "mundo"\né \\ fim', "fontes": "https://example.com"}, ensure_ascii=True)
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ('{"resposta": "ok", "fontes": null}', {"resposta": "ok"}),
+        ('```json\n{"resposta": "ok", "n": 1}\n```', {"resposta": "ok", "n": "1"}),
+        ("Olá! Como posso ajudar?", {"resposta": "Olá! Como posso ajudar?"}),
+        ('{"outro": "campo"}', {"resposta": '{"outro": "campo"}'}),
+        ('{"resposta": "incompleto', {"resposta": '{"resposta": "incompleto'}),
+    ],
+)
+def test_parse_answer(text, expected):
+    assert parse_answer(text) == expected
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 5, len(ANSWER)])
+def test_answer_stream_decodes_the_answer_field(chunk_size):
+    stream = AnswerStream()
+    answers = [stream.feed(ANSWER[i:i + chunk_size]) for i in range(0, len(ANSWER), chunk_size)]
+
+    assert answers[-1] == 'Olá "mundo"\né \\ fim'
+    assert all(b.startswith(a) for a, b in zip(answers, answers[1:]))
+    assert stream.result == json.loads(ANSWER)
+
+
+def test_answer_stream_passes_plain_text_through():
+    stream = AnswerStream()
+    for chunk in ["  Olá", "! Tudo", " bem?"]:
+        answer = stream.feed(chunk)
+
+    assert answer == "  Olá! Tudo bem?"
+    assert stream.result == {"resposta": "Olá! Tudo bem?"}
+
+
+def test_handler_streams_and_saves_the_completion(memory, vector_database, chat_model):
+    model = chat_model(["Olá mundo"])
+    handler = QueryHandler(llm_model="gpt-3.5-turbo", memory=memory, vector_database=vector_database)
+
+    stream = handler.stream("oi")
+    assert next(stream) == "O"
+    assert memory.chat_memory.messages == []
+
+    assert "O" + "".join(stream) == "Olá mundo"
+    assert [m.content for m in memory.chat_memory.messages] == ["oi", "Olá mundo"]
+    assert len(model.prompts) == 1
+
+
+def test_handler_stream_raises_the_model_errors(memory, vector_database, chat_model, monkeypatch):
+    model = chat_model(["Olá"])
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("modelo indisponível")
+
+    monkeypatch.setattr(type(model), "_stream", fail)
+    handler = QueryHandler(llm_model="gpt-3.5-turbo", memory=memory, vector_database=vector_database)
+
+    with pytest.raises(RuntimeError, match="modelo indisponível"):
+        list(handler.stream("oi"))
+    assert memory.chat_memory.messages == []
+
+
+def test_newsbot_streams_the_answer(newsbot, chat_model):
+    chat_model(["Consulta de conteudo", ANSWER])
+
+    result = newsbot.ask_stream("Quais as notícias de hoje?")
+    assert newsbot.memory.chat_memory.messages == []
+
+    assert "".join(result["response"]) == ANSWER
+    assert [m.content for m in newsbot.memory.chat_memory.messages] == ["Quais as notícias de hoje?", ANSWER]